@@ -0,0 +1,193 @@
+import hashlib
+from dataclasses import asdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import generics, permissions, status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from . import geo, moderation, principal
+from .models import Machine
+from .search import search_machines
+from .serializers import MachineSerializer, ModerationMachineSerializer, NearbyMachineSerializer
+
+
+class MachineCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-machine_id'
+
+
+def _decimal(value):
+    try:
+        number = Decimal(value)
+    except (TypeError, InvalidOperation):
+        return None
+    return number if number.is_finite() else None
+
+
+class ConditionalListMixin:
+    """Answer GETs with 304 when the filtered rows have not changed.
+
+    The validators are derived from the newest ``updated_at`` and the row
+    count of the filtered queryset (one aggregate query), plus the full
+    query string so every filter/cursor combination gets its own ETag.
+    """
+
+    def get(self, request, *args, **kwargs):
+        stamp = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            last_modified=Max('updated_at'), count=Count('pk'),
+        )
+        last_modified = stamp['last_modified']
+        digest = hashlib.md5(
+            f"{last_modified}:{stamp['count']}:{request.get_full_path()}".encode()
+        ).hexdigest()
+        etag = quote_etag(digest)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
+
+
+# ---------------------- MACHINE CATALOGUE ----------------------
+class MachineListAPIView(ConditionalListMixin, generics.ListAPIView):
+    """Approved machines, filterable by ``type``, ``crop``, ``min_price``, ``max_price`` and ``q``."""
+
+    serializer_class = MachineSerializer
+    pagination_class = MachineCursorPagination
+
+    def get_queryset(self):
+        queryset = (
+            Machine.objects.filter(approval_status='approved')
+            .select_related('owner')
+            .only(*MachineSerializer.LOAD_ONLY)
+        )
+        params = self.request.query_params
+
+        if params.get('type'):
+            queryset = queryset.filter(machine_type=params['type'])
+        if params.get('crop'):
+            queryset = queryset.filter(crops_supported__icontains=params['crop'])
+        min_price = _decimal(params.get('min_price'))
+        if min_price is not None:
+            queryset = queryset.filter(price_per_day__gte=min_price)
+        max_price = _decimal(params.get('max_price'))
+        if max_price is not None:
+            queryset = queryset.filter(price_per_day__lte=max_price)
+        q = params.get('q', '').strip()
+        if q:
+            queryset = queryset.filter(
+                Q(machine_name__icontains=q) | Q(machine_use__icontains=q) | Q(description__icontains=q)
+            )
+        return queryset
+
+
+class MachineSearchAPIView(generics.GenericAPIView):
+    """Ranked full-text search over approved machines: ``?q=wheat harv&limit=20``."""
+
+    serializer_class = MachineSerializer
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            limit = 20
+        machines = search_machines(request.query_params.get('q', ''), limit)
+        return Response({'results': self.get_serializer(machines, many=True).data})
+
+
+class NearbyMachinesAPIView(generics.GenericAPIView):
+    """Nearest approved machines free for the given dates.
+
+    ``?lat=18.52&lon=73.85&start=2025-06-01&end=2025-06-03&radius=25&limit=10&type=Tillage``.
+    Without ``lat``/``lon`` the logged-in farmer's saved location is used;
+    the dates default to today.
+    """
+
+    serializer_class = NearbyMachineSerializer
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        point = geo.parse_point(params.get('lat'), params.get('lon'))
+        if point is None and 'lat' not in params:
+            farmer = principal.get_principal(request._request, 'farmer').account
+            point = farmer and geo.parse_point(farmer.latitude, farmer.longitude)
+        if point is None:
+            return Response({'detail': "lat and lon are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = date.fromisoformat(params['start']) if params.get('start') else timezone.localdate()
+            end = date.fromisoformat(params['end']) if params.get('end') else start
+        except ValueError:
+            return Response({'detail': "start and end must be YYYY-MM-DD dates."}, status=status.HTTP_400_BAD_REQUEST)
+        if end < start:
+            return Response({'detail': "end must not be before start."}, status=status.HTTP_400_BAD_REQUEST)
+
+        radius = _decimal(params.get('radius'))
+        radius = min(max(float(radius), 1.0), 100.0) if radius is not None else geo.DEFAULT_RADIUS_KM
+        try:
+            limit = min(max(int(params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        machines = geo.nearest_available(*point, start, end, radius_km=radius, limit=limit,
+                                         machine_type=params.get('type') or None)
+        return Response({'results': self.get_serializer(machines, many=True).data})
+
+
+# ---------------------- MODERATION ----------------------
+class ModerationQueueAPIView(generics.ListAPIView):
+    """Pending machines, filterable by ``owner``, ``machine_type``, ``min_age_days``, ``max_age_days`` and ``q``."""
+
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = ModerationMachineSerializer
+    pagination_class = MachineCursorPagination
+
+    def get_queryset(self):
+        return moderation.pending_queue(**moderation.queue_filters(self.request.query_params))
+
+
+class ModerationReviewAPIView(generics.GenericAPIView):
+    """Approve or reject machines in one transaction.
+
+    ``{"action": "approve", "machine_ids": [1, 2, 3], "reason": "..."}``, or
+    ``{"action": "reject", "all": true, "owner": 7}`` for every pending
+    machine matching the queue filters.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    MAX_IDS = 10_000
+
+    def post(self, request, *args, **kwargs):
+        data = request.data
+        action = data.get('action')
+        if action not in moderation.ACTIONS:
+            return Response({'detail': "action must be approve or reject."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if data.get('all') in (True, 'true', '1'):
+            ids = list(
+                moderation.pending_queue(**moderation.queue_filters(data)).values_list('machine_id', flat=True)
+            )
+        else:
+            ids = data.getlist('machine_ids') if hasattr(data, 'getlist') else data.get('machine_ids')
+            if not isinstance(ids, list) or len(ids) > self.MAX_IDS:
+                return Response({'detail': f"machine_ids must be a list of at most {self.MAX_IDS} ids."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [int(pk) for pk in ids]
+            except (TypeError, ValueError):
+                return Response({'detail': "machine_ids must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = moderation.review(ids, action, admin=request.user, reason=str(data.get('reason') or '')[:1000])
+        return Response(asdict(result))
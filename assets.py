@@ -0,0 +1,61 @@
+import mimetypes
+import os
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+
+# collectstatic (booking.storage.CompressedStaticFilesStorage) leaves
+# content-hashed copies of every file in STATIC_ROOT, with .br and .gz
+# siblings for text assets. A hashed name never changes content, so those
+# are cached for a year and marked immutable; anything else (an unhashed
+# name, e.g. from an old page) is revalidated after an hour.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+UNHASHED_MAX_AGE = 3600
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip().removeprefix('q=')
+        if coding and not (params and quality.replace('.', '', 1).isdigit() and float(quality) == 0):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_static(request, path):
+    """A collected static file, precompressed when the client accepts it, with long-lived caching."""
+    try:
+        fullpath = staticfiles_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    if not os.path.isfile(fullpath) or path.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+        raise Http404(path)
+
+    stat = os.stat(fullpath)
+    hashed = path in getattr(staticfiles_storage, 'hashed_files', {}).values()
+    if not hashed and not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding, served = None, fullpath
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(fullpath + suffix):
+            encoding, served = coding, fullpath + suffix
+            break
+    content_type, _ = mimetypes.guess_type(fullpath)
+    response = FileResponse(open(served, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if hashed:
+        patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=UNHASHED_MAX_AGE)
+    return response
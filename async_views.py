@@ -0,0 +1,99 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import QuerySet
+from django.shortcuts import render
+
+from . import dashboard_cache, forecasting
+from .dashboards import (
+    admin_occupancy, admin_summary, admin_tables, ADMIN_PAGE_SIZE, farmer_bookings, farmer_payments,
+    farmer_nearby, farmer_summary, machine_owners, owner_analytics, owner_bookings, owner_occupancy, parse_year,
+)
+from .models import Machine, OwnerBankDetails
+from .pagination import keyset_page
+from .principal import admin_required, farmer_required, owner_required
+from .views import admin_context, farmer_context, owner_context
+
+
+# Async versions of the three dashboards, meant to be served under ASGI.
+#
+# The async ORM methods (aget(), acount(), aaggregate(), async for) all run
+# on the request's single thread-sensitive executor, so gathering several
+# of them still sends the queries one after another. The independent query
+# groups of a dashboard are instead run with thread_sensitive=False, each
+# on its own pool thread and database connection, so their round-trips
+# overlap. Everything a template touches is materialised first, and the
+# template is rendered off the event loop.
+async def _concurrently(*calls):
+    """Run ``(fn, *args)`` tuples on separate threads/connections and gather the results."""
+    async def run(fn, *args):
+        def call():
+            try:
+                result = fn(*args)
+                return list(result) if isinstance(result, QuerySet) else result
+            finally:
+                # Like the end of a request: honours CONN_MAX_AGE for this pool thread's connections.
+                close_old_connections()
+        return await sync_to_async(call, thread_sensitive=False)()
+
+    return await asyncio.gather(*(run(*call) for call in calls))
+
+
+_render = sync_to_async(render)
+
+
+# ---------------------- FARMER ----------------------
+@farmer_required
+async def farmer_dashboard(request):
+    farmer = request.principal.account
+
+    machines, bookings, payments, nearby, stats = await _concurrently(
+        (Machine.objects.filter(approval_status='approved').select_related('owner').all,),
+        (farmer_bookings, farmer),
+        (farmer_payments, farmer),
+        (farmer_nearby, farmer),
+        (dashboard_cache.cached, 'farmer', [f'farmer:{farmer.farmer_id}'], functools.partial(farmer_summary, farmer)),
+    )
+    data = {
+        'machines': machines, 'bookings': bookings, 'payments': payments,
+        'owners': machine_owners(machines), 'nearby': nearby,
+    }
+    return await _render(request, 'booking/farmer_dashboard.html', farmer_context(farmer, data, stats))
+
+
+# ---------------------- OWNER ----------------------
+@owner_required
+async def owner_dashboard(request):
+    owner = request.principal.account
+
+    year = parse_year(request.GET.get('year'))
+
+    bank, analytics, occupancy, machines, bookings, insights = await _concurrently(
+        (OwnerBankDetails.objects.filter(owner=owner).first,),
+        (dashboard_cache.cached, f'owner:{year}', [f'owner:{owner.owner_id}'],
+         functools.partial(owner_analytics, owner, year)),
+        (dashboard_cache.cached, f'owner_occupancy:{year}', [f'owner:{owner.owner_id}'],
+         functools.partial(owner_occupancy, owner, year)),
+        (Machine.objects.filter(owner=owner).all,),
+        (owner_bookings, owner),
+        (forecasting.owner_insights, owner),
+    )
+    context = owner_context(owner, bank, analytics, occupancy, machines, bookings, insights)
+    return await _render(request, 'booking/owner_dashboard.html', context)
+
+
+# ---------------------- ADMIN ----------------------
+@admin_required
+async def admin_dashboard(request):
+    tables = admin_tables(request.GET)  # lazy querysets, no queries yet
+    data, occupancy, *pages = await _concurrently(
+        (dashboard_cache.cached, 'admin', ['global'], admin_summary),
+        (dashboard_cache.cached, 'admin_occupancy', ['global'], admin_occupancy),
+        *((keyset_page, queryset, request.GET.get(f'{table}_after'), ADMIN_PAGE_SIZE)
+          for table, queryset in tables.items()),
+    )
+    listings = dict(zip(tables, pages))
+    context = await sync_to_async(admin_context)(request, data, listings, occupancy)
+    return await _render(request, 'booking/admin_dashboard.html', context)
@@ -0,0 +1,89 @@
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Booking
+
+
+# Bookings in these states hold the machine; cancelled/completed ones free it.
+BLOCKING_STATUSES = ('pending', 'confirmed')
+
+
+# ---------------------- OVERLAP QUERY ----------------------
+def overlapping_bookings(machine, start, end):
+    """Blocking bookings of ``machine`` that share at least one day with start..end.
+
+    Booking dates are inclusive, so a booking covers the half-open span
+    [start_date, end_date + 1 day).  Two such spans overlap exactly when
+    each one starts on or before the other one's last day, which keeps the
+    lookup a pure range scan on the (machine, status, start_date, end_date)
+    index.
+    """
+    return Booking.objects.filter(
+        machine=machine,
+        status__in=BLOCKING_STATUSES,
+        start_date__lte=end,
+        end_date__gte=start,
+    )
+
+
+def is_available(machine, start, end):
+    return not overlapping_bookings(machine, start, end).exists()
+
+
+def available_machines(machines, start, end):
+    """``machines`` without a blocking booking between start and end, as one anti-join."""
+    return machines.exclude(Exists(overlapping_bookings(OuterRef('pk'), start, end)))
+
+
+# ---------------------- CALENDAR ----------------------
+class MachineCalendar:
+    """Sorted, merged busy spans of one machine inside a date window.
+
+    Spans are stored half-open as ``(first_day, day_after_last)`` so adjacent
+    bookings merge cleanly and lookups are a single bisect.
+    """
+
+    def __init__(self, machine, window_start, window_end):
+        self.window_start = window_start
+        self.window_end = window_end  # exclusive
+        rows = (
+            overlapping_bookings(machine, window_start, window_end - timedelta(days=1))
+            .order_by('start_date')
+            .values_list('start_date', 'end_date')
+        )
+        self.spans = []
+        for first, last in rows:
+            first, stop = max(first, window_start), min(last + timedelta(days=1), window_end)
+            if self.spans and first <= self.spans[-1][1]:
+                if stop > self.spans[-1][1]:
+                    self.spans[-1] = (self.spans[-1][0], stop)
+            else:
+                self.spans.append((first, stop))
+        self._starts = [span[0] for span in self.spans]
+
+    def is_free(self, start, end):
+        # The only span that can overlap is the last one starting on or before ``end``.
+        i = bisect_right(self._starts, end) - 1
+        return i < 0 or self.spans[i][1] <= start
+
+    def free_windows(self):
+        windows = []
+        cursor = self.window_start
+        for first, stop in self.spans:
+            if first > cursor:
+                windows.append((cursor, first - timedelta(days=1)))
+            cursor = max(cursor, stop)
+        if cursor < self.window_end:
+            windows.append((cursor, self.window_end - timedelta(days=1)))
+        return windows
+
+
+def free_windows(machine, horizon, start=None):
+    """Free ``(first_day, last_day)`` ranges of ``machine`` over the next ``horizon`` days."""
+    if not isinstance(horizon, timedelta):
+        horizon = timedelta(days=horizon)
+    start = start or timezone.localdate()
+    return MachineCalendar(machine, start, start + horizon).free_windows()
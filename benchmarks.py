@@ -0,0 +1,705 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import Booking, Farmer, Machine, Owner, Payment
+
+
+# Benchmarks seed their own synthetic rows inside a transaction that is
+# always rolled back, so they can be pointed at a development database.
+# Benchmarks that serve requests from several threads need their rows
+# committed; they are registered with rollback=False and clean up after
+# themselves.
+BENCHMARKS = {}
+
+
+def benchmark(name, rollback=True):
+    def register(fn):
+        fn.rollback = rollback
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run(name, **options):
+    if not BENCHMARKS[name].rollback:
+        return BENCHMARKS[name](**options)
+    result = {}
+    try:
+        with transaction.atomic():
+            result = BENCHMARKS[name](**options)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def timings(samples):
+    """Summary of a list of durations in seconds, reported in milliseconds."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+# ---------------------- SYNTHETIC DATA ----------------------
+MACHINE_KINDS = [
+    ('Tractor', 'Tillage', 'Ploughing and haulage'),
+    ('Rotavator', 'Tillage', 'Seedbed preparation'),
+    ('Seed Drill', 'Planting', 'Line sowing of seeds'),
+    ('Rice Transplanter', 'Planting', 'Transplanting paddy seedlings'),
+    ('Combine Harvester', 'Harvesting', 'Harvesting and threshing grain'),
+    ('Reaper', 'Harvesting', 'Cutting standing crop'),
+    ('Boom Sprayer', 'Pest Control', 'Spraying pesticide and fertiliser'),
+    ('Power Weeder', 'Pest Control', 'Inter-row weeding'),
+]
+VILLAGES = ['Baramati', 'Indapur', 'Daund', 'Shirur', 'Junnar', 'Khed', 'Maval', 'Mulshi', 'Bhor', 'Purandar',
+            'Ambegaon', 'Haveli']
+CROPS = ['Wheat', 'Paddy', 'Sugarcane', 'Maize', 'Cotton', 'Soybean', 'Groundnut', 'Mustard', 'Bajra', 'Jowar']
+
+
+def synthetic_owners(count, rng, prefix='bench'):
+    password = make_password(None)  # unusable, and hashed once instead of per row
+    owners = [
+        Owner(name=f'Owner {i}', phone=f'9{i:09d}', email=f'{prefix}-owner-{i}@example.com',
+              password_hash=password, address=f'Village {rng.randrange(500)}')
+        for i in range(count)
+    ]
+    Owner.objects.bulk_create(owners, batch_size=1000)
+    return list(Owner.objects.filter(email__startswith=f'{prefix}-owner-'))
+
+
+def synthetic_machines(count, owners, rng, prefix='bench', batch_size=2000, region=None):
+    """``count`` approved machines; with ``region`` (south, west, north, east) they get random locations."""
+    from . import geo
+
+    for start in range(0, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            name, machine_type, use = rng.choice(MACHINE_KINDS)
+            lat = lon = None
+            if region:
+                south, west, north, east = region
+                lat, lon = rng.uniform(south, north), rng.uniform(west, east)
+            batch.append(Machine(
+                owner=rng.choice(owners),
+                machine_name=f'{name} {i}',
+                machine_number=f'{prefix}-{i}',
+                machine_type=machine_type,
+                machine_use=use,
+                crops_supported=', '.join(rng.sample(CROPS, 3)),
+                price_per_day=Decimal(rng.randrange(500, 5000, 50)),
+                description=f'{name} available for {use.lower()}',
+                approval_status='approved',
+                latitude=lat,
+                longitude=lon,
+                geo_cell=geo.cell(lat, lon),
+            ))
+        Machine.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def synthetic_farmers(count, rng, prefix='bench', batch_size=2000):
+    password = make_password(None)
+    for start in range(0, count, batch_size):
+        Farmer.objects.bulk_create([
+            Farmer(name=f'Farmer {i}', phone=f'8{i:09d}', email=f'{prefix}-farmer-{i}@example.com',
+                   village=rng.choice(VILLAGES), password_hash=password, address=f'{rng.choice(VILLAGES)} Road')
+            for i in range(start, min(start + batch_size, count))
+        ], batch_size=batch_size)
+
+
+def synthetic_bookings(count, machines, farmer_ids, rng, today, batch_size=5000):
+    """``count`` bookings from a year before ``today`` onwards, never overlapping on a machine.
+
+    ``machines`` holds ``(machine_id, owner_id, price_per_day)`` rows. About
+    one booking in ten is cancelled; of the rest, finished ones are
+    completed and the others confirmed or pending.
+    """
+    next_free = [today - timedelta(days=365)] * len(machines)
+    for start in range(0, count, batch_size):
+        batch = []
+        for _ in range(start, min(start + batch_size, count)):
+            index = rng.randrange(len(machines))
+            machine_id, owner_id, price = machines[index]
+            begin = next_free[index] + timedelta(days=rng.randrange(14))
+            end = begin + timedelta(days=rng.randrange(5))
+            roll = rng.random()
+            if roll < 0.1:
+                status = 'cancelled'
+            else:
+                status = 'completed' if end < today else ('confirmed' if roll < 0.7 else 'pending')
+                next_free[index] = end + timedelta(days=1)
+            batch.append(Booking(
+                farmer_id=rng.choice(farmer_ids), machine_id=machine_id, owner_id=owner_id,
+                booking_date=begin - timedelta(days=rng.randrange(1, 15)), start_date=begin, end_date=end,
+                total_price=price * ((end - begin).days + 1), status=status,
+            ))
+        Booking.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def synthetic_payments(bookings, rng, batch_size=5000):
+    """A payment for each confirmed or completed booking in ``bookings``; returns how many.
+
+    Cash on bookings still to come is pending, as the owner confirms it
+    after use; everything else is completed.
+    """
+    methods = [method for method, _ in Payment.PAYMENT_METHOD_CHOICES]
+    rows = (
+        bookings.filter(status__in=('confirmed', 'completed'))
+        .values_list('booking_id', 'farmer_id', 'owner_id', 'total_price', 'status')
+        .iterator(chunk_size=batch_size)
+    )
+    batch, count = [], 0
+    for booking_id, farmer_id, owner_id, amount, status in rows:
+        method = rng.choice(methods)
+        batch.append(Payment(
+            booking_id=booking_id, farmer_id=farmer_id, owner_id=owner_id, amount=amount,
+            payment_method=method,
+            payment_status='pending' if method == 'cash' and status == 'confirmed' else 'completed',
+        ))
+        if len(batch) == batch_size:
+            Payment.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    Payment.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+# Share of the requested row count given to each table; payments follow from
+# the bookings (about 0.45 of the rows), so the total lands close to ``rows``.
+SEED_MIX = {'owners': 0.01, 'farmers': 0.05, 'machines': 0.04, 'bookings': 0.5}
+SEED_REGION = (17.0, 73.0, 20.0, 76.0)
+
+
+def seed_synthetic(rows=10_000, prefix='seed', seed=1, today=None, batch_size=5000, **counts):
+    """Bulk-insert owners, farmers, machines, bookings and payments; returns the row counts.
+
+    ``counts`` (owners=, farmers=, machines=, bookings=) override the
+    SEED_MIX share of ``rows``. Rows are written in ``batch_size`` batches,
+    never held in memory all at once, and carry ``prefix`` in their emails
+    and machine numbers. Signals do not fire for bulk inserts, so callers
+    rebuild the rollups and search index afterwards.
+    """
+    from django.utils import timezone
+
+    rng = random.Random(seed)
+    today = today or timezone.localdate()
+    sizes = {table: max(1, counts.get(table) or int(rows * share)) for table, share in SEED_MIX.items()}
+
+    owners = synthetic_owners(sizes['owners'], rng, prefix)
+    synthetic_farmers(sizes['farmers'], rng, prefix, batch_size)
+    synthetic_machines(sizes['machines'], owners, rng, prefix, batch_size, region=SEED_REGION)
+    machines = list(
+        Machine.objects.filter(machine_number__startswith=f'{prefix}-')
+        .values_list('machine_id', 'owner_id', 'price_per_day')
+    )
+    farmer_ids = list(
+        Farmer.objects.filter(email__startswith=f'{prefix}-farmer-').values_list('farmer_id', flat=True)
+    )
+    synthetic_bookings(sizes['bookings'], machines, farmer_ids, rng, today, batch_size)
+    sizes['payments'] = synthetic_payments(
+        Booking.objects.filter(machine__machine_number__startswith=f'{prefix}-'), rng, batch_size,
+    )
+    return sizes
+
+
+# ---------------------- SEARCH ----------------------
+@benchmark('search')
+def bench_search(machines=100_000, queries=200, seed=1):
+    """Ranked prefix search latency over ``machines`` indexed machines."""
+    from . import search
+
+    rng = random.Random(seed)
+    owners = synthetic_owners(max(1, machines // 50), rng)
+    synthetic_machines(machines, owners, rng)
+    started = time.perf_counter()
+    terms = search.rebuild_index(batch_size=2000)
+    index_seconds = time.perf_counter() - started
+
+    words = [c.lower() for c in CROPS] + [k[0].split()[0].lower() for k in MACHINE_KINDS]
+    samples = []
+    for _ in range(queries):
+        query = ' '.join(w[:rng.randrange(3, len(w) + 1)] for w in rng.sample(words, rng.randrange(1, 3)))
+        started = time.perf_counter()
+        search.search(query, limit=20)
+        samples.append(time.perf_counter() - started)
+
+    return {
+        'machines': machines,
+        'index_terms': terms,
+        'index_build_s': round(index_seconds, 2),
+        'query': timings(samples),
+    }
+
+
+# ---------------------- NEARBY MACHINES ----------------------
+@benchmark('nearby')
+def bench_nearby(machines=100_000, queries=200, radius_km=25, limit=10, booked_percent=20, seed=1):
+    """Nearest-available latency over ``machines`` spread across a 3 x 3 degree region.
+
+    ``booked_percent`` of the machines are booked on the queried dates. A
+    scan that measures every approved machine is timed for comparison.
+    """
+    from datetime import timedelta
+
+    from . import geo
+    from .availability import available_machines
+    from .models import Booking, Farmer
+
+    rng = random.Random(seed)
+    region = (17.0, 73.0, 20.0, 76.0)
+    owners = synthetic_owners(max(1, machines // 50), rng)
+    synthetic_machines(machines, owners, rng, region=region)
+    farmer = Farmer.objects.create(name='Bench Farmer', phone='9000000000', email='bench-farmer@example.com',
+                                   password_hash=make_password(None))
+    day = date(2025, 7, 1)
+    rows = list(Machine.objects.filter(machine_number__startswith='bench-').values_list('machine_id', 'owner_id'))
+    Booking.objects.bulk_create([
+        Booking(farmer=farmer, machine_id=machine_id, owner_id=owner_id, start_date=day - timedelta(days=1),
+                end_date=day + timedelta(days=1), total_price=Decimal('1000'), status='confirmed')
+        for machine_id, owner_id in rng.sample(rows, len(rows) * booked_percent // 100)
+    ], batch_size=5000)
+
+    points = [(rng.uniform(17.5, 19.5), rng.uniform(73.5, 75.5)) for _ in range(queries)]
+    samples, found = [], 0
+    for lat, lon in points:
+        started = time.perf_counter()
+        found += len(geo.nearest_available(lat, lon, day, day, radius_km=radius_km, limit=limit))
+        samples.append(time.perf_counter() - started)
+
+    scan = []
+    approved = available_machines(Machine.objects.filter(approval_status='approved'), day, day)
+    for lat, lon in points[:5]:
+        started = time.perf_counter()
+        sorted(
+            (geo.distance_km(lat, lon, la, lo), pk)
+            for pk, la, lo in approved.values_list('machine_id', 'latitude', 'longitude')
+        )[:limit]
+        scan.append(time.perf_counter() - started)
+
+    return {
+        'machines': machines,
+        'radius_km': radius_km,
+        'mean_results': round(found / queries, 1),
+        'query': timings(samples),
+        'full_scan': timings(scan),
+    }
+
+
+# ---------------------- OCCUPANCY ----------------------
+@benchmark('occupancy')
+def bench_occupancy(machines=20_000, bookings=1_000_000, days=365, seed=1):
+    """Occupancy bitmaps and per machine/owner/type statistics over ``bookings`` bookings.
+
+    The same rows are also expanded the naive way, one (machine, day) pair
+    at a time, for comparison.
+    """
+    from datetime import timedelta
+
+    from .models import Booking, Farmer
+    from .occupancy import Occupancy, bitmaps
+
+    rng = random.Random(seed)
+    owners = synthetic_owners(max(1, machines // 50), rng)
+    synthetic_machines(machines, owners, rng)
+    machine_rows = list(Machine.objects.filter(machine_number__startswith='bench-').values_list('machine_id', 'owner_id'))
+    farmer = Farmer.objects.create(name='Bench Farmer', phone='9000000000', email='bench-farmer@example.com',
+                                   password_hash=make_password(None))
+    last = date(2025, 12, 31)
+    first = last - timedelta(days=days - 1)
+    started = time.perf_counter()
+    for start in range(0, bookings, 5000):
+        batch = []
+        for _ in range(start, min(start + 5000, bookings)):
+            machine_id, owner_id = rng.choice(machine_rows)
+            begin = first + timedelta(days=rng.randrange(-7, days))
+            batch.append(Booking(
+                farmer=farmer, machine_id=machine_id, owner_id=owner_id, start_date=begin,
+                end_date=begin + timedelta(days=rng.randrange(7)), total_price=Decimal('1000'),
+                status=rng.choice(('confirmed', 'completed', 'cancelled')),
+            ))
+        Booking.objects.bulk_create(batch)
+    seed_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    occupancy = Occupancy(first, last)
+    load_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    per_machine = occupancy.per_machine()
+    machine_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    occupancy.per_owner()
+    per_type = occupancy.per_type()
+    group_seconds = time.perf_counter() - started
+
+    rows = list(
+        Booking.objects.filter(status__in=('confirmed', 'completed'), start_date__lte=last, end_date__gte=first)
+        .values_list('machine_id', 'start_date', 'end_date')
+    )
+    started = time.perf_counter()
+    bitmaps(rows, first, days)
+    bitmap_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    booked = set()
+    for machine_id, begin, end in rows:
+        day = max(begin, first)
+        while day <= min(end, last):
+            booked.add((machine_id, day))
+            day += timedelta(days=1)
+    naive_seconds = time.perf_counter() - started
+    assert len(booked) == sum(s['booked_days'] for s in per_machine.values())
+
+    return {
+        'machines': machines,
+        'bookings': bookings,
+        'occupying_bookings': len(rows),
+        'days': days,
+        'seed_s': round(seed_seconds, 2),
+        'load_s': round(load_seconds, 2),
+        'per_machine_s': round(machine_seconds, 2),
+        'per_owner_and_type_s': round(group_seconds, 2),
+        'bitmaps_in_memory_s': round(bitmap_seconds, 2),
+        'naive_day_expansion_s': round(naive_seconds, 2),
+        'utilisation_by_type': {t: s['utilisation'] for t, s in per_type.items()},
+    }
+
+
+# ---------------------- WSGI vs ASGI DASHBOARDS ----------------------
+DASHBOARD_URLS = {
+    'farmer': ('farmer_dashboard', 'farmer_dashboard_async'),
+    'owner': ('owner_dashboard', 'owner_dashboard_async'),
+    'admin': ('admin_dashboard', 'admin_dashboard_async'),
+}
+
+
+def _session_cookie(**data):
+    from django.contrib.sessions.backends.db import SessionStore
+
+    session = SessionStore()
+    session.update(data)
+    session.save()
+    return session.session_key
+
+
+def _add_query_latency(seconds):
+    """Sleep before every query on every connection, current and future."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # Fires again when a closed connection object reconnects.
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    for conn in connections.all(initialized_only=True):
+        install(None, conn)
+
+    def remove():
+        connection_created.disconnect(install)
+        for conn in connections.all(initialized_only=True):
+            if delay in conn.execute_wrappers:
+                conn.execute_wrappers.remove(delay)
+    return remove
+
+
+@benchmark('dashboard_servers', rollback=False)
+def bench_dashboard_servers(machines=2000, bookings=50, concurrency=16, requests=300, latency_ms=2, seed=1):
+    """p50/p99 of the sync dashboards under WSGI against the async ones under ASGI.
+
+    Both paths run in-process through Django's WSGI and ASGI handlers (the
+    test clients) with ``concurrency`` requests in flight. ``latency_ms`` is
+    slept before every query, standing in for the network round-trip to a
+    database server that a local SQLite file does not have. The synthetic
+    rows are committed, because the handlers query from other threads, and
+    deleted at the end.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.models import User
+    from django.contrib.sessions.models import Session
+    from django.test import AsyncClient, Client, override_settings
+    from django.urls import reverse
+
+    from .models import Booking, Farmer, Payment
+
+    rng = random.Random(seed)
+    prefix = f'servers-{time.time_ns()}'
+    owners = synthetic_owners(max(1, machines // 50), rng, prefix)
+    synthetic_machines(machines, owners, rng, prefix)
+    farmer = Farmer.objects.create(name='Bench Farmer', phone='9000000000', email=f'{prefix}-farmer@example.com',
+                                   password_hash=make_password(None))
+    listed = list(Machine.objects.filter(machine_number__startswith=f'{prefix}-')[:bookings])
+    Booking.objects.bulk_create([
+        Booking(farmer=farmer, machine=m, owner_id=m.owner_id, start_date=date(2025, 1 + i % 12, 1),
+                end_date=date(2025, 1 + i % 12, 3), total_price=m.price_per_day * 3, status='confirmed')
+        for i, m in enumerate(listed)
+    ])
+    Payment.objects.bulk_create([
+        Payment(booking=b, farmer=farmer, owner_id=b.owner_id, amount=b.total_price, payment_method='upi',
+                payment_status='completed')
+        for b in Booking.objects.filter(farmer=farmer)
+    ])
+    admin = User.objects.create_user(f'{prefix}-admin', password=None, is_staff=True)
+    cookies = {
+        'farmer': _session_cookie(farmer_id=farmer.farmer_id),
+        'owner': _session_cookie(owner_id=owners[0].owner_id),
+        'admin': _session_cookie(**{
+            SESSION_KEY: str(admin.pk),
+            BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend',
+            HASH_SESSION_KEY: admin.get_session_auth_hash(),
+        }),
+    }
+    plan = [rng.choice(list(DASHBOARD_URLS)) for _ in range(requests)]
+
+    def wsgi_request(role):
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = cookies[role]
+        started = time.perf_counter()
+        response = client.get(reverse(DASHBOARD_URLS[role][0]))
+        assert response.status_code == 200, (role, response.status_code)
+        return role, time.perf_counter() - started
+
+    async def asgi_requests():
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(role):
+            client = AsyncClient()
+            client.cookies[settings.SESSION_COOKIE_NAME] = cookies[role]
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(reverse(DASHBOARD_URLS[role][1]))
+            assert response.status_code == 200, (role, response.status_code)
+            return role, time.perf_counter() - started
+
+        return await asyncio.gather(*(one(role) for role in plan))
+
+    def summarise(samples, elapsed):
+        report = {'overall': timings([s for _, s in samples]), 'requests_per_s': round(len(samples) / elapsed, 1)}
+        for role in DASHBOARD_URLS:
+            report[role] = timings([s for r, s in samples if r == role])
+        return report
+
+    remove_latency = _add_query_latency(latency_ms / 1000) if latency_ms else (lambda: None)
+    hosts = override_settings(ALLOWED_HOSTS=['testserver'])  # the test clients' host name
+    hosts.enable()
+    try:
+        # One warm-up pass of each, so template loading is not measured.
+        for role in DASHBOARD_URLS:
+            wsgi_request(role)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            wsgi = list(pool.map(wsgi_request, plan))
+        wsgi_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        asgi = asyncio.run(asgi_requests())
+        asgi_elapsed = time.perf_counter() - started
+    finally:
+        hosts.disable()
+        remove_latency()
+        Farmer.objects.filter(pk=farmer.pk).delete()
+        Owner.objects.filter(email__startswith=f'{prefix}-owner-').delete()
+        admin.delete()
+        Session.objects.filter(session_key__in=cookies.values()).delete()
+
+    return {
+        'machines': machines,
+        'concurrency': concurrency,
+        'query_latency_ms': latency_ms,
+        'wsgi_sync': summarise(wsgi, wsgi_elapsed),
+        'asgi_async': summarise(asgi, asgi_elapsed),
+    }
+
+
+# ---------------------- REQUEST PATHS ----------------------
+@benchmark('request_paths')
+def bench_request_paths(rows=20_000, requests=30, seed=1):
+    """The dashboards, create_booking and make_payment through the test client over seeded rows.
+
+    Each dashboard is timed cold (dashboard cache cleared, a different user
+    each request) and warm (the same user again). Queries per request come
+    from the metrics middleware. Run it against a SQLite settings module to
+    get figures comparable between commits; write them with --output.
+    """
+    import uuid
+
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from django.test import Client, override_settings
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from . import dashboard_cache, metrics
+
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    seeded = seed_synthetic(rows, prefix='paths', seed=seed, today=today)
+    farmer_ids = list(Farmer.objects.filter(email__startswith='paths-farmer-').values_list('farmer_id', flat=True))
+    owner_ids = list(Owner.objects.filter(email__startswith='paths-owner-').values_list('owner_id', flat=True))
+    machine_ids = list(Machine.objects.filter(machine_number__startswith='paths-').values_list('machine_id', flat=True))
+    cache = caches[dashboard_cache.CACHE_ALIAS]
+
+    client = Client()
+    client.force_login(User.objects.create_user('paths-admin', password=None, is_staff=True))
+
+    def login(key, value):
+        session = client.session
+        session[key] = value
+        session.save()
+
+    def timed(method, url, data=None, status=200):
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == status, (url, response.status_code)
+        return elapsed, response
+
+    def dashboard(url_name, session_key, ids):
+        url = reverse(url_name)
+        cold = []
+        for _ in range(requests):
+            if session_key:
+                login(session_key, rng.choice(ids))
+            cache.clear()
+            cold.append(timed('get', url)[0])
+        timed('get', url)
+        warm = [timed('get', url)[0] for _ in range(requests)]
+        return {'cold': timings(cold), 'warm': timings(warm)}
+
+    hosts = override_settings(ALLOWED_HOSTS=['testserver'])  # the test client's host name
+    hosts.enable()
+    try:
+        login('farmer_id', farmer_ids[0])
+        timed('get', reverse('farmer_dashboard'))  # warm-up: template loading is not measured
+        metrics.recorder.clear()
+        result = {
+            'farmer_dashboard': dashboard('farmer_dashboard', 'farmer_id', farmer_ids),
+            'owner_dashboard': dashboard('owner_dashboard', 'owner_id', owner_ids),
+            'admin_dashboard': dashboard('admin_dashboard', None, None),
+        }
+
+        # Far-future weeks that no seeded booking reaches, one per request.
+        login('farmer_id', rng.choice(farmer_ids))
+        bookings, payments = [], []
+        for i in range(requests):
+            start = today + timedelta(days=3650 + 7 * i)
+            elapsed, response = timed('post', reverse('create_booking'), {
+                'machine_id': rng.choice(machine_ids),
+                'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=2)).isoformat(),
+            }, status=302)
+            bookings.append(elapsed)
+            booking_id = int(response.url.rstrip('/').rsplit('/', 1)[1])
+            payments.append(timed('post', reverse('make_payment', args=[booking_id]), {
+                'payment_method': rng.choice(('upi', 'card', 'cash')), 'idempotency_key': uuid.uuid4().hex,
+            }, status=302)[0])
+        result['create_booking'] = {'post': timings(bookings)}
+        result['make_payment'] = {'post': timings(payments)}
+    finally:
+        hosts.disable()
+
+    snapshot = metrics.recorder.snapshot()
+    for view, report in result.items():
+        report['queries_p50'] = snapshot.get(view, {}).get('queries_per_request', {}).get(0.5)
+    return {'rows': seeded, 'requests': requests, **result}
+
+
+# ---------------------- MODERATION ----------------------
+@benchmark('moderation')
+def bench_moderation(machines=10_000, owners=200, seed=1):
+    """Approve ``machines`` pending machines in one moderation.review() call."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from . import moderation
+
+    rng = random.Random(seed)
+    synthetic_machines(machines, synthetic_owners(owners, rng), rng)
+    Machine.objects.filter(machine_number__startswith='bench-').update(approval_status='pending')
+    ids = list(Machine.objects.filter(approval_status='pending').values_list('machine_id', flat=True))
+
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        result = moderation.review(ids, 'approve', reason='benchmark')
+        seconds = time.perf_counter() - started
+    return {
+        'machines': len(ids),
+        'reviewed': result.reviewed,
+        'seconds': round(seconds, 3),
+        'statements': len(ctx.captured_queries),
+        'machines_per_second': round(result.reviewed / seconds),
+    }
+
+
+# ---------------------- FRAGMENT CACHE ----------------------
+@benchmark('fragments')
+def bench_fragments(machines=5000, owners=100, repeats=5, seed=1):
+    """The farmer dashboard's machine grid: one template loop versus stitched cached cards.
+
+    "full" renders every card in a {% for %} loop, as the page did before;
+    "stitched_cold" starts from an empty fragment cache (every card is a
+    miss) and "stitched_warm" finds every card cached.
+    """
+    from django.core.cache import caches
+    from django.template import Context
+    from django.template.loader import get_template
+
+    from . import fragments
+
+    rng = random.Random(seed)
+    synthetic_machines(machines, synthetic_owners(owners, rng), rng)
+    rows = list(Machine.objects.filter(approval_status='approved').select_related('owner'))
+    engine = get_template('booking/machine_card.html').template.engine
+    loop = engine.from_string("{% for m in machines %}{% include 'booking/machine_card.html' %}{% endfor %}")
+    cache = caches[fragments.CACHE_ALIAS]
+
+    def timed(render, clear=False):
+        samples = []
+        for _ in range(repeats):
+            if clear:
+                cache.clear()
+            started = time.perf_counter()
+            html = render()
+            samples.append(time.perf_counter() - started)
+        return html, timings(samples)
+
+    full_html, full = timed(lambda: loop.render(Context({'machines': rows})))
+    _, cold = timed(lambda: fragments.render_many('machine_card', rows), clear=True)
+    before = fragments.stats()
+    stitched_html, warm = timed(lambda: fragments.render_many('machine_card', rows))
+    after = fragments.stats()
+    return {
+        'machines': len(rows),
+        'full': full,
+        'stitched_cold': cold,
+        'stitched_warm': warm,
+        'warm_speedup': round(full['p50_ms'] / warm['p50_ms'], 1),
+        'warm_hit_ratio': round((after['hits'] - before['hits']) / (len(rows) * repeats), 3),
+        'identical_html': full_html == stitched_html,
+    }
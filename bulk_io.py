@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import dashboard_cache, geo, rollups, search
+from .models import Booking, Machine, Payment
+from .routers import analytics_db
+
+
+# ---------------------- MACHINE IMPORT ----------------------
+IMPORT_FIELDS = (
+    'machine_name', 'machine_number', 'machine_type', 'machine_use',
+    'crops_supported', 'price_per_day', 'description', 'machine_image',
+)
+REQUIRED_FIELDS = ('machine_name', 'machine_number', 'machine_type', 'machine_use', 'price_per_day')
+UPDATE_FIELDS = [f for f in IMPORT_FIELDS if f != 'machine_number']
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)  # (row number, message)
+
+
+def read_rows(stream, fmt):
+    """Dicts from a text stream of CSV (with a header row) or a JSON array.
+
+    CSV is read lazily; a JSON document has to be parsed whole.
+    """
+    if fmt == 'csv':
+        return csv.DictReader(stream)
+    if fmt == 'json':
+        rows = json.load(stream)
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be an array of objects.")
+        return rows
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def format_for(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith('.json'):
+        return 'json'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def _clean(row):
+    """Machine field values for one input row, or raise ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("expected an object")
+    values = {}
+    for name in IMPORT_FIELDS:
+        value = row.get(name)
+        value = '' if value is None else str(value).strip()
+        if not value and name in REQUIRED_FIELDS:
+            raise ValueError(f"{name} is required")
+        max_length = getattr(Machine._meta.get_field(name), 'max_length', None)
+        if max_length and len(value) > max_length:
+            raise ValueError(f"{name} is longer than {max_length} characters")
+        values[name] = value or None
+    try:
+        price = Decimal(values['price_per_day'])
+    except InvalidOperation:
+        price = None
+    if price is None or not price.is_finite() or price < 0:
+        raise ValueError("price_per_day must be a non-negative number")
+    values['price_per_day'] = price.quantize(Decimal('0.01'))
+    return values
+
+
+def _create_machines(machines, batch_size):
+    """Insert ``machines`` and return how many were created.
+
+    The machine_number check in import_machines() is not atomic with the
+    insert, so a concurrent import or add_machine can take a number in
+    between. The batch is then retried row by row, leaving those rows out.
+    """
+    try:
+        with transaction.atomic():
+            Machine.objects.bulk_create(machines, batch_size=batch_size)
+        return len(machines)
+    except IntegrityError:
+        created = 0
+        for machine in machines:
+            try:
+                with transaction.atomic():
+                    Machine.objects.bulk_create([machine])
+            except IntegrityError:
+                continue
+            created += 1
+        return created
+
+
+def import_machines(owner, rows, batch_size=500, update=False):
+    """Create ``owner``'s machines from ``rows`` with one bulk insert per batch.
+
+    A ``machine_number`` that already exists is skipped, or, with ``update``,
+    overwritten when it belongs to the same owner. Imported machines wait for
+    admin approval like machines added one by one.
+    """
+    result = ImportResult()
+    seen = set()
+    batch = []
+
+    def flush():
+        existing = Machine.objects.in_bulk([v['machine_number'] for _, v in batch], field_name='machine_number')
+        new, changed = [], []
+        retyped = {}
+        now = timezone.now()
+        for line, values in batch:
+            machine = existing.get(values['machine_number'])
+            if machine is None:
+                # bulk_create() skips the pre_save signal that sets geo_cell.
+                new.append(Machine(
+                    owner=owner, latitude=owner.latitude, longitude=owner.longitude,
+                    geo_cell=geo.cell(owner.latitude, owner.longitude), **values,
+                ))
+            elif not update:
+                result.skipped += 1
+            elif machine.owner_id != owner.owner_id:
+                result.errors.append((line, f"machine_number {values['machine_number']} belongs to another owner"))
+            else:
+                if machine.machine_type != values['machine_type']:
+                    retyped[machine.pk] = (machine.machine_type, values['machine_type'])
+                for name in UPDATE_FIELDS:
+                    setattr(machine, name, values[name])
+                machine.updated_at = now
+                changed.append(machine)
+        with transaction.atomic():
+            created = _create_machines(new, batch_size)
+            if changed:
+                # bulk_update() skips auto_now and the save signals, so
+                # updated_at, the search index and the rollup buckets of
+                # retyped machines are maintained here.
+                Machine.objects.bulk_update(changed, UPDATE_FIELDS + ['updated_at'], batch_size=batch_size)
+                search.index_machines(changed)
+                rollups.refresh_later(rollups.retyped_machine_buckets(retyped))
+        result.created += created
+        result.skipped += len(new) - created
+        result.updated += len(changed)
+        batch.clear()
+
+    for line, row in enumerate(rows, start=1):
+        try:
+            values = _clean(row)
+        except ValueError as exc:
+            result.errors.append((line, str(exc)))
+            continue
+        if values['machine_number'] in seen:
+            result.errors.append((line, f"duplicate machine_number {values['machine_number']} in file"))
+            continue
+        seen.add(values['machine_number'])
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if result.created or result.updated:
+        dashboard_cache.bump(f'owner:{owner.owner_id}', 'global')
+    return result
+
+
+# ---------------------- BOOKING EXPORT ----------------------
+BOOKING_COLUMNS = (
+    'booking_id', 'booking_date', 'start_date', 'end_date', 'status', 'total_price', 'paid_amount',
+    'machine_id', 'machine__machine_number', 'machine__machine_name',
+    'owner_id', 'owner__name', 'farmer_id', 'farmer__name',
+)
+PAYMENT_COLUMNS = (
+    'payment_id', 'booking_id', 'payment_date', 'payment_method', 'payment_status', 'amount',
+    'owner_id', 'farmer_id',
+)
+
+
+def _date_filters(queryset, prefix, date_from=None, date_to=None):
+    if date_from:
+        queryset = queryset.filter(**{f'{prefix}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{prefix}__lte': date_to})
+    return queryset
+
+
+def booking_export(owner_id=None, status=None, date_from=None, date_to=None):
+    """(columns, queryset of value tuples) for the booking export, oldest first, read from analytics_db()."""
+    paid = (
+        Payment.objects.filter(booking=OuterRef('pk'), payment_status='completed')
+        .values('booking').annotate(total=Sum('amount')).values('total')
+    )
+    queryset = Booking.objects.using(analytics_db()).annotate(
+        paid_amount=Coalesce(Subquery(paid), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    )
+    if owner_id:
+        queryset = queryset.filter(owner_id=owner_id)
+    if status:
+        queryset = queryset.filter(status=status)
+    queryset = _date_filters(queryset, 'start_date', date_from, date_to)
+    return BOOKING_COLUMNS, queryset.order_by('booking_id').values_list(*BOOKING_COLUMNS)
+
+
+def payment_export(owner_id=None, status=None, date_from=None, date_to=None):
+    queryset = Payment.objects.using(analytics_db())
+    if owner_id:
+        queryset = queryset.filter(owner_id=owner_id)
+    if status:
+        queryset = queryset.filter(payment_status=status)
+    queryset = _date_filters(queryset, 'payment_date__date', date_from, date_to)
+    return PAYMENT_COLUMNS, queryset.order_by('payment_id').values_list(*PAYMENT_COLUMNS)
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(columns, queryset, fmt='csv', chunk_size=2000):
+    """Yield the export as text chunks, holding at most ``chunk_size`` rows in memory."""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    header = [c.replace('__', '_') for c in columns]
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == 'json':
+        yield '['
+        separator = '\n'
+        for row in rows:
+            yield separator + json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder)
+            separator = ',\n'
+        yield '\n]\n'
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def text_upload(upload):
+    # utf-8-sig drops the byte-order mark spreadsheet programs put on CSV files.
+    return io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
@@ -0,0 +1,98 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from . import routers
+
+
+# Computed dashboard summaries are cached under the versions of the scopes
+# they depend on ("farmer:<id>", "owner:<id>", "global").  Writes never
+# delete entries: signals bump a scope's version and every key built from
+# the old version simply stops being read and ages out.  This only needs
+# get/set/incr, so it behaves the same on the local-memory, file and
+# Redis/Memcached backends.
+#
+# A summary built from a read replica may predate a write that has already
+# bumped its version, and would then be served under the new version. Such
+# summaries are kept for REPLICA_PIN_SECONDS only, the lag the replica
+# router allows for, instead of TIMEOUT.
+CACHE_ALIAS = getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')
+TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+HITS_KEY = 'dash:stats:hits'
+MISSES_KEY = 'dash:stats:misses'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f'dash:ver:{scope}'
+
+
+def _fresh_version():
+    # Seeded from the clock so a version key that was evicted cannot come
+    # back at a number that old entries were stored under.
+    return time.time_ns()
+
+
+def versions(scopes):
+    cache = _cache()
+    keys = [_version_key(s) for s in scopes]
+    found = cache.get_many(keys)
+    missing = {k: _fresh_version() for k in keys if k not in found}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(k, 0) for k in keys]
+
+
+def bump(*scopes):
+    cache = _cache()
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def _count(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cached(name, scopes, builder):
+    """Return ``builder()`` from the cache, keyed on the current scope versions."""
+    stamp = '.'.join(f'{s}={v}' for s, v in zip(scopes, versions(scopes)))
+    key = f'dash:{name}:{stamp}'
+    cache = _cache()
+    value = cache.get(key)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+    _count(MISSES_KEY)
+    value = builder()
+    timeout = TIMEOUT if routers.analytics_db() == DEFAULT_DB_ALIAS else min(TIMEOUT, routers.PIN_SECONDS)
+    cache.set(key, value, timeout)
+    return value
+
+
+def stats():
+    values = _cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 3) if total else 0.0,
+    }
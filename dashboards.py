@@ -0,0 +1,311 @@
+import calendar
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from . import geo, rollups
+from .models import Booking, Farmer, Machine, MonthlyRollup, Payment
+from .occupancy import Occupancy
+from .pagination import keyset_page
+from .routers import analytics, analytics_db
+
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+EARNED_STATUSES = ('confirmed', 'completed')
+
+
+def booking_status_counts(bookings):
+    """Every status counter of ``bookings`` in one conditional-aggregation query."""
+    return bookings.aggregate(
+        total=Count('booking_id'),
+        active=Count('booking_id', filter=Q(status__in=ACTIVE_STATUSES)),
+        completed=Count('booking_id', filter=Q(status='completed')),
+        cancelled=Count('booking_id', filter=Q(status='cancelled')),
+    )
+
+
+# ---------------------- FARMER ----------------------
+@analytics
+def farmer_summary(farmer):
+    """Booking counters and chart series for one farmer (two queries, cacheable)."""
+    counts = booking_status_counts(Booking.objects.filter(farmer=farmer))
+
+    # Spend is per farmer, which the owner-keyed monthly rollup cannot
+    # answer; this stays one grouped query over the farmer's own payments.
+    monthly_spend = list(
+        Payment.objects.filter(farmer=farmer, payment_status='completed')
+        .values(year=ExtractYear('payment_date'), month=ExtractMonth('payment_date'))
+        .annotate(total=Sum('amount'))
+        .order_by('year', 'month')
+    )
+
+    summary = {
+        'total_bookings': counts['total'],
+        'active_bookings': counts['active'],
+        'total_spent': sum(s['total'] for s in monthly_spend),
+    }
+
+    chartData = {
+        'spend': {
+            'labels': [f"{calendar.month_abbr[s['month']]} {s['year']}" for s in monthly_spend],
+            'data': [float(s['total']) for s in monthly_spend]
+        },
+        'status': {
+            'labels': ['Completed', 'Pending/Confirmed', 'Cancelled'],
+            'data': [counts['completed'], counts['active'], counts['cancelled']]
+        }
+    }
+
+    return {'summary': summary, 'chartData': chartData}
+
+
+def farmer_bookings(farmer):
+    return (
+        Booking.objects.filter(farmer=farmer)
+        .select_related('machine', 'owner')
+        .prefetch_related(Prefetch('payment_set', to_attr='payment_list'))
+        .order_by('-start_date')
+    )
+
+
+def farmer_payments(farmer):
+    return (
+        Payment.objects.filter(farmer=farmer)
+        .select_related('booking__owner')
+        .prefetch_related('booking__owner__ownerbankdetails_set')
+        .order_by('-payment_date')
+    )
+
+
+def machine_owners(machines):
+    # Only owners of listed machines are needed for the owner popup, and
+    # they are already joined onto the machine rows.
+    owners = {}
+    for m in machines:
+        owners.setdefault(m.owner_id, {
+            'owner_id': m.owner.owner_id,
+            'name': m.owner.name,
+            'email': m.owner.email,
+            'phone': m.owner.phone,
+            'address': m.owner.address,
+        })
+    return list(owners.values())
+
+
+def farmer_listings(farmer):
+    """Machine catalogue and the farmer's booking/payment rows.
+
+    The query count does not depend on how many machines, bookings or
+    payments exist: every row relation is joined or prefetched.
+    """
+    machines = list(Machine.objects.filter(approval_status='approved').select_related('owner'))
+    return {
+        'machines': machines,
+        'bookings': farmer_bookings(farmer),
+        'payments': farmer_payments(farmer),
+        'owners': machine_owners(machines),
+        'nearby': farmer_nearby(farmer),
+    }
+
+
+def farmer_nearby(farmer, limit=6):
+    """Nearest machines free today around the farmer's saved location, if there is one."""
+    if farmer.latitude is None or farmer.longitude is None:
+        return []
+    today = timezone.localdate()
+    return geo.nearest_available(farmer.latitude, farmer.longitude, today, today, limit=limit)
+
+
+# ---------------------- OWNER ----------------------
+def owner_bookings(owner):
+    return Booking.objects.filter(owner=owner).select_related('machine', 'farmer').annotate(
+        awaiting_cash=Exists(Payment.objects.filter(
+            booking=OuterRef('pk'), payment_method='cash', payment_status='pending',
+        )),
+    )
+
+
+FIRST_YEAR = 2000
+
+
+def parse_year(value):
+    """``value`` as a dashboard year (FIRST_YEAR to next year), or else the current year."""
+    this_year = timezone.localdate().year
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        return this_year
+    return year if FIRST_YEAR <= year <= this_year + 1 else this_year
+
+
+@analytics
+def owner_analytics(owner, year):
+    """Earnings, pending amount and monthly series for one owner.
+
+    Everything is folded out of the owner's MonthlyRollup rows in a single
+    query, so the cost is one round-trip however many years of bookings
+    the owner has.  Months are scoped to ``year``; earnings and pending
+    amounts are all-time.  Per-machine utilisation comes from
+    owner_occupancy().  An out-of-range ``year`` means the current one.
+    """
+    year = parse_year(year)
+    rows = (
+        MonthlyRollup.objects.filter(owner=owner)
+        .values('year', 'month', 'status')
+        .annotate(count=Sum('booking_count'), value=Sum('booking_value'))
+        .order_by()
+    )
+
+    earnings = Decimal('0')
+    pending = Decimal('0')
+    bookings = 0
+    monthly = [Decimal('0')] * 12
+    for r in rows:
+        value = r['value'] or Decimal('0')
+        bookings += r['count']
+        if r['status'] == 'pending':
+            pending += value
+        elif r['status'] in EARNED_STATUSES:
+            earnings += value
+            if r['year'] == year:
+                monthly[r['month'] - 1] += value
+
+    return {
+        'total_earnings': earnings,
+        'pending_payments': pending,
+        'total_bookings': bookings,
+        'income_data': {
+            'year': year,
+            'labels': list(range(1, 13)),
+            'data': monthly,
+        },
+    }
+
+
+# ---------------------- OCCUPANCY ----------------------
+def _year_window(year):
+    year = parse_year(year)
+    today = timezone.localdate()
+    return date(year, 1, 1), today if year == today.year else date(year, 12, 31)
+
+
+@analytics
+def owner_occupancy(owner, year):
+    """Booked-day utilisation, idle streaks and a fleet heatmap of ``owner``'s machines in ``year``."""
+    occupancy = Occupancy(*_year_window(year), machines=Machine.objects.filter(owner=owner))
+    fleet = occupancy.per_owner().get(owner.owner_id)
+    return {
+        'machines': {
+            pk: {k: stats[k] for k in ('utilisation', 'longest_idle', 'current_idle')}
+            for pk, stats in occupancy.per_machine().items()
+        },
+        'heatmap': occupancy.heatmap(fleet) if fleet else [],
+    }
+
+
+@analytics
+def admin_occupancy(days=365):
+    """Per machine type utilisation over the last ``days`` days, with each type's busiest month."""
+    last = timezone.localdate()
+    occupancy = Occupancy(last - timedelta(days=days - 1), last)
+    rows = []
+    for machine_type, stats in sorted(occupancy.per_type().items()):
+        rows.append({
+            'machine_type': machine_type,
+            'machines': stats['machines'],
+            'utilisation': stats['utilisation'],
+            'idle_machines': stats['idle_machines'],
+            'longest_idle': stats['longest_idle'],
+            'peak_month': max(occupancy.monthly(stats), key=lambda m: m[1])[0] if stats['booked_days'] else None,
+        })
+    return rows
+
+
+# ---------------------- ADMIN ----------------------
+ADMIN_PAGE_SIZE = 50
+
+
+@analytics
+def admin_summary():
+    """Site-wide counters and chart series for the admin dashboard."""
+    machine_totals = Machine.objects.aggregate(
+        total=Count('machine_id'),
+        pending=Count('machine_id', filter=Q(approval_status='pending')),
+    )
+    summary = {
+        'totalUsers': Farmer.objects.count(),
+        'totalMachines': machine_totals['total'],
+        'activeBookings': Booking.objects.filter(status='confirmed').count(),
+        'pendingApprovals': machine_totals['pending'],
+    }
+
+    bookings_per_month = rollups.bookings_per_month()
+
+    machine_counts = (
+        Machine.objects.filter(approval_status='approved')
+        .values('machine_type')
+        .annotate(count=Count('machine_id'))
+        .order_by('machine_type')
+    )
+
+    chartData = {
+        'bookings': {
+            'labels': [f"{calendar.month_abbr[b['month']]} {b['year']}" for b in bookings_per_month],
+            'data': [b['count'] for b in bookings_per_month]
+        },
+        'machines': {
+            'labels': [m['machine_type'] for m in machine_counts],
+            'data': [m['count'] for m in machine_counts]
+        }
+    }
+
+    return {'summary': summary, 'chartData': chartData}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def admin_tables(params):
+    """Filtered (unpaginated) querysets behind the admin dashboard tables, bound to analytics_db()."""
+    db = analytics_db()
+    users = Farmer.objects.using(db).only('farmer_id', 'name', 'email', 'phone')
+    user_q = params.get('user_q', '').strip()
+    if user_q:
+        users = users.filter(Q(name__icontains=user_q) | Q(email__icontains=user_q))
+
+    machines = Machine.objects.using(db).select_related('owner')
+    if params.get('machine_status'):
+        machines = machines.filter(approval_status=params['machine_status'])
+    if params.get('machine_type'):
+        machines = machines.filter(machine_type=params['machine_type'])
+
+    bookings = Booking.objects.using(db).select_related('machine', 'farmer')
+    if params.get('booking_status'):
+        bookings = bookings.filter(status=params['booking_status'])
+    date_from = _parse_date(params.get('date_from'))
+    if date_from:
+        bookings = bookings.filter(start_date__gte=date_from)
+    date_to = _parse_date(params.get('date_to'))
+    if date_to:
+        bookings = bookings.filter(start_date__lte=date_to)
+
+    return {'users': users, 'machines': machines, 'bookings': bookings}
+
+
+def admin_listings(params, per_page=ADMIN_PAGE_SIZE):
+    """Filtered, keyset-paginated user/machine/booking tables for the admin dashboard.
+
+    ``params`` is the request's GET mapping.  Each table has its own cursor
+    parameter so paging one tab leaves the others where they were.
+    """
+    return {
+        table: keyset_page(queryset, params.get(f'{table}_after'), per_page)
+        for table, queryset in admin_tables(params).items()
+    }
@@ -0,0 +1,188 @@
+from array import array
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, DemandForecast, Machine, PriceSuggestion
+
+
+# Demand is counted in machine-days: a booking from the 3rd to the 5th adds
+# one booked machine to each of those three days. Daily series are built
+# with difference arrays (+1 on the first day, -1 after the last, then a
+# running sum), so a booking costs O(1) however long it is, and the
+# forecast is computed nightly by `manage.py compute_forecasts` into
+# DemandForecast / PriceSuggestion, which the dashboards read as-is.
+HISTORY_DAYS = 84
+HORIZON_DAYS = 7
+SEASON_WEEKS = 4
+DEMAND_STATUSES = ('pending', 'confirmed', 'completed')
+
+TARGET_UTILISATION = getattr(settings, 'PRICING_TARGET_UTILISATION', 0.6)
+PRICE_ELASTICITY = getattr(settings, 'PRICING_ELASTICITY', 0.5)
+MAX_PRICE_RAISE = getattr(settings, 'PRICING_MAX_RAISE', 0.20)
+MAX_PRICE_CUT = getattr(settings, 'PRICING_MAX_CUT', 0.15)
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def daily_counts(spans, first, days):
+    """``{key: array of booked machines per day}`` over ``days`` days from ``first``.
+
+    ``spans`` yields ``(key, start_date, end_date)`` with inclusive dates;
+    parts outside the window are clipped off.
+    """
+    diffs = {}
+    for key, start, end in spans:
+        lo = max((start - first).days, 0)
+        hi = min((end - first).days, days - 1)
+        if lo > hi:
+            continue
+        diff = diffs.get(key)
+        if diff is None:
+            diff = diffs[key] = array('l', [0]) * (days + 1)
+        diff[lo] += 1
+        diff[hi + 1] -= 1
+    return {key: array('l', accumulate(diff[:days])) for key, diff in diffs.items()}
+
+
+def forecast(series, history=HISTORY_DAYS, horizon=HORIZON_DAYS, weeks=SEASON_WEEKS):
+    """Expected booked machines for each of the ``horizon`` days after ``history``.
+
+    A day's baseline is the mean of the same weekday over the last ``weeks``
+    weeks, scaled by the trend of the last two weeks against the four before
+    them. Bookings already made for a day are a floor under its forecast.
+    """
+    recent = sum(series[history - 14:history]) / 14
+    earlier = sum(series[history - 42:history - 14]) / 28
+    trend = _clamp(recent / earlier, 0.5, 2.0) if earlier else 1.0
+    days = []
+    for i in range(history, history + horizon):
+        baseline = sum(series[i - 7 * w] for w in range(1, weeks + 1)) / weeks * trend
+        days.append(round(max(baseline, series[i]), 2))
+    return days
+
+
+def price_change(utilisation, demand_utilisation):
+    """Suggested price change in whole percent from 0-1 utilisation figures.
+
+    The machine's own recent utilisation and the forecast utilisation of its
+    type are weighed equally against TARGET_UTILISATION.
+    """
+    pressure = (utilisation + min(demand_utilisation, 1.0)) / 2
+    change = _clamp((pressure - TARGET_UTILISATION) * PRICE_ELASTICITY, -MAX_PRICE_CUT, MAX_PRICE_RAISE)
+    return round(change * 100)
+
+
+def _village(name):
+    return ' '.join(name.split()).title() if name else None
+
+
+def compute(today=None, chunk_size=5000):
+    """Recompute every DemandForecast and PriceSuggestion row from booking history.
+
+    History is the HISTORY_DAYS before ``today``; bookings already made for
+    the next HORIZON_DAYS count too. Reads the bookings in that window once.
+    """
+    today = today or timezone.localdate()
+    first = today - timedelta(days=HISTORY_DAYS)
+    days = HISTORY_DAYS + HORIZON_DAYS
+
+    rows = (
+        Booking.objects.filter(
+            status__in=DEMAND_STATUSES,
+            start_date__lt=first + timedelta(days=days),
+            end_date__gte=first,
+        )
+        .values_list('machine_id', 'machine__machine_type', 'farmer__village', 'start_date', 'end_date')
+        .iterator(chunk_size=chunk_size)
+    )
+    village_machines = {}
+
+    def spans():
+        for machine_id, machine_type, village, start, end in rows:
+            yield ('machine', machine_id), start, end
+            yield ('machine_type', machine_type), start, end
+            village = _village(village)
+            if village:
+                yield ('village', village), start, end
+                village_machines.setdefault(village, set()).add(machine_id)
+
+    series = daily_counts(spans(), first, days)
+
+    machines = list(Machine.objects.values_list(
+        'machine_id', 'owner_id', 'machine_type', 'price_per_day', 'approval_status',
+    ))
+    capacity = {}
+    for _, _, machine_type, _, status in machines:
+        if status == 'approved':
+            capacity[machine_type] = capacity.get(machine_type, 0) + 1
+
+    empty = array('l', [0]) * days
+    forecasts = []
+    demand = {}
+    for (scope, key), counts in series.items():
+        if scope == 'machine':
+            continue
+        machines_available = capacity.get(key, 0) if scope == 'machine_type' else len(village_machines[key])
+        booked = sum(counts[:HISTORY_DAYS])
+        predicted = forecast(counts)
+        forecasts.append(DemandForecast(
+            scope=scope, key=key, booked_days=booked, capacity=machines_available,
+            utilisation=round(booked * 100 / (machines_available * HISTORY_DAYS), 1) if machines_available else 0,
+            forecast_start=today, forecast=predicted,
+        ))
+        if scope == 'machine_type':
+            demand[key] = predicted
+
+    suggestions = []
+    for machine_id, owner_id, machine_type, price, _ in machines:
+        counts = series.get(('machine', machine_id), empty)
+        utilisation = sum(counts[:HISTORY_DAYS]) / HISTORY_DAYS
+        predicted = demand.get(machine_type, [0.0] * HORIZON_DAYS)
+        available = capacity.get(machine_type, 0)
+        demand_utilisation = sum(predicted) / (available * HORIZON_DAYS) if available else 0.0
+        change = price_change(utilisation, demand_utilisation)
+        suggestions.append(PriceSuggestion(
+            machine_id=machine_id, owner_id=owner_id, machine_type=machine_type,
+            current_price=price,
+            suggested_price=(price * (100 + change) / 100).quantize(Decimal('0.01')),
+            change_percent=change,
+            utilisation=round(utilisation * 100, 1),
+            demand_utilisation=round(demand_utilisation * 100, 1),
+            forecast_start=today, forecast=predicted,
+        ))
+
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(forecasts, batch_size=1000)
+        PriceSuggestion.objects.all().delete()
+        PriceSuggestion.objects.bulk_create(suggestions, batch_size=1000)
+    return {'forecasts': len(forecasts), 'suggestions': len(suggestions)}
+
+
+def owner_insights(owner, villages=3):
+    """Precomputed forecast and price suggestions for ``owner``'s dashboard (two queries)."""
+    suggestions = {s.machine_id: s for s in PriceSuggestion.objects.filter(owner=owner)}
+    chart = {'labels': [], 'data': []}
+    by_type = {}
+    for s in suggestions.values():
+        by_type.setdefault(s.machine_type, s)
+    if by_type:
+        start = next(iter(by_type.values())).forecast_start
+        chart['labels'] = [(start + timedelta(days=i)).strftime('%a %d %b') for i in range(HORIZON_DAYS)]
+        chart['data'] = [round(sum(s.forecast[i] for s in by_type.values()), 2) for i in range(HORIZON_DAYS)]
+    busiest = max(by_type.values(), key=lambda s: s.demand_utilisation, default=None)
+    return {
+        'suggestions': suggestions,
+        'forecast_chart': chart,
+        'busiest_type': busiest,
+        'busiest_villages': list(
+            DemandForecast.objects.filter(scope='village').order_by('-utilisation', 'key')[:villages]
+        ),
+    }
@@ -0,0 +1,133 @@
+import hashlib
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template import Context
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+
+# Machine cards and booking rows are rendered one object at a time from
+# their own small templates and cached under the pk and updated_at of every
+# row the fragment shows (plus any per-request figures it prints), so one
+# rendering serves every user until one of those rows is saved. updated_at
+# is auto_now, and the queryset .update() calls in lifecycle, moderation
+# and images set it too. A list is stitched from one get_many(); the misses
+# are rendered and stored with one set_many(). Keys also carry a hash of
+# the fragment template's source, so a deploy that edits the markup never
+# serves the old version.
+#
+# Fragments are shared between users, so they must not contain anything
+# user-specific. The one exception is {% csrf_token %}: it is rendered with
+# a placeholder that is swapped for the requesting user's token after
+# stitching.
+CACHE_ALIAS = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')
+TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 3600)
+
+HITS_KEY = 'frag:stats:hits'
+MISSES_KEY = 'frag:stats:misses'
+CSRF_PLACEHOLDER = 'FRAGMENT-CSRF-TOKEN'
+
+
+@dataclass(frozen=True)
+class Fragment:
+    template_name: str
+    variable: str  # the object's name inside the template
+    stamp: object  # obj -> the values the rendering depends on
+
+
+def _rows(*objects):
+    return tuple((type(obj).__name__, obj.pk, obj.updated_at) for obj in objects)
+
+
+def _owner_machine_stamp(machine):
+    occupancy = machine.occupancy or {}
+    return _rows(machine) + tuple(occupancy.get(k) for k in ('utilisation', 'current_idle', 'longest_idle'))
+
+
+FRAGMENTS = {
+    'machine_card': Fragment('booking/machine_card.html', 'm', lambda m: _rows(m) + (m.owner_id,)),
+    # Payments have no updated_at; the row shows only the first one's status.
+    'farmer_booking_row': Fragment(
+        'booking/farmer_booking_row.html', 'b',
+        lambda b: _rows(b, b.machine, b.owner) + tuple((p.pk, p.payment_status) for p in b.payment_list[:1]),
+    ),
+    'owner_machine_row': Fragment('booking/owner_machine_row.html', 'machine', _owner_machine_stamp),
+    'owner_booking_row': Fragment(
+        'booking/owner_booking_row.html', 'booking',
+        lambda b: _rows(b, b.machine, b.farmer) + (b.awaiting_cash,),
+    ),
+    'admin_machine_row': Fragment('booking/admin_machine_row.html', 'm', lambda m: _rows(m, m.owner)),
+    'admin_booking_row': Fragment('booking/admin_booking_row.html', 'b', lambda b: _rows(b, b.machine, b.farmer)),
+}
+
+_sources = {}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _incr(key, amount):
+    cache = _cache()
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def _template(fragment):
+    # The engine's own Template: rendering it is not counted again by the
+    # metrics backend, whose timer is already running for the page.
+    # A reloaded template (after an edit, in development) gets a new hash.
+    template = get_template(fragment.template_name).template
+    known, source = _sources.get(fragment.template_name, (None, None))
+    if known is not template:
+        source = hashlib.md5(template.source.encode(), usedforsecurity=False).hexdigest()
+        _sources[fragment.template_name] = (template, source)
+    return template, source
+
+
+def _key(name, source, obj, stamp):
+    digest = hashlib.md5(repr(stamp).encode(), usedforsecurity=False).hexdigest()
+    return f'frag:{name}:{obj.pk}:{source[:8]}{digest}'
+
+
+def render_many(name, objects, csrf_token=None):
+    """The ``name`` fragment of each of ``objects``, concatenated, rendering only those not cached."""
+    fragment = FRAGMENTS[name]
+    template, source = _template(fragment)
+    objects = list(objects)
+    keys = [_key(name, source, obj, fragment.stamp(obj)) for obj in objects]
+    found = _cache().get_many(keys) if keys else {}
+    rendered = {}
+    parts = []
+    for key, obj in zip(keys, objects):
+        html = found.get(key) or rendered.get(key)
+        if html is None:
+            html = rendered[key] = template.render(Context({fragment.variable: obj, 'csrf_token': CSRF_PLACEHOLDER}))
+        parts.append(html)
+    if rendered:
+        _cache().set_many(rendered, TIMEOUT)
+        _incr(MISSES_KEY, len(rendered))
+    if len(objects) > len(rendered):
+        _incr(HITS_KEY, len(objects) - len(rendered))
+
+    html = ''.join(parts)
+    if CSRF_PLACEHOLDER in html:
+        html = html.replace(CSRF_PLACEHOLDER, str(csrf_token or ''))
+    return mark_safe(html)
+
+
+def stats():
+    values = _cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 3) if total else 0.0,
+    }
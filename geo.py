@@ -0,0 +1,108 @@
+import math
+
+from django.db.models import Q
+
+from .availability import available_machines
+from .models import Machine
+
+
+# Machines are bucketed into a fixed grid of CELL_DEGREES x CELL_DEGREES
+# cells (about 11 km at 0.1 degrees), numbered row-major from the south-west
+# corner. The cells of one grid row are consecutive integers, so a disk
+# query becomes a handful of BETWEEN ranges on the (approval_status,
+# geo_cell) index, one per row it covers, in plain SQL on any database.
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+CELL_DEGREES = 0.1
+COLUMNS = round(360 / CELL_DEGREES)
+
+DEFAULT_RADIUS_KM = 25
+FIRST_RADIUS_KM = 5
+
+
+def parse_point(latitude, longitude):
+    """(lat, lon) floats from user input, or None when missing or out of range."""
+    try:
+        lat, lon = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def _row(lat):
+    return min(int((lat + 90) // CELL_DEGREES), round(180 / CELL_DEGREES) - 1)
+
+
+def _column(lon):
+    return min(int((lon + 180) // CELL_DEGREES), COLUMNS - 1)
+
+
+def cell(lat, lon):
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * COLUMNS + _column(lon)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def within(machines, lat, lon, radius_km):
+    """``machines`` narrowed to the grid cells and bounding box around a circle.
+
+    Rows in the box corners are still returned; callers measure the exact
+    distance of what comes back.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = min(180.0, radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6)))
+    south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    west, east = max(-180.0, lon - dlon), min(180.0, lon + dlon)
+    first, last = _column(west), _column(east)
+    cells = Q()
+    for row in range(_row(south), _row(north) + 1):
+        cells |= Q(geo_cell__range=(row * COLUMNS + first, row * COLUMNS + last))
+    return machines.filter(
+        cells, latitude__range=(south, north), longitude__range=(west, east),
+    )
+
+
+def nearest_available(lat, lon, start, end, radius_km=DEFAULT_RADIUS_KM, limit=10, machine_type=None):
+    """Up to ``limit`` approved machines free from start to end, nearest first, within ``radius_km``.
+
+    The search starts at FIRST_RADIUS_KM and doubles until it has ``limit``
+    machines or reaches ``radius_km``, so dense areas never read the whole
+    disk. Each returned machine carries ``distance_km``.
+    """
+    machines = Machine.objects.filter(approval_status='approved')
+    if machine_type:
+        machines = machines.filter(machine_type=machine_type)
+    machines = available_machines(machines, start, end)
+
+    radius = min(FIRST_RADIUS_KM, radius_km)
+    while True:
+        hits = []
+        for pk, machine_lat, machine_lon in within(machines, lat, lon, radius).values_list(
+            'machine_id', 'latitude', 'longitude',
+        ):
+            distance = distance_km(lat, lon, machine_lat, machine_lon)
+            if distance <= radius:
+                hits.append((distance, pk))
+        if len(hits) >= limit or radius >= radius_km:
+            break
+        radius = min(radius * 2, radius_km)
+
+    hits = sorted(hits)[:limit]
+    found = Machine.objects.select_related('owner').in_bulk([pk for _, pk in hits])
+    nearest = []
+    for distance, pk in hits:
+        machine = found.get(pk)  # None if deleted in between
+        if machine is not None:
+            machine.distance_km = round(distance, 2)
+            nearest.append(machine)
+    return nearest
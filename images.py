@@ -0,0 +1,87 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .jobs import task
+from .models import Machine
+from .storage import IMAGE_EXTENSIONS, THUMBNAIL_WIDTHS, machine_images, thumbnail_name
+
+
+MAX_UPLOAD_BYTES = getattr(settings, 'IMAGE_MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+MAX_PIXELS = 40_000_000
+WEBP_QUALITY = 75
+
+
+def validate_upload(upload):
+    """Raise ValueError unless ``upload`` is a reasonably sized JPEG, PNG or WebP image.
+
+    The upload is renamed with the extension of the format Pillow found, so
+    the stored file (and the Content-Type it is served with) never follows
+    the client's filename: a photo sent as ``x.html`` is kept as ``.jpg``.
+    """
+    if upload.size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Images must be smaller than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+    try:
+        with Image.open(upload) as image:
+            if image.width * image.height > MAX_PIXELS:
+                raise ValueError("Image dimensions are too large.")
+            image.verify()
+            extension = IMAGE_EXTENSIONS.get(image.format)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        extension = None
+    finally:
+        upload.seek(0)
+    if extension is None:
+        raise ValueError("Please upload a JPEG, PNG or WebP image.")
+    upload.name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+
+
+def _webp(image, width):
+    resized = image.copy()
+    resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+@task
+def make_thumbnails(machine_id):
+    """Write the WebP thumbnails of a machine's photo and record their widths.
+
+    Thumbnails are named after the content-addressed original, so a photo
+    shared by several machines is only resized once. Widths above the
+    original's are skipped; a photo narrower than every width gets one
+    thumbnail at its own size.
+    """
+    machine = Machine.objects.filter(pk=machine_id).only('machine_image').first()
+    name = machine.machine_image.name if machine and machine.machine_image else ''
+    if not name or not machine_images.exists(name):
+        return
+    with machine_images.open(name) as original, Image.open(original) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        widths = [w for w in THUMBNAIL_WIDTHS if w < image.width] or [image.width]
+        for width in widths:
+            thumb = thumbnail_name(name, width)
+            if not machine_images.exists(thumb):
+                machine_images.save_derived(thumb, ContentFile(_webp(image, width)))
+    # Only rows still showing this photo; it may have been replaced meanwhile.
+    Machine.objects.filter(machine_image=name).update(thumbnail_widths=widths, updated_at=timezone.now())
+
+
+def serve_media(request, path):
+    """Serve an uploaded file with far-future caching (its path changes whenever its bytes do).
+
+    Meant for development and small deployments; a front-end web server
+    should serve MEDIA_ROOT with the same headers in production.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
@@ -0,0 +1,177 @@
+import importlib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+# A job is a registered function plus JSON-serialisable arguments, stored
+# as a row and run by `manage.py run_jobs`. Enqueueing inside a transaction
+# is safe: the row only becomes visible to workers when that transaction
+# commits. Workers claim rows with a conditional UPDATE, so any number of
+# them can share the table without a broker or SELECT ... SKIP LOCKED.
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+BACKOFF_BASE = getattr(settings, 'JOBS_BACKOFF_SECONDS', 10)
+BACKOFF_MAX = getattr(settings, 'JOBS_BACKOFF_MAX_SECONDS', 3600)
+LEASE = timedelta(seconds=getattr(settings, 'JOBS_LEASE_SECONDS', 600))
+
+
+def task(fn):
+    """Register ``fn`` so it can be enqueued; only registered names are ever run."""
+    TASKS[_name(fn)] = fn
+    return fn
+
+
+def _name(fn):
+    return f'{fn.__module__}.{fn.__qualname__}'
+
+
+def _resolve(name):
+    # Task modules register on import; a worker may not have imported them yet.
+    module = name.rpartition('.')[0]
+    if name not in TASKS and module.startswith(f'{__package__}.'):
+        importlib.import_module(module)
+    return TASKS.get(name)
+
+
+def _registered_name(fn):
+    name = _name(fn)
+    if TASKS.get(name) is not fn:
+        raise ValueError(f"{name} is not a registered task; decorate it with @jobs.task.")
+    return name
+
+
+def enqueue(fn, *args, delay=0, max_attempts=5):
+    return Job.objects.create(
+        task=_registered_name(fn), args=list(args), max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_many(fn, arg_lists, delay=0, max_attempts=5, batch_size=1000):
+    """One job per entry of ``arg_lists``, inserted with bulk_create."""
+    name = _registered_name(fn)
+    run_at = timezone.now() + timedelta(seconds=delay)
+    return Job.objects.bulk_create(
+        [Job(task=name, args=list(args), max_attempts=max_attempts, run_at=run_at) for args in arg_lists],
+        batch_size=batch_size,
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``: exponential, jittered, capped."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run (their lease has expired)."""
+    return Job.objects.filter(status='running', locked_at__lt=timezone.now() - LEASE).update(
+        status='queued', locked_by='', locked_at=None,
+    )
+
+
+def claim(limit, worker):
+    """Up to ``limit`` due jobs, marked running for ``worker``."""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status='queued', run_at__lte=now)
+        .order_by('run_at', 'job_id').values_list('job_id', flat=True)[:limit * 2]
+    )
+    claimed = []
+    for job_id in candidates:
+        won = Job.objects.filter(job_id=job_id, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if won:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return list(Job.objects.filter(job_id__in=claimed).order_by('run_at', 'job_id'))
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome; never raises."""
+    try:
+        fn = _resolve(job.task)
+        if fn is None:
+            raise LookupError(f"Unknown task {job.task}")
+        fn(*job.args)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed for good:\n%s", job.job_id, job.task, error)
+            Job.objects.filter(pk=job.pk).update(status='failed', last_error=error, updated_at=timezone.now())
+        else:
+            retry_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+            logger.warning("Job %s (%s) failed, retrying at %s", job.job_id, job.task, retry_at)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', run_at=retry_at, locked_by='', locked_at=None,
+                last_error=error, updated_at=timezone.now(),
+            )
+        return False
+    Job.objects.filter(pk=job.pk).update(status='done', locked_by='', updated_at=timezone.now())
+    return True
+
+
+def run_pending(worker='inline'):
+    """Run every due job in this thread; returns how many ran. Used by tests and ``--once``."""
+    count = 0
+    while True:
+        claimed = claim(50, worker)
+        if not claimed:
+            return count
+        for job in claimed:
+            run_job(job)
+            count += 1
+
+
+def purge(days):
+    return Job.objects.filter(status='done', updated_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
+
+
+def _run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        # Pool threads each hold their own connection.
+        connection.close()
+
+
+def work(concurrency=4, poll_interval=1.0, keep_days=7, stop=None):
+    """Claim and run jobs on a thread pool until ``stop`` (a threading.Event) is set."""
+    stop = stop or threading.Event()
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    running = set()
+    last_maintenance = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as pool:
+        while not stop.is_set():
+            close_old_connections()
+            if last_maintenance is None or time.monotonic() - last_maintenance > LEASE.total_seconds():
+                requeue_stale()
+                purge(keep_days)
+                last_maintenance = time.monotonic()
+
+            free = concurrency - len(running)
+            if free:
+                running.update(pool.submit(_run_in_thread, job) for job in claim(free, worker))
+            if running:
+                running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED).not_done
+            else:
+                stop.wait(poll_interval)
+        wait(running)
@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import dashboard_cache, rollups
+from .models import Booking
+
+
+# Allowed Booking.status moves. Cancelled and completed are final.
+TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled'},
+    'confirmed': {'completed', 'cancelled'},
+    'cancelled': set(),
+    'completed': set(),
+}
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def can_transition(booking, status):
+    return status in TRANSITIONS.get(booking.status, ())
+
+
+def transition(booking, status):
+    """Move one booking to ``status`` and save it (signals fire as usual)."""
+    if not can_transition(booking, status):
+        raise InvalidTransition(f"Booking {booking.pk} cannot go from {booking.status} to {status}.")
+    booking.status = status
+    booking.save(update_fields=['status', 'updated_at'])
+
+
+def bulk_transition(bookings, from_status, to_status, batch_size=1000):
+    """Move every booking of ``bookings`` in ``from_status`` to ``to_status``.
+
+    Rows are updated with one set-based UPDATE per batch of primary keys
+    (each batch is its own short transaction), and the UPDATE re-checks the
+    old status, so overlapping runs never move a row twice. Moved rows drop
+    out of the filter, so each batch is simply the first ``batch_size`` rows
+    still matching it, read straight off the (status, end_date) index
+    without sorting the backlog. Save signals do
+    not fire for queryset updates, so the rollup buckets and dashboard
+    cache versions they would have touched are refreshed here per batch.
+    """
+    if to_status not in TRANSITIONS[from_status]:
+        raise InvalidTransition(f"Bookings cannot go from {from_status} to {to_status}.")
+
+    candidates = (
+        bookings.filter(status=from_status).order_by()
+        .values_list('pk', 'start_date', 'owner_id', 'farmer_id', 'machine__machine_type')
+    )
+    moved = 0
+    while True:
+        rows = list(candidates[:batch_size])
+        if not rows:
+            return moved
+        with transaction.atomic():
+            moved += Booking.objects.filter(pk__in=[r[0] for r in rows], status=from_status).update(
+                status=to_status, updated_at=timezone.now(),
+            )
+            keys = set()
+            for pk, start, owner_id, farmer_id, machine_type in rows:
+                if start is not None:
+                    keys.add((start.year, start.month, owner_id, machine_type, from_status))
+                    keys.add((start.year, start.month, owner_id, machine_type, to_status))
+            rollups.refresh_later(sorted(keys))
+        scopes = {f'owner:{r[2]}' for r in rows} | {f'farmer:{r[3]}' for r in rows}
+        dashboard_cache.bump('global', *sorted(scopes))
+        if len(rows) < batch_size:
+            return moved
+
+
+def sweep(today=None, batch_size=1000):
+    """Complete confirmed bookings and expire unpaid ones whose end_date has passed."""
+    today = today or timezone.localdate()
+    past = Booking.objects.filter(end_date__lt=today)
+    return {
+        'completed': bulk_transition(past, 'confirmed', 'completed', batch_size),
+        'expired': bulk_transition(past, 'pending', 'cancelled', batch_size),
+    }
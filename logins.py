@@ -0,0 +1,113 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+
+
+# Credential-stuffing bursts are rejected from two cache-backed token
+# buckets, one per email and one per client IP, before any password is
+# hashed. A bucket refills continuously; a successful login refills the
+# email bucket. Read-modify-write on the cache is not atomic, so under
+# heavy concurrency a few extra attempts can slip through, which is fine
+# for a throttle.
+CACHE_ALIAS = getattr(settings, 'LOGIN_THROTTLE_CACHE_ALIAS', 'default')
+RATES = getattr(settings, 'LOGIN_THROTTLE_RATES', {'email': (5, 300), 'ip': (30, 300)})
+
+HASH_COUNT_KEY = 'login:stats:hashes'
+HASH_CPU_KEY = 'login:stats:hash_cpu_us'
+REHASH_KEY = 'login:stats:rehashes'
+THROTTLED_KEY = 'login:stats:throttled'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _incr(key, amount=1):
+    cache = _cache()
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def _bucket_keys(request, email):
+    return {
+        'email': f'login:bucket:email:{(email or "").strip().lower()}',
+        'ip': f'login:bucket:ip:{request.META.get("REMOTE_ADDR", "")}',
+    }
+
+
+def throttle(request, email):
+    """Take one attempt from the email and IP buckets.
+
+    Returns 0 when the attempt may go ahead, otherwise the number of
+    seconds until it would be allowed (and nothing is taken).
+    """
+    cache = _cache()
+    keys = _bucket_keys(request, email)
+    states = cache.get_many(list(keys.values()))
+    now = time.time()
+    updated = {}
+    wait = 0
+    for kind, key in keys.items():
+        capacity, period = RATES[kind]
+        tokens, stamp = states.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * capacity / period)
+        if tokens < 1:
+            wait = max(wait, math.ceil((1 - tokens) * period / capacity))
+        updated[key] = (tokens - 1, now)
+    if wait:
+        _incr(THROTTLED_KEY)
+        return wait
+    cache.set_many(updated, timeout=max(period for _, period in RATES.values()))
+    return 0
+
+
+def login_succeeded(request, email):
+    _cache().delete(_bucket_keys(request, email)['email'])
+
+
+def verify_password(account, password):
+    """check_password() for a Farmer/Owner, upgrading a stale hash on success.
+
+    The thread CPU time spent hashing is accumulated for ``stats()``.
+    """
+    def upgrade(raw):
+        encoded = make_password(raw)
+        # update() rather than save(): no signals, no dashboard cache bumps.
+        type(account).objects.filter(pk=account.pk).update(password_hash=encoded)
+        account.password_hash = encoded
+        _incr(REHASH_KEY)
+
+    with hashing_timer():
+        return check_password(password, account.password_hash, setter=upgrade)
+
+
+class hashing_timer:
+    """Context manager adding the enclosed CPU time to the hashing metrics."""
+
+    def __enter__(self):
+        self.started = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        _incr(HASH_COUNT_KEY)
+        _incr(HASH_CPU_KEY, int((time.thread_time() - self.started) * 1_000_000))
+        return False
+
+
+def stats():
+    values = _cache().get_many([HASH_COUNT_KEY, HASH_CPU_KEY, REHASH_KEY, THROTTLED_KEY])
+    hashes = values.get(HASH_COUNT_KEY, 0)
+    cpu_ms = values.get(HASH_CPU_KEY, 0) / 1000
+    return {
+        'hashes': hashes,
+        'hash_cpu_ms': round(cpu_ms, 1),
+        'mean_hash_cpu_ms': round(cpu_ms / hashes, 2) if hashes else 0.0,
+        'rehashes': values.get(REHASH_KEY, 0),
+        'throttled': values.get(THROTTLED_KEY, 0),
+    }
@@ -0,0 +1,24 @@
+import os
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+# What the pages load on every visit; their sizes are reported after a build.
+BUNDLES = ('booking/css/app.css', 'booking/vendor/chart.js/chart.umd.min.js')
+
+
+class Command(BaseCommand):
+    help = ("Collect the static files under content-hashed names with precompressed variants. "
+            "app.css itself is prebuilt; see tailwind.css.")
+
+    def handle(self, *args, **options):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        for name in BUNDLES:
+            hashed = staticfiles_storage.stored_name(name)
+            path = staticfiles_storage.path(hashed)
+            sizes = [f"{os.path.getsize(path) / 1024:.1f} KiB"]
+            for suffix, label in (('.gz', 'gzipped'), ('.br', 'brotli')):
+                if os.path.exists(path + suffix):
+                    sizes.append(f"{os.path.getsize(path + suffix) / 1024:.1f} KiB {label}")
+            self.stdout.write(self.style.SUCCESS(f"{hashed}: {', '.join(sizes)}."))
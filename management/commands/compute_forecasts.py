@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from booking import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the demand forecasts and per-machine price suggestions shown on the owner "
+        "dashboard from recent booking history. Meant to run nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--today', type=date.fromisoformat, help="Override today's date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        counts = forecasting.compute(today=options['today'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {counts['forecasts']} demand forecasts and {counts['suggestions']} price suggestions."
+        ))
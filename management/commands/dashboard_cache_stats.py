@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from booking import dashboard_cache, fragments
+
+
+class Command(BaseCommand):
+    help = ("Show dashboard and fragment cache hit/miss counters "
+            "(meaningful for shared backends such as the file cache).")
+
+    def handle(self, *args, **options):
+        stats = dashboard_cache.stats()
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']}")
+        stats = fragments.stats()
+        self.stdout.write(
+            f"fragments: hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']}"
+        )
@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from booking import bulk_io
+
+
+class Command(BaseCommand):
+    help = "Stream bookings (or payments) as CSV or JSON, in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', action='store_true', help="Export payments instead of bookings.")
+        parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+        parser.add_argument('--owner', type=int, help="Only this owner id.")
+        parser.add_argument('--status')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat)
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('-o', '--output', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        export = bulk_io.payment_export if options['payments'] else bulk_io.booking_export
+        columns, queryset = export(
+            owner_id=options['owner'], status=options['status'],
+            date_from=options['date_from'], date_to=options['date_to'],
+        )
+        chunks = bulk_io.stream_rows(columns, queryset, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,42 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import bulk_io
+from booking.models import Owner
+
+
+class Command(BaseCommand):
+    help = "Bulk-import an owner's machines from a CSV (header row) or JSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help="Owner id or email.")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--update', action='store_true',
+                            help="Overwrite this owner's machines whose machine_number already exists.")
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['owner']} if options['owner'].isdigit() else {'email': options['owner']}
+        try:
+            owner = Owner.objects.get(**lookup)
+        except Owner.DoesNotExist:
+            raise CommandError(f"Owner {options['owner']} does not exist.")
+
+        fmt = options['format'] or bulk_io.format_for(options['path'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                result = bulk_io.import_machines(
+                    owner, bulk_io.read_rows(stream, fmt),
+                    batch_size=options['batch_size'], update=options['update'],
+                )
+        except (OSError, ValueError, csv.Error) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Row {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, skipped {result.skipped} "
+            f"existing, rejected {len(result.errors)} rows."
+        ))
@@ -0,0 +1,54 @@
+import io
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Summarise the slow-request profiles written by the metrics middleware, per view."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Profile directory (default: settings.METRICS_PROFILE_DIR).")
+        parser.add_argument('--view', help="Only this view (as named in the profile files).")
+        parser.add_argument('--limit', type=int, default=15, help="Functions to list per view.")
+        parser.add_argument('--sort', default='cumulative', help="pstats sort key, e.g. cumulative or tottime.")
+        parser.add_argument('--clear', action='store_true', help="Delete the profiles after reporting.")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or getattr(settings, 'METRICS_PROFILE_DIR', None)
+        if not directory:
+            raise CommandError("No profile directory: pass --dir or set METRICS_PROFILE_DIR.")
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} does not exist.")
+
+        # Files are named <view>.<timestamp>.<duration>ms.prof.
+        by_view = {}
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.prof'):
+                continue
+            view, _, rest = filename.partition('.')
+            if options['view'] and view != options['view']:
+                continue
+            milliseconds = int(rest.rsplit('.', 2)[-2].removesuffix('ms'))
+            by_view.setdefault(view, []).append((milliseconds, os.path.join(directory, filename)))
+
+        if not by_view:
+            self.stdout.write("No profiles found.")
+            return
+        for view, profiles in sorted(by_view.items(), key=lambda item: -sum(ms for ms, _ in item[1])):
+            durations = sorted(ms for ms, _ in profiles)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{view}: {len(profiles)} slow request(s), "
+                f"median {durations[len(durations) // 2]} ms, max {durations[-1]} ms"
+            ))
+            out = io.StringIO()
+            stats = pstats.Stats(*(path for _, path in profiles), stream=out)
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+            self.stdout.write(out.getvalue())
+
+        if options['clear']:
+            for profiles in by_view.values():
+                for _, path in profiles:
+                    os.remove(path)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from booking import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly booking/revenue rollup table from bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows."))
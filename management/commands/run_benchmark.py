@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Run a registered benchmark against synthetic data (rolled back or cleaned up afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help=f"One of: {', '.join(sorted(benchmarks.BENCHMARKS))}")
+        parser.add_argument(
+            '--option', '-o', action='append', default=[], metavar='KEY=VALUE',
+            help="Benchmark keyword argument, e.g. -o machines=100000 (integers only).",
+        )
+        parser.add_argument(
+            '--output', metavar='PATH',
+            help="Also write the result to PATH as JSON with sorted keys, for diffing between commits.",
+        )
+
+    def handle(self, *args, **options):
+        if options['name'] not in benchmarks.BENCHMARKS:
+            raise CommandError(f"Unknown benchmark {options['name']!r}.")
+        kwargs = {}
+        for item in options['option']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f"Expected KEY=VALUE, got {item!r}.")
+            try:
+                kwargs[key] = int(value)
+            except ValueError:
+                raise CommandError(f"{key} must be an integer.")
+        result = benchmarks.run(options['name'], **kwargs)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'benchmark': options['name'], 'options': kwargs, 'result': result}, f,
+                          indent=2, sort_keys=True)
+                f.write('\n')
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from booking import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs on a thread pool until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--keep-days', type=int, default=7, help="Delete finished jobs older than this.")
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due now, then exit.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            jobs.requeue_stale()
+            count = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} jobs."))
+            return
+
+        self.stdout.write(f"Running jobs with {options['concurrency']} threads; Ctrl-C to stop.")
+        try:
+            jobs.work(
+                concurrency=options['concurrency'],
+                poll_interval=options['poll_interval'],
+                keep_days=options['keep_days'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import benchmarks, dashboard_cache, rollups, search
+from booking.models import Owner
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert synthetic owners, farmers, machines, bookings and payments (kept, not rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Approximate total rows across all tables.")
+        for table in benchmarks.SEED_MIX:
+            parser.add_argument(f'--{table}', type=int, help=f"Exact number of {table} (overrides --rows).")
+        parser.add_argument('--prefix', default='seed', help="Marks the rows' emails and machine numbers.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for repeatable data.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-indexes', action='store_true',
+            help="Do not rebuild the rollup table and search index afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if Owner.objects.filter(email__startswith=f'{prefix}-owner-').exists():
+            raise CommandError(f"Rows with prefix {prefix!r} already exist; choose another --prefix.")
+
+        started = time.perf_counter()
+        counts = benchmarks.seed_synthetic(
+            rows=options['rows'], prefix=prefix, seed=options['seed'], batch_size=options['batch_size'],
+            **{table: options[table] for table in benchmarks.SEED_MIX},
+        )
+        self.stdout.write(', '.join(f'{count} {table}' for table, count in counts.items())
+                          + f" in {time.perf_counter() - started:.1f}s.")
+
+        if not options['skip_indexes']:
+            rollups.rebuild(batch_size=options['batch_size'])
+            search.rebuild_index(batch_size=options['batch_size'])
+        dashboard_cache.bump('global')
+        self.stdout.write(self.style.SUCCESS("Seeded."))
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from booking import lifecycle
+
+
+class Command(BaseCommand):
+    help = (
+        "Complete confirmed bookings and cancel unpaid pending ones whose end date has passed. "
+        "Cheap when there is nothing to do, so it can run from cron every minute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--today', type=date.fromisoformat, help="Override today's date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        counts = lifecycle.sweep(today=options['today'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed {counts['completed']} bookings, expired {counts['expired']}."
+        ))
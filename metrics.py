@@ -0,0 +1,289 @@
+import contextvars
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# Per-view request metrics kept in this process: running totals plus the
+# last WINDOW requests of each view in a ring buffer (a bounded deque), from
+# which the p50/p95/p99 figures are taken. Queries are counted by an
+# execute wrapper installed on every database connection and template time
+# by the TimedDjangoTemplates backend; both add to the collector of the
+# request being served, found through a context variable so threads and
+# async views report to the right request. Each worker process keeps its own
+# figures, as Prometheus expects of a scrape target.
+WINDOW = getattr(settings, 'METRICS_WINDOW', 1000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class _Sample:
+    __slots__ = ('queries', 'db_seconds', 'template_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+class _ViewStats:
+    def __init__(self, window):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        # (duration, queries) of the most recent requests.
+        self.recent = deque(maxlen=window)
+
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Recorder:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, seconds, sample, status_code):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = _ViewStats(self.window)
+            stats.requests += 1
+            stats.errors += status_code >= 500
+            stats.seconds += seconds
+            stats.queries += sample.queries
+            stats.db_seconds += sample.db_seconds
+            stats.template_seconds += sample.template_seconds
+            stats.recent.append((seconds, sample.queries))
+
+    def snapshot(self):
+        """``{view: totals}`` with latency and queries-per-request quantiles over the ring buffer."""
+        with self._lock:
+            views = {
+                view: (stats.requests, stats.errors, stats.seconds, stats.queries,
+                       stats.db_seconds, stats.template_seconds, list(stats.recent))
+                for view, stats in self._views.items()
+            }
+        result = {}
+        for view, (requests, errors, seconds, queries, db_seconds, template_seconds, recent) in views.items():
+            durations = sorted(d for d, _ in recent)
+            counts = sorted(q for _, q in recent)
+            result[view] = {
+                'requests': requests,
+                'errors': errors,
+                'seconds': seconds,
+                'queries': queries,
+                'db_seconds': db_seconds,
+                'template_seconds': template_seconds,
+                'latency': {q: _quantile(durations, q) for q in QUANTILES} if durations else {},
+                'queries_per_request': {q: _quantile(counts, q) for q in QUANTILES} if counts else {},
+            }
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+recorder = Recorder()
+
+
+# ---------------------- COLLECTION ----------------------
+def _record_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # Fired on every (re)connect of the same wrapper object; install once.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render (includes count toward their parent)."""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+# ---------------------- PROFILING ----------------------
+# cProfile slows the profiled request several times over, so only a random
+# METRICS_PROFILE_SAMPLE_RATE share of requests is profiled, one at a time
+# per process, and the profile is kept only if the request still took at
+# least METRICS_SLOW_REQUEST_MS. `manage.py profile_report` summarises them.
+# Under ASGI requests are not profiled: cProfile follows a thread, and the
+# event loop's thread interleaves many requests.
+_profile_lock = threading.Lock()
+
+
+def profile_filename(view, milliseconds):
+    safe = re.sub(r'[^\w-]', '_', view)
+    return f'{safe}.{time.time_ns()}.{milliseconds}ms.prof'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.profile_dir = getattr(settings, 'METRICS_PROFILE_DIR', None)
+        self.sample_rate = getattr(settings, 'METRICS_PROFILE_SAMPLE_RATE', 0.01)
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500) / 1000
+
+    def _start_profiler(self):
+        if not self.profile_dir or random.random() >= self.sample_rate:
+            return None
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler (e.g. coverage) owns the hook
+            _profile_lock.release()
+            return None
+        return profiler
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = _Sample()
+        token = _current.set(sample)
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            seconds = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+            _current.reset(token)
+
+        view = _view_name(request)
+        recorder.record(view, seconds, sample, response.status_code)
+        if profiler is not None and seconds >= self.slow_seconds:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.profile_dir, profile_filename(view, round(seconds * 1000))))
+        return response
+
+    async def __acall__(self, request):
+        sample = _Sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            seconds = time.perf_counter() - started
+            _current.reset(token)
+        recorder.record(_view_name(request), seconds, sample, response.status_code)
+        return response
+
+
+# ---------------------- PROMETHEUS ----------------------
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(snapshot):
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            rendered = ','.join(f'{k}="{_label(v)}"' for k, v in labels)
+            lines.append(f'{name}{suffix}{{{rendered}}} {value}' if rendered else f'{name}{suffix} {value}')
+
+    views = sorted(snapshot.items())
+    family('agri_http_requests_total', 'counter', 'Requests served, by view.',
+           [('', [('view', v)], s['requests']) for v, s in views])
+    family('agri_http_server_errors_total', 'counter', 'Requests answered with a 5xx status, by view.',
+           [('', [('view', v)], s['errors']) for v, s in views])
+    family('agri_http_request_duration_seconds', 'summary',
+           f'Request latency; quantiles over the last {WINDOW} requests of each view.',
+           [('', [('view', v), ('quantile', q)], value) for v, s in views for q, value in s['latency'].items()]
+           + [(suffix, [('view', v)], s[key]) for v, s in views
+              for suffix, key in (('_sum', 'seconds'), ('_count', 'requests'))])
+    family('agri_db_queries_total', 'counter', 'SQL queries run while serving requests, by view.',
+           [('', [('view', v)], s['queries']) for v, s in views])
+    family('agri_db_queries_per_request', 'gauge',
+           f'SQL queries per request; quantiles over the last {WINDOW} requests of each view.',
+           [('', [('view', v), ('quantile', q)], value)
+            for v, s in views for q, value in s['queries_per_request'].items()])
+    family('agri_db_query_seconds_total', 'counter', 'Time spent in SQL queries, by view.',
+           [('', [('view', v)], s['db_seconds']) for v, s in views])
+    family('agri_template_render_seconds_total', 'counter', 'Time spent rendering templates, by view.',
+           [('', [('view', v)], s['template_seconds']) for v, s in views])
+    return '\n'.join(lines) + '\n'
+
+
+def _authorised(request):
+    token = getattr(settings, 'METRICS_BEARER_TOKEN', None)
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[7:], token):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def metrics_view(request):
+    """This process's metrics in the Prometheus text format, for admins or the scrape token."""
+    if not _authorised(request):
+        return HttpResponseForbidden("Admins only.")
+    return HttpResponse(
+        prometheus_text(recorder.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -3,6 +3,8 @@ from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import User
 
+from .storage import machine_images, thumbnail_name
+
 
 class Admin(models.Model):
     name = models.CharField(max_length=100)
@@ -24,6 +26,8 @@ class Owner(models.Model):
     email = models.EmailField(unique=True)
     password_hash = models.CharField(max_length=255)
     address = models.TextField(null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -53,16 +57,53 @@ class Machine(models.Model):
     crops_supported = models.TextField(null=True, blank=True)
     price_per_day = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField(null=True, blank=True)
-    machine_image = models.CharField(max_length=255, null=True, blank=True)
+    # Stored under the hash of its bytes; thumbnail_widths lists the WebP sizes made so far (see images.py).
+    machine_image = models.ImageField(upload_to='machines', storage=machine_images, max_length=255, null=True, blank=True)
+    thumbnail_widths = models.JSONField(default=list, blank=True)
     approval_status = models.CharField(max_length=10, choices=APPROVAL_CHOICES, default='pending')
+    # Where the machine is kept; geo_cell is derived from it on save (see geo.py).
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.machine_name
 
+    @property
+    def image_url(self):
+        name = self.machine_image.name if self.machine_image else ''
+        if not name:
+            return ''
+        # Rows imported from CSV/JSON may hold an external URL instead of a stored file.
+        if name.startswith(('http://', 'https://', '/')):
+            return name
+        return self.machine_image.url
+
+    @property
+    def thumbnail_url(self):
+        """The smallest thumbnail at least 320px wide, else the largest one, else the original."""
+        widths = sorted(self.thumbnail_widths or ())
+        if not widths:
+            return self.image_url
+        width = next((w for w in widths if w >= 320), widths[-1])
+        return machine_images.url(thumbnail_name(self.machine_image.name, width))
+
+    @property
+    def image_srcset(self):
+        return ', '.join(
+            f'{machine_images.url(thumbnail_name(self.machine_image.name, w))} {w}w'
+            for w in sorted(self.thumbnail_widths or ())
+        )
+
     class Meta:
         db_table = 'machine'
+        indexes = [
+            models.Index(fields=['approval_status', 'machine_type'], name='machine_status_type_idx'),
+            models.Index(fields=['approval_status', 'price_per_day'], name='machine_status_price_idx'),
+            models.Index(fields=['approval_status', 'geo_cell'], name='machine_status_cell_idx'),
+        ]
 
 
 # ---------------------------
@@ -77,6 +118,8 @@ class Farmer(models.Model):
     village = models.CharField(max_length=100, null=True, blank=True)
     password_hash = models.CharField(max_length=255)
     address = models.TextField(null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -115,6 +158,12 @@ class Booking(models.Model):
 
     class Meta:
         db_table = 'bookings'
+        indexes = [
+            models.Index(fields=['machine', 'status', 'start_date', 'end_date'], name='booking_availability_idx'),
+            models.Index(fields=['status', 'start_date'], name='booking_status_start_idx'),
+            # Lets the lifecycle sweeper find finished bookings without a scan.
+            models.Index(fields=['status', 'end_date'], name='booking_status_end_idx'),
+        ]
 
 # ---------------------------
 # Payments Model
@@ -141,6 +190,8 @@ class Payment(models.Model):
     payment_date = models.DateTimeField(auto_now_add=True)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='pending')
+    # Client-generated per payment form; a replayed submission finds its payment by key.
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     def __str__(self):
         return f"Payment {self.payment_id} - {self.payment_status}"
@@ -169,3 +220,163 @@ class OwnerBankDetails(models.Model):
     class Meta:
         db_table = 'owner_bank_details'
 
+
+# ---------------------------
+# Monthly Rollup Model
+# ---------------------------
+class MonthlyRollup(models.Model):
+    # Bookings bucketed by the month of their start_date.
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, db_column='owner_id')
+    machine_type = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    booking_count = models.PositiveIntegerField(default=0)
+    booking_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} {self.machine_type} {self.status}"
+
+    class Meta:
+        db_table = 'monthly_rollup'
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month', 'owner', 'machine_type', 'status'], name='monthly_rollup_key'),
+        ]
+
+
+# ---------------------------
+# Machine Search Index Model
+# ---------------------------
+class MachineSearchTerm(models.Model):
+    # Inverted index over the machine text fields, maintained on save (see search.py).
+    term = models.CharField(max_length=64)
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, db_column='machine_id')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.term} -> {self.machine_id}"
+
+    class Meta:
+        db_table = 'machine_search_term'
+        indexes = [
+            # Covers prefix range scans together with the columns they aggregate.
+            models.Index(fields=['term', 'machine', 'weight'], name='search_term_covering_idx'),
+        ]
+
+
+
+# ---------------------------
+# Background Job Model
+# ---------------------------
+class Job(models.Model):
+    # Rows of the in-database job queue (see jobs.py).
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    job_id = models.AutoField(primary_key=True)
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Job {self.job_id} {self.task} - {self.status}"
+
+    class Meta:
+        db_table = 'jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_ready_idx'),
+        ]
+
+
+# ---------------------------
+# Demand Forecast Model
+# ---------------------------
+class DemandForecast(models.Model):
+    # Nightly output of forecasting.compute(); one row per machine type or village.
+    SCOPE_CHOICES = [
+        ('machine_type', 'Machine type'),
+        ('village', 'Village'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=100)
+    booked_days = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+    utilisation = models.FloatField(default=0)
+    forecast_start = models.DateField()
+    forecast = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    class Meta:
+        db_table = 'demand_forecast'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='demand_forecast_key'),
+        ]
+
+
+# ---------------------------
+# Price Suggestion Model
+# ---------------------------
+class PriceSuggestion(models.Model):
+    # Nightly per-machine price advice, read as-is by the owner dashboard.
+    machine = models.OneToOneField(Machine, on_delete=models.CASCADE, primary_key=True, db_column='machine_id')
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, db_column='owner_id')
+    machine_type = models.CharField(max_length=100)
+    current_price = models.DecimalField(max_digits=10, decimal_places=2)
+    suggested_price = models.DecimalField(max_digits=10, decimal_places=2)
+    change_percent = models.SmallIntegerField(default=0)
+    utilisation = models.FloatField(default=0)
+    demand_utilisation = models.FloatField(default=0)
+    forecast_start = models.DateField()
+    forecast = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.machine_id}: {self.current_price} -> {self.suggested_price}"
+
+    class Meta:
+        db_table = 'price_suggestion'
+
+
+# ---------------------------
+# Moderation Audit Model
+# ---------------------------
+class ModerationAudit(models.Model):
+    # One row per machine per moderation action (see moderation.py); rows
+    # written by the same call share ``batch``.
+    audit_id = models.BigAutoField(primary_key=True)
+    batch = models.CharField(max_length=32)
+    machine = models.ForeignKey(Machine, on_delete=models.SET_NULL, null=True, db_column='machine_id')
+    machine_number = models.CharField(max_length=50)
+    owner_id = models.IntegerField()
+    admin = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    previous_status = models.CharField(max_length=10, choices=Machine.APPROVAL_CHOICES)
+    new_status = models.CharField(max_length=10, choices=Machine.APPROVAL_CHOICES)
+    reason = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.machine_number}: {self.previous_status} -> {self.new_status}"
+
+    class Meta:
+        db_table = 'moderation_audit'
+        indexes = [
+            models.Index(fields=['machine', 'created_at'], name='moderation_machine_idx'),
+            models.Index(fields=['batch'], name='moderation_batch_idx'),
+        ]
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .jobs import task
+from .models import Booking, Machine, Payment
+
+
+# Notification tasks run on the job queue (see jobs.py), never in a
+# request. They take ids rather than instances and re-read the rows, so a
+# retry sees the current state.
+def _send(subject, body, recipient):
+    if recipient:
+        send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient])
+
+
+@task
+def machine_reviewed(machine_id):
+    machine = Machine.objects.select_related('owner').filter(pk=machine_id).first()
+    if machine is None or machine.approval_status == 'pending':
+        return
+    _send(
+        f"Your machine {machine.machine_name} was {machine.approval_status}",
+        f"Hello {machine.owner.name},\n\n{machine.machine_name} ({machine.machine_number}) "
+        f"has been {machine.approval_status} by the Agri_Machine team.",
+        machine.owner.email,
+    )
+
+
+@task
+def machines_reviewed(owner_id, machine_ids):
+    """One email telling an owner the outcome of their machines reviewed in a moderation batch."""
+    machines = list(
+        Machine.objects.select_related('owner').filter(owner_id=owner_id, pk__in=machine_ids)
+        .exclude(approval_status='pending').order_by('machine_name')
+    )
+    if not machines:
+        return
+    if len(machines) == 1:
+        return machine_reviewed(machines[0].machine_id)
+    lines = '\n'.join(f"- {m.machine_name} ({m.machine_number}): {m.approval_status}" for m in machines)
+    _send(
+        f"{len(machines)} of your machines were reviewed",
+        f"Hello {machines[0].owner.name},\n\nThe Agri_Machine team has reviewed your machines:\n\n{lines}",
+        machines[0].owner.email,
+    )
+
+
+@task
+def booking_confirmed(booking_id):
+    booking = Booking.objects.select_related('machine', 'farmer', 'owner').filter(pk=booking_id).first()
+    if booking is None or booking.status != 'confirmed':
+        return
+    dates = f"{booking.start_date} to {booking.end_date}"
+    _send(
+        f"Booking #{booking.booking_id} confirmed",
+        f"Hello {booking.farmer.name},\n\nYour booking of {booking.machine.machine_name} for {dates} "
+        f"is confirmed. Total: ₹{booking.total_price}.",
+        booking.farmer.email,
+    )
+    _send(
+        f"New booking #{booking.booking_id} for {booking.machine.machine_name}",
+        f"Hello {booking.owner.name},\n\n{booking.farmer.name} ({booking.farmer.phone}) has booked "
+        f"{booking.machine.machine_name} for {dates}.",
+        booking.owner.email,
+    )
+
+
+@task
+def cash_payment_confirmed(payment_id):
+    payment = Payment.objects.select_related('booking', 'farmer').filter(pk=payment_id).first()
+    if payment is None or payment.payment_status != 'completed':
+        return
+    _send(
+        f"Cash payment received for booking #{payment.booking_id}",
+        f"Hello {payment.farmer.name},\n\nThe owner has confirmed your cash payment of ₹{payment.amount}.",
+        payment.farmer.email,
+    )
@@ -0,0 +1,140 @@
+import calendar
+from datetime import timedelta
+
+from .models import Booking, Machine
+
+
+# Each machine's occupancy over a window is one Python int used as a
+# bitmap, bit i standing for day ``first + i``. A booking is OR-ed in as a
+# single shifted run of ones, so its length does not matter and overlapping
+# bookings never count a day twice; counting, masking and run-length work
+# then happen on whole bitmaps in C (int.bit_count(), &, str.split()).
+OCCUPYING_STATUSES = ('confirmed', 'completed')
+WEEKDAYS = list(calendar.day_abbr)
+
+
+def bitmaps(rows, first, days):
+    """``{machine_id: bitmap}`` from ``(machine_id, start_date, end_date)`` rows, clipped to the window."""
+    base = first.toordinal()
+    maps = {}
+    for machine_id, start, end in rows:
+        lo = max(start.toordinal() - base, 0)
+        hi = min(end.toordinal() - base, days - 1)
+        if lo <= hi:
+            maps[machine_id] = maps.get(machine_id, 0) | (((1 << (hi - lo + 1)) - 1) << lo)
+    return maps
+
+
+def idle_streaks(bits, days):
+    """(longest run of idle days, idle days since the last booked day) in a ``days``-day bitmap."""
+    if not bits:
+        return days, days
+    # Most significant bit first, so the window end is on the left.
+    text = format(bits, f'0{days}b')
+    return max(map(len, text.split('1'))), days - bits.bit_length()
+
+
+class Occupancy:
+    """Booked-day bitmaps of a set of machines between ``first`` and ``last`` (inclusive).
+
+    Built from one query over the machines and one streamed query over the
+    bookings that touch the window. Statistics come per machine, per owner
+    and per machine type; each carries a month x weekday heatmap of the
+    share of machine-days that were booked.
+    """
+
+    def __init__(self, first, last, machines=None, statuses=OCCUPYING_STATUSES, chunk_size=10000):
+        self.first = first
+        self.last = last
+        self.days = (last - first).days + 1
+        bookings = Booking.objects.filter(status__in=statuses, start_date__lte=last, end_date__gte=first)
+        if machines is None:
+            machines = Machine.objects.all()
+        else:
+            bookings = bookings.filter(machine__in=machines)
+        self.machines = {
+            pk: (owner_id, machine_type)
+            for pk, owner_id, machine_type in machines.values_list('machine_id', 'owner_id', 'machine_type')
+        }
+        self.bitmaps = bitmaps(
+            bookings.values_list('machine_id', 'start_date', 'end_date').iterator(chunk_size=chunk_size),
+            first, self.days,
+        )
+        self._months, self._masks, self._capacity = self._heatmap_masks()
+        self._machine_stats = None
+
+    def _heatmap_masks(self):
+        """Month labels, one bitmap per (month, weekday) cell and the number of days in each cell."""
+        months, masks, capacity = [], [], []
+        for i in range(self.days):
+            day = self.first + timedelta(days=i)
+            label = f'{calendar.month_abbr[day.month]} {day.year}'
+            if not months or months[-1] != label:
+                months.append(label)
+                masks.append([0] * 7)
+                capacity.append([0] * 7)
+            masks[-1][day.weekday()] |= 1 << i
+            capacity[-1][day.weekday()] += 1
+        return months, masks, capacity
+
+    def _stats(self, bits):
+        longest, current = idle_streaks(bits, self.days)
+        booked = bits.bit_count()
+        return {
+            'machines': 1,
+            'booked_days': booked,
+            'utilisation': round(booked * 100 / self.days, 1),
+            'longest_idle': longest,
+            'current_idle': current,
+            'heatmap': [[(bits & mask).bit_count() for mask in row] for row in self._masks],
+        }
+
+    def per_machine(self):
+        """``{machine_id: stats}``; heatmap cells are booked-day counts."""
+        if self._machine_stats is None:
+            self._machine_stats = {pk: self._stats(self.bitmaps.get(pk, 0)) for pk in self.machines}
+        return self._machine_stats
+
+    def _grouped(self, index):
+        groups = {}
+        for pk, stats in self.per_machine().items():
+            key = self.machines[pk][index]
+            group = groups.get(key)
+            if group is None:
+                groups[key] = group = {
+                    'machines': 0, 'booked_days': 0, 'idle_machines': 0, 'longest_idle': 0,
+                    'heatmap': [[0] * 7 for _ in self._months],
+                }
+            group['machines'] += 1
+            group['booked_days'] += stats['booked_days']
+            group['idle_machines'] += not stats['booked_days']
+            group['longest_idle'] = max(group['longest_idle'], stats['longest_idle'])
+            for total, counts in zip(group['heatmap'], stats['heatmap']):
+                for weekday, count in enumerate(counts):
+                    total[weekday] += count
+        for group in groups.values():
+            group['utilisation'] = round(group['booked_days'] * 100 / (group['machines'] * self.days), 1)
+        return groups
+
+    def per_owner(self):
+        """``{owner_id: stats}`` summed over the owner's machines."""
+        return self._grouped(0)
+
+    def per_type(self):
+        return self._grouped(1)
+
+    def heatmap(self, stats):
+        """``stats['heatmap']`` as percentages: (month label, [7 weekday values or None])."""
+        machines = stats['machines']
+        return [
+            (label, [round(c * 100 / (n * machines), 1) if n else None for c, n in zip(counts, days)])
+            for label, counts, days in zip(self._months, stats['heatmap'], self._capacity)
+        ]
+
+    def monthly(self, stats):
+        """(month label, percentage of machine-days booked) for each month of the window."""
+        machines = stats['machines']
+        return [
+            (label, round(sum(counts) * 100 / (sum(days) * machines), 1))
+            for label, counts, days in zip(self._months, stats['heatmap'], self._capacity)
+        ]
@@ -0,0 +1,44 @@
+class KeysetPage:
+    """One newest-first page of rows plus the cursor for the following page."""
+
+    def __init__(self, rows, next_cursor, cursor):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def parse_cursor(value):
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def keyset_page(queryset, cursor=None, per_page=50):
+    """Page ``queryset`` by primary key instead of OFFSET.
+
+    Rows are ordered by descending pk and the page starts strictly below
+    ``cursor`` (the pk of the last row already shown), so every page costs
+    one index range scan of ``per_page + 1`` rows no matter how deep it is.
+    """
+    cursor = parse_cursor(cursor)
+    qs = queryset.order_by('-pk')
+    if cursor:
+        qs = qs.filter(pk__lt=cursor)
+    rows = list(qs[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = rows[-1].pk
+    return KeysetPage(rows, next_cursor, cursor)
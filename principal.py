@@ -0,0 +1,174 @@
+import functools
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import login as auth_login, logout as auth_logout
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import caches
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from .models import Farmer, Owner
+
+
+# Who is making a request. Farmers and owners sign in against their own
+# tables and are remembered by id in the session; admins are Django staff
+# users (request.user). PrincipalMiddleware puts the resolved principal on
+# request.principal, loaded on first use and at most once per request.
+# Farmer and Owner rows are cached for CACHE_TIMEOUT seconds without their
+# password hash, so most requests make no identity query at all; signals
+# drop the cached row when it is saved or deleted.
+CACHE_ALIAS = getattr(settings, 'PRINCIPAL_CACHE_ALIAS', 'default')
+CACHE_TIMEOUT = getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 60)
+
+ACCOUNTS = {'farmer': Farmer, 'owner': Owner}
+SESSION_KEYS = {'farmer': 'farmer_id', 'owner': 'owner_id'}
+LOGIN_URLS = {'farmer': 'farmer_login', 'owner': 'owner_login', 'admin': 'admin_login'}
+
+
+@dataclass(frozen=True)
+class Principal:
+    role: str = None  # 'farmer', 'owner', 'admin', or None when nobody is signed in
+    account: object = None  # the Farmer, Owner or staff User
+
+    def __bool__(self):
+        return self.role is not None
+
+
+ANONYMOUS = Principal()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _cache_key(role, pk):
+    return f'principal:{role}:{pk}'
+
+
+def forget(role, pk):
+    _cache().delete(_cache_key(role, pk))
+
+
+def account(role, pk):
+    """The Farmer or Owner ``pk`` (password hash deferred), from the cache when possible."""
+    key = _cache_key(role, pk)
+    found = _cache().get(key)
+    if found is None:
+        found = ACCOUNTS[role].objects.defer('password_hash').filter(pk=pk).first()
+        if found is not None:
+            _cache().set(key, found, CACHE_TIMEOUT)
+    return found
+
+
+def _resolve(request, role):
+    if role == 'admin':
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            return Principal('admin', user)
+        return ANONYMOUS
+    pk = request.session.get(SESSION_KEYS[role])
+    found = account(role, pk) if pk else None
+    return Principal(role, found) if found is not None else ANONYMOUS
+
+
+def get_principal(request, role=None):
+    """The principal of ``request``; with ``role``, only a principal of that role.
+
+    A session signed in through log_in() holds a single role. Older
+    sessions may hold several; without ``role`` the first of farmer, owner
+    and admin wins.
+    """
+    principals = request.__dict__.setdefault('_principals', {})
+    roles = [role] if role else ['farmer', 'owner', 'admin']
+    for candidate in roles:
+        if candidate not in principals:
+            principals[candidate] = _resolve(request, candidate)
+        if principals[candidate]:
+            return principals[candidate]
+    return ANONYMOUS
+
+
+async def aget_principal(request, role=None):
+    return await sync_to_async(get_principal)(request, role)
+
+
+class PrincipalMiddleware:
+    """Sets request.principal (lazy) and request.aprincipal(); goes after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: get_principal(request))
+        request.aprincipal = functools.partial(aget_principal, request)
+        # Under ASGI this returns get_response's coroutine for the handler to await.
+        return self.get_response(request)
+
+
+# ---------------------- SIGN IN / OUT ----------------------
+def log_in(request, account):
+    """Start a fresh session for ``account`` (a Farmer, an Owner or a staff User), ending any other sign-in."""
+    if isinstance(account, (Farmer, Owner)):
+        role = 'farmer' if isinstance(account, Farmer) else 'owner'
+        if request.user.is_authenticated:
+            auth_logout(request)  # flushes the session
+        else:
+            request.session.cycle_key()
+        for key in SESSION_KEYS.values():
+            request.session.pop(key, None)
+        request.session[SESSION_KEYS[role]] = account.pk
+        forget(role, account.pk)  # the next request reloads it without the hash
+    else:
+        role = 'admin'
+        for key in SESSION_KEYS.values():
+            request.session.pop(key, None)
+        auth_login(request, account)  # cycles the session key
+    request._principals = {role: Principal(role, account)}
+
+
+def log_out(request):
+    auth_logout(request)  # flushes the session, whichever role it held
+    request._principals = {}
+
+
+# ---------------------- DECORATORS ----------------------
+def _refuse(request, role):
+    if role == 'admin':
+        return redirect_to_login(request.get_full_path(), LOGIN_URLS['admin'])
+    messages.error(request, "Please log in first.")
+    return redirect(LOGIN_URLS[role])
+
+
+def role_required(role):
+    """Let the view run only for a ``role`` principal, which becomes request.principal."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                principal = await aget_principal(request, role)
+                if not principal:
+                    return _refuse(request, role)
+                request.principal = principal
+                return await view(request, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                principal = get_principal(request, role)
+                if not principal:
+                    return _refuse(request, role)
+                request.principal = principal
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+farmer_required = role_required('farmer')
+owner_required = role_required('owner')
+admin_required = role_required('admin')
@@ -0,0 +1,124 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from . import dashboard_cache, jobs
+from .models import Booking, MonthlyRollup
+
+
+# A bucket is (year, month, owner_id, machine_type, status).
+def bucket_key(booking, machine_type=None):
+    if booking.start_date is None:
+        return None
+    machine_type = machine_type if machine_type is not None else booking.machine.machine_type
+    return (booking.start_date.year, booking.start_date.month, booking.owner_id, machine_type, booking.status)
+
+
+def _bucket_bookings(key):
+    year, month, owner_id, machine_type, status = key
+    first = date(year, month, 1)
+    after = date(year + month // 12, month % 12 + 1, 1)
+    return Booking.objects.filter(
+        owner_id=owner_id,
+        machine__machine_type=machine_type,
+        status=status,
+        start_date__gte=first,
+        start_date__lt=after,
+    )
+
+
+def retyped_machine_buckets(retyped):
+    """The buckets holding bookings of machines whose type changed, under both types.
+
+    ``retyped`` maps machine_id to (old type, new type).
+    """
+    if not retyped:
+        return []
+    rows = (
+        Booking.objects.filter(machine_id__in=retyped, start_date__isnull=False)
+        .values_list('machine_id', ExtractYear('start_date'), ExtractMonth('start_date'), 'owner_id', 'status')
+        .order_by()
+        .distinct()
+    )
+    return [
+        (year, month, owner_id, machine_type, status)
+        for machine_id, year, month, owner_id, status in rows
+        for machine_type in retyped[machine_id]
+    ]
+
+
+def refresh_buckets(keys):
+    """Recompute the given buckets from their own bookings only.
+
+    Each refresh touches the rows of a single owner/month/type/status, so
+    the cost of a save is independent of the size of the bookings table.
+    """
+    for key in {k for k in keys if k is not None}:
+        bookings = _bucket_bookings(key)
+        totals = bookings.aggregate(count=Count('booking_id'), value=Sum('total_price'))
+        year, month, owner_id, machine_type, status = key
+        lookup = dict(year=year, month=month, owner_id=owner_id, machine_type=machine_type, status=status)
+        if not totals['count']:
+            MonthlyRollup.objects.filter(**lookup).delete()
+            continue
+        MonthlyRollup.objects.update_or_create(**lookup, defaults={
+            'booking_count': totals['count'],
+            'booking_value': totals['value'] or Decimal('0'),
+        })
+
+
+@jobs.task
+def refresh_buckets_task(keys):
+    """Queued form of refresh_buckets(); keys arrive as JSON lists."""
+    refresh_buckets([tuple(k) for k in keys])
+    # Owner and admin summaries cached while the job waited were built from the old rows.
+    dashboard_cache.bump('global', *{f'owner:{owner_id}' for _, _, owner_id, _, _ in keys})
+
+
+def refresh_later(keys):
+    keys = [list(k) for k in dict.fromkeys(keys) if k is not None]
+    if keys:
+        jobs.enqueue(refresh_buckets_task, keys)
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Throw the rollup away and regroup every booking in one query."""
+    grouped = (
+        Booking.objects.filter(start_date__isnull=False)
+        .values(
+            year=ExtractYear('start_date'),
+            month=ExtractMonth('start_date'),
+            owner_ref=F('owner_id'),
+            machine_type=F('machine__machine_type'),
+            booking_status=F('status'),
+        )
+        .annotate(count=Count('booking_id'), value=Sum('total_price'))
+        .order_by()
+    )
+
+    MonthlyRollup.objects.all().delete()
+    rows = []
+    for g in grouped:
+        rows.append(MonthlyRollup(
+            year=g['year'], month=g['month'], owner_id=g['owner_ref'],
+            machine_type=g['machine_type'], status=g['booking_status'],
+            booking_count=g['count'], booking_value=g['value'] or Decimal('0'),
+        ))
+    MonthlyRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+# ---------------------- READS ----------------------
+def bookings_per_month(**filters):
+    """``[{'year', 'month', 'count'}]`` in calendar order, one row per month."""
+    return list(
+        MonthlyRollup.objects.filter(**filters)
+        .values('year', 'month')
+        .annotate(count=Sum('booking_count'))
+        .order_by('year', 'month')
+    )
+
@@ -0,0 +1,123 @@
+import contextvars
+import functools
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Read-only analytics (the dashboard summaries and charts, the admin
+# listings and the CSV/JSON exports) can be served from a read replica so
+# they do not compete with booking and payment writes on the primary. The
+# functions that compute them are decorated with @analytics, which sends
+# every read they make to ANALYTICS_DATABASE; the lazy querysets handed to
+# views and exports are bound with .using(analytics_db()) instead. Anything
+# else, and every write, uses the primary. Without an ANALYTICS_DATABASE
+# entry in DATABASES everything stays on the primary. The setting is read on
+# every call, so tests can point analytics back at the primary.
+#
+# A replica lags a little behind, so a user who has just written (booked,
+# paid, approved a machine) is pinned to the primary for PIN_SECONDS: the
+# router notices the write, ReplicaPinningMiddleware sets a short-lived
+# cookie, and that user's analytics come from the primary until it expires.
+# Other users may briefly see a summary built from the replica before the
+# write arrived; dashboard_cache keeps such summaries for PIN_SECONDS only.
+PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+PIN_COOKIE = 'primary_pin'
+
+_analytics = contextvars.ContextVar('analytics_reads', default=False)
+_pin = contextvars.ContextVar('replica_pin', default=None)
+
+
+class _Pin:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def _replica():
+    return getattr(settings, 'ANALYTICS_DATABASE', 'replica')
+
+
+def analytics_db():
+    """The alias analytics reads go to: the replica, unless this request is pinned or there is none."""
+    pin = _pin.get()
+    alias = _replica()
+    if (pin is not None and pin.pinned) or alias not in settings.DATABASES:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def analytics(fn):
+    """Send every read ``fn`` makes to analytics_db()."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _analytics.set(True)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _analytics.reset(token)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # None lets Django fall back to the hinted instance's database, then to the primary.
+        return analytics_db() if _analytics.get() else None
+
+    def db_for_write(self, model, **hints):
+        # The pin object is shared with threads started for this request, so
+        # a write made on one of them pins the request too.
+        pin = _pin.get()
+        if pin is not None:
+            pin.pinned = pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, _replica()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Read from the primary during and shortly after a request that wrote to it.
+
+    Goes before SessionMiddleware, so that saving the session counts too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin = _Pin(PIN_COOKIE in request.COOKIES)
+        token = _pin.set(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pin.reset(token)
+        return self._set_cookie(pin, response)
+
+    async def __acall__(self, request):
+        pin = _Pin(PIN_COOKIE in request.COOKIES)
+        token = _pin.set(pin)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pin.reset(token)
+        return self._set_cookie(pin, response)
+
+    def _set_cookie(self, pin, response):
+        if pin.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=PIN_SECONDS, httponly=True, samesite='Lax',
+                                secure=settings.SESSION_COOKIE_SECURE)
+        return response
@@ -0,0 +1,109 @@
+import re
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+
+from .models import Machine, MachineSearchTerm
+
+
+# Field weights: a hit in the name ranks above one in the free-text description.
+FIELD_WEIGHTS = (
+    ('machine_name', 8),
+    ('crops_supported', 4),
+    ('machine_type', 4),
+    ('machine_use', 2),
+    ('description', 1),
+)
+STOPWORDS = {'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+MAX_TERM_LENGTH = 64
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [
+        t[:MAX_TERM_LENGTH] for t in _TOKEN_RE.findall((text or '').lower())
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def machine_terms(machine):
+    """``{term: weight}`` for one machine, summing weights across fields."""
+    terms = {}
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(getattr(machine, field)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def index_machines(machines, batch_size=1000):
+    """Replace the index rows of ``machines`` (saved instances).
+
+    Only approved machines are indexed, so searches never have to join back
+    to the machine table to hide pending or rejected listings.
+    """
+    machines = list(machines)
+    rows = [
+        MachineSearchTerm(machine_id=m.machine_id, term=term, weight=weight)
+        for m in machines if m.approval_status == 'approved'
+        for term, weight in machine_terms(m).items()
+    ]
+    with transaction.atomic():
+        MachineSearchTerm.objects.filter(machine_id__in=[m.machine_id for m in machines]).delete()
+        MachineSearchTerm.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def rebuild_index(batch_size=1000):
+    MachineSearchTerm.objects.all().delete()
+    total = 0
+    batch = []
+    for machine in Machine.objects.filter(approval_status='approved').order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(machine)
+        if len(batch) == batch_size:
+            total += index_machines(batch, batch_size)
+            batch = []
+    if batch:
+        total += index_machines(batch, batch_size)
+    return total
+
+
+def _prefix_q(prefix):
+    # A half-open range instead of LIKE 'prefix%' so the (term) index is
+    # used on every backend, including SQLite.
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(term__gte=prefix, term__lt=upper)
+
+
+def search(query, limit=20):
+    """Approved machine ids ranked by how many query words they match, then by weight.
+
+    Every query word is matched as a prefix, so "whe" finds "wheat" and
+    "sugar" finds "sugarcane".
+    """
+    words = list(dict.fromkeys(tokenize(query)))[:8]
+    if not words:
+        return []
+
+    terms = MachineSearchTerm.objects.filter(Q.create([_prefix_q(w) for w in words], connector=Q.OR))
+    rows = terms.values('machine_id').annotate(score=Sum('weight'))
+    if len(words) == 1:
+        rows = rows.order_by('-score', 'machine_id')
+    else:
+        # One flag per query word: did any of this machine's terms start with it?
+        flags = {
+            f'w{i}': Max(Case(When(_prefix_q(w), then=Value(1)), default=Value(0), output_field=IntegerField()))
+            for i, w in enumerate(words)
+        }
+        rows = (
+            rows.annotate(**flags)
+            .annotate(matched=sum((F(name) for name in flags), Value(0)))
+            .order_by('-matched', '-score', 'machine_id')
+        )
+    return list(rows.values_list('machine_id', flat=True)[:limit])
+
+
+def search_machines(query, limit=20):
+    ids = search(query, limit)
+    machines = Machine.objects.select_related('owner').in_bulk(ids)
+    return [machines[i] for i in ids if i in machines]
@@ -0,0 +1,43 @@
+from rest_framework import serializers
+
+from .models import Machine
+
+
+class MachineSerializer(serializers.ModelSerializer):
+    owner_name = serializers.CharField(source='owner.name', read_only=True)
+    # The stored photo's URL (or an imported external URL), not the upload field.
+    machine_image = serializers.CharField(source='image_url', read_only=True)
+    thumbnail_url = serializers.CharField(read_only=True)
+    image_srcset = serializers.CharField(read_only=True)
+
+    # Columns the catalogue endpoint loads with only(); keep in sync with ``fields``.
+    LOAD_ONLY = (
+        'machine_id', 'machine_name', 'machine_type', 'machine_use', 'crops_supported',
+        'price_per_day', 'description', 'machine_image', 'thumbnail_widths', 'updated_at', 'owner__name',
+    )
+
+    class Meta:
+        model = Machine
+        fields = [
+            'machine_id', 'machine_name', 'machine_type', 'machine_use', 'crops_supported',
+            'price_per_day', 'description', 'machine_image', 'thumbnail_url', 'image_srcset', 'owner_name',
+            'updated_at',
+        ]
+
+
+class NearbyMachineSerializer(MachineSerializer):
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(MachineSerializer.Meta):
+        fields = MachineSerializer.Meta.fields + ['latitude', 'longitude', 'distance_km']
+
+
+class ModerationMachineSerializer(serializers.ModelSerializer):
+    owner_name = serializers.CharField(source='owner.name', read_only=True)
+
+    class Meta:
+        model = Machine
+        fields = [
+            'machine_id', 'machine_name', 'machine_number', 'machine_type', 'machine_use', 'price_per_day',
+            'owner', 'owner_name', 'created_at',
+        ]
@@ -43,11 +43,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings and query counts cover the rest of the stack.
+    'booking.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Before SessionMiddleware, so a session save counts as a write.
+    'booking.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'booking.principal.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +61,8 @@ ROOT_URLCONF = 'agri_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for the metrics middleware.
+        'BACKEND': 'booking.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,9 +89,91 @@ DATABASES = {
         'PASSWORD': 'ROOT',       
         'HOST': 'localhost',
         'PORT': '3306',
-    }
+        # Keep connections open between requests; check one still works before reusing it.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # The read replica for dashboard analytics, admin listings and exports
+    # (see booking/routers.py). Point HOST/USER at the replica; until then it
+    # is a second connection to the primary. Tests mirror it onto the test
+    # database.
+    'replica': {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': 'Agri_Machine',
+        'USER': 'root',
+        'PASSWORD': 'ROOT',
+        'HOST': 'localhost',
+        'PORT': '3306',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['booking.routers.PrimaryReplicaRouter']
+ANALYTICS_DATABASE = 'replica'
+# Seconds a user who has just written keeps reading analytics from the primary.
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# Dashboard summaries are cached with versioned keys (see booking/dashboard_cache.py),
+# which works with the local-memory backend or, across processes, the file backend:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered machine cards and booking rows (booking/fragments.py): one
+    # entry per row, so far more than the default 300-entry cull limit.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_ENTRIES': 50_000},
+    },
+}
+FRAGMENT_CACHE_ALIAS = 'fragments'
+
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Background jobs (booking/jobs.py) are stored in the database and run by
+# `python manage.py run_jobs`; no broker is needed.
+JOBS_BACKOFF_SECONDS = 10
+JOBS_LEASE_SECONDS = 600
+
+# Notifications are sent by background jobs; print them locally.
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Agri_Machine <no-reply@agri-machine.local>'
+
+# Login throttle token buckets: (attempts, seconds to refill them all).
+# Checked before any password hashing (see booking/logins.py).
+LOGIN_THROTTLE_RATES = {
+    'email': (5, 300),
+    'ip': (30, 300),
+}
+
+# Nightly price suggestions (booking/forecasting.py): prices move toward
+# this utilisation, by at most the given fractions per run.
+PRICING_TARGET_UTILISATION = 0.6
+PRICING_MAX_RAISE = 0.20
+PRICING_MAX_CUT = 0.15
+
+# Signed-in farmers and owners are cached this many seconds between
+# requests (booking/principal.py); saving the row evicts it at once.
+PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Per-view request metrics (booking/metrics.py), scraped from /metrics by
+# staff users or with "Authorization: Bearer <METRICS_BEARER_TOKEN>".
+# Set METRICS_PROFILE_DIR to cProfile a sample of requests and keep the
+# slow ones; summarise them with `python manage.py profile_report`.
+METRICS_WINDOW = 1000
+METRICS_BEARER_TOKEN = None
+METRICS_PROFILE_DIR = None
+METRICS_PROFILE_SAMPLE_RATE = 0.01
+METRICS_SLOW_REQUEST_MS = 500
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,6 +214,25 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# The Tailwind stylesheet is prebuilt and committed (see booking/tailwind.css).
+# `manage.py build_assets` runs collectstatic, which stores every file under a
+# content-hashed name with precompressed .gz (and, with the brotli package,
+# .br) siblings; see booking/storage.py. booking.assets.serve_static serves
+# them with "Cache-Control: public, max-age=31536000, immutable", as a
+# front-end web server should in production.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'booking.storage.CompressedStaticFilesStorage'},
+}
+
+# Uploaded machine photos, stored under the hash of their content (booking/storage.py).
+# Their paths never change content, so serve MEDIA_ROOT with
+# "Cache-Control: public, max-age=31536000, immutable".
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+IMAGE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
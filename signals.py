@@ -0,0 +1,110 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import dashboard_cache, geo, principal, rollups, search
+from .models import Booking, Farmer, Machine, Owner, Payment
+
+
+# ---------------------- MONTHLY ROLLUP ----------------------
+# Buckets are recomputed by a queued job (rollups.refresh_buckets_task), so a
+# booking save costs one INSERT into the job table instead of the aggregates.
+@receiver(pre_save, sender=Booking)
+def remember_rollup_bucket(sender, instance, raw=False, **kwargs):
+    # A save can move a booking to another bucket (status or date change),
+    # so the bucket it is leaving has to be refreshed too.
+    instance._previous_rollup_bucket = None
+    if instance.pk and not raw:
+        old = (
+            Booking.objects.filter(pk=instance.pk)
+            .values('start_date', 'owner_id', 'status', 'machine__machine_type')
+            .first()
+        )
+        if old and old['start_date']:
+            instance._previous_rollup_bucket = (
+                old['start_date'].year, old['start_date'].month, old['owner_id'],
+                old['machine__machine_type'], old['status'],
+            )
+
+
+@receiver(post_save, sender=Booking)
+def refresh_rollup_on_booking_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.refresh_later([getattr(instance, '_previous_rollup_bucket', None), rollups.bucket_key(instance)])
+
+
+# The bucket key includes the machine type, so retyping a machine moves all
+# of its bookings from one bucket to another.
+@receiver(pre_save, sender=Machine)
+def remember_machine_type(sender, instance, raw=False, **kwargs):
+    instance._previous_machine_type = None
+    if instance.pk and not raw:
+        instance._previous_machine_type = (
+            Machine.objects.filter(pk=instance.pk).values_list('machine_type', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Machine)
+def refresh_rollup_on_machine_retype(sender, instance, raw=False, **kwargs):
+    old = getattr(instance, '_previous_machine_type', None)
+    if raw or old is None or old == instance.machine_type:
+        return
+    rollups.refresh_later(rollups.retyped_machine_buckets({instance.pk: (old, instance.machine_type)}))
+
+
+def _owner_deleted(kwargs):
+    # Deleting an owner cascades to its rollup rows; rebuilding them here
+    # would only recreate rows that point at the owner being removed.
+    return isinstance(kwargs.get('origin'), Owner)
+
+
+@receiver(post_delete, sender=Booking)
+def refresh_rollup_on_booking_delete(sender, instance, **kwargs):
+    if _owner_deleted(kwargs):
+        return
+    rollups.refresh_later([rollups.bucket_key(instance)])
+
+
+# ---------------------- DASHBOARD CACHE ----------------------
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def bump_dashboards_on_booking_change(sender, instance, **kwargs):
+    dashboard_cache.bump(f'farmer:{instance.farmer_id}', f'owner:{instance.owner_id}', 'global')
+
+
+@receiver(post_save, sender=Machine)
+@receiver(post_delete, sender=Machine)
+def bump_dashboards_on_machine_change(sender, instance, **kwargs):
+    dashboard_cache.bump(f'owner:{instance.owner_id}', 'global')
+
+
+@receiver(post_save, sender=Farmer)
+@receiver(post_delete, sender=Farmer)
+def bump_dashboards_on_farmer_change(sender, instance, **kwargs):
+    # The admin dashboard counts farmers.
+    dashboard_cache.bump('global')
+
+
+# ---------------------- SEARCH INDEX ----------------------
+@receiver(post_save, sender=Machine)
+def reindex_machine(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_machines([instance])
+
+
+# ---------------------- GEO CELL ----------------------
+@receiver(pre_save, sender=Machine)
+def assign_geo_cell(sender, instance, **kwargs):
+    instance.geo_cell = geo.cell(instance.latitude, instance.longitude)
+
+
+# ---------------------- SIGNED-IN PRINCIPALS ----------------------
+@receiver(post_save, sender=Farmer)
+@receiver(post_delete, sender=Farmer)
+@receiver(post_save, sender=Owner)
+@receiver(post_delete, sender=Owner)
+def forget_cached_principal(sender, instance, **kwargs):
+    principal.forget('farmer' if sender is Farmer else 'owner', instance.pk)
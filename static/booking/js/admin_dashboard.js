@@ -0,0 +1,44 @@
+const views = {
+  dashboard: document.getElementById('dashboardView'),
+  users: document.getElementById('usersView'),
+  machines: document.getElementById('machinesView'),
+  bookings: document.getElementById('bookingsView')
+};
+const navLinks = document.querySelectorAll('.nav-link[data-view]');
+const sidebar = document.getElementById('sidebar');
+const menuToggle = document.getElementById('menu-toggle');
+const pageTitle = document.getElementById('pageTitle');
+
+menuToggle.addEventListener('click', () => sidebar.classList.toggle('active'));
+navLinks.forEach(link => {
+  link.addEventListener('click', (e) => {
+    e.preventDefault();
+    const view = link.dataset.view;
+    Object.values(views).forEach(v => v.classList.add('hidden'));
+    views[view].classList.remove('hidden');
+    navLinks.forEach(l => l.classList.remove('active'));
+    link.classList.add('active');
+    pageTitle.textContent = view === 'dashboard' ? 'Dashboard' : view.charAt(0).toUpperCase() + view.slice(1) + ' Management';
+  });
+});
+
+// Paging and filter links carry the table in the URL hash; reopen that tab.
+const initialLink = document.querySelector(`.nav-link[data-view="${location.hash.slice(1)}"]`);
+if (initialLink) initialLink.click();
+
+let dashboardData = {};
+try { dashboardData = JSON.parse(document.getElementById('chartDataJSON').textContent); } 
+catch(e) { console.warn("Chart data missing or invalid", e); }
+
+function renderChart(id, type, dataset, colors) {
+  if (!dataset || !dataset.labels || !dataset.data) return;
+  const ctx = document.getElementById(id).getContext('2d');
+  new Chart(ctx, {
+    type,
+    data: { labels: dataset.labels, datasets: [{ data: dataset.data, backgroundColor: colors, borderWidth: 1 }] },
+    options: { responsive: true, plugins: { legend: { position: 'bottom' } } }
+  });
+}
+
+renderChart('bookingsChart', 'bar', dashboardData.bookings, ['#22c55e', '#3b82f6', '#f59e0b']);
+renderChart('machineChart', 'doughnut', dashboardData.machines, ['#22c55e', '#ef4444', '#f59e0b', '#3b82f6']);
@@ -0,0 +1,4 @@
+// Optional: show temporary message on frontend after submit
+document.getElementById("registerForm").addEventListener("submit", function(e) {
+  document.getElementById("message").textContent = "Registration successful! Redirecting...";
+});
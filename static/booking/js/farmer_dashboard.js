@@ -0,0 +1,192 @@
+// The search endpoint comes from the template, which knows the URL conf.
+const searchUrl = document.currentScript.dataset.searchUrl;
+
+function cancelBooking(id, btn) {
+  if (!confirm("Are you sure you want to cancel this booking?")) return;
+  fetch(`/cancel-booking/${id}/`, { 
+    method: 'POST',
+    headers: {
+      'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value,
+      'X-Requested-With': 'XMLHttpRequest'
+    }
+  })
+    .then(r => r.json())
+    .then(data => {
+      if (data.success) {
+        btn.closest('td').textContent = 'Cancelled';
+        const toast = document.getElementById('toast');
+        toast.textContent = 'Booking Cancelled!';
+        toast.style.display = 'block';
+        setTimeout(() => { toast.style.display = 'none'; }, 3000);
+      }
+    });
+}
+
+// Sidebar toggle
+const mobileToggle = document.getElementById('mobileToggle');
+const sidebar = document.getElementById('sidebar');
+mobileToggle && mobileToggle.addEventListener('click', () => sidebar.classList.toggle('open'));
+
+// Navigation
+const navLinks = document.querySelectorAll('.nav-link');
+const views = {
+  'dashboard': document.getElementById('dashboardView'),
+  'machines': document.getElementById('machinesView'),
+  'bookings': document.getElementById('bookingsView'),
+  'payments': document.getElementById('paymentsView')
+};
+
+// --- Data Loading ---
+let chartData = {};
+try { 
+    chartData = JSON.parse(document.getElementById('chartData')?.textContent || '{}'); 
+} catch (e) { 
+    console.error("Error parsing chartData:", e); 
+}
+
+// --- Chart Rendering Function ---
+function renderCharts() {
+  // 1. Spend Chart (Line Chart)
+  const spendCtx = document.getElementById('spendChart')?.getContext('2d');
+  if (spendCtx) {
+    if (window.spendChartInstance) {
+        window.spendChartInstance.destroy();
+    }
+
+    window.spendChartInstance = new Chart(spendCtx, {
+      type: 'line',
+      data: {
+        labels: chartData.spend?.labels || [], 
+        datasets: [{
+          label: 'Monthly Spend',
+          data: chartData.spend?.data || [],
+          borderColor: '#16a34a',
+          backgroundColor: '#16a34a33',
+          fill: true,
+          tension: 0.4
+        }]
+      },
+      options: { responsive: true, plugins: { legend: { display: false }, tooltip: { mode: 'index', intersect: false } }, scales: {y: {beginAtZero: true}} }
+    });
+  }
+
+  // 2. Status Chart (Doughnut Chart)
+  const statusCtx = document.getElementById('statusChart')?.getContext('2d');
+  if (statusCtx) {
+    if (window.statusChartInstance) {
+        window.statusChartInstance.destroy();
+    }
+
+    window.statusChartInstance = new Chart(statusCtx, {
+      type: 'doughnut',
+      data: {
+        labels: chartData.status?.labels || [], 
+        datasets: [{
+          data: chartData.status?.data || [],
+          backgroundColor: ['#16a34a', '#facc15', '#ef4444']
+        }]
+      },
+      options: { responsive: true, plugins: { legend: { position: 'bottom' } } }
+    });
+  }
+}
+
+
+navLinks.forEach(a => {
+  a.addEventListener('click', function (e) {
+    e.preventDefault();
+    navLinks.forEach(x => x.classList.remove('active'));
+    this.classList.add('active');
+    Object.values(views).forEach(v => v.classList.add('hidden'));
+    const view = this.dataset.view || 'dashboard';
+    views[view].classList.remove('hidden');
+    sidebar.classList.remove('open');
+
+    // Re-render charts when switching to dashboard view
+    if (view === 'dashboard') {
+        setTimeout(renderCharts, 50); 
+    }
+  });
+});
+
+// Animated stats
+function animateStats() {
+  document.querySelectorAll('.stat .num').forEach(el => {
+    const target = +el.dataset.count || 0;
+    let count = 0;
+    const step = Math.ceil(target / 100);
+    const interval = setInterval(() => {
+      count += step;
+      if (count >= target) { count = target; clearInterval(interval); }
+      el.textContent = count;
+    }, 10);
+  });
+}
+
+// Booking modal
+function openBookingModal(machineId) {
+  const modal = document.getElementById('bookingModal');
+  if (!modal) return;
+  modal.classList.remove('hidden');
+  document.getElementById('form_machine_id').value = machineId;
+}
+function closeBookingModal() { document.getElementById('bookingModal').classList.add('hidden'); }
+
+// Owner popup
+let owners = [];
+try { owners = JSON.parse(document.getElementById('ownersJSON')?.textContent || '[]'); } catch (e) { owners = []; }
+function showOwner(ownerId) {
+  const o = owners.find(x => x.owner_id == ownerId); if (!o) return;
+  const content = document.getElementById('ownerContent');
+  content.innerHTML = `
+    <div class="font-semibold">${o.name || ''}</div>
+    <div><a href="mailto:${o.email || ''}" class="text-blue-600">${o.email || ''}</a></div>
+    <div>📞 <a href="tel:${o.phone || ''}" class="text-blue-600">${o.phone || ''}</a></div> 
+    <div>🏠 ${o.address || ''}</div>
+  `;
+  document.getElementById('ownerPopup').classList.remove('hidden');
+}
+function closeOwnerPopup() { document.getElementById('ownerPopup').classList.add('hidden'); }
+
+// Machine search & filter
+const machineCards = document.querySelectorAll('.machine-card');
+const searchInput = document.getElementById('machineSearch');
+const typeSelect = document.getElementById('typeFilter');
+const resetFilter = document.getElementById('resetFilter');
+// Text matches come from the ranked server-side search; null means "no query".
+let searchMatches = null;
+let searchTimer = null;
+function filterMachines() {
+  const t = typeSelect.value;
+  machineCards.forEach(card => {
+    const type = card.querySelector('.text-gray-500.text-xs')?.textContent || '';
+    const matched = searchMatches === null || searchMatches.has(card.dataset.machineId);
+    card.style.display = (matched && (t == '' || type == t)) ? 'block' : 'none';
+  });
+}
+function runSearch() {
+  const q = searchInput.value.trim();
+  if (!q) { searchMatches = null; filterMachines(); return; }
+  fetch(`${searchUrl}?limit=50&q=${encodeURIComponent(q)}`)
+    .then(r => r.json())
+    .then(data => {
+      if (searchInput.value.trim() !== q) return;  // a newer query is in flight
+      searchMatches = new Set(data.results.map(m => String(m.machine_id)));
+      filterMachines();
+    });
+}
+searchInput.addEventListener('input', () => { clearTimeout(searchTimer); searchTimer = setTimeout(runSearch, 200); });
+typeSelect.addEventListener('change', filterMachines);
+resetFilter.addEventListener('click', () => { searchInput.value = ''; typeSelect.value = ''; searchMatches = null; filterMachines(); });
+
+const bookingForm = document.getElementById('bookingForm');
+bookingForm?.addEventListener('submit', (e) => {
+  const toast = document.getElementById('toast');
+  toast.style.display = 'block';
+  setTimeout(() => { toast.style.display = 'none'; }, 3000);
+});
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelector('.nav-link[data-view="dashboard"]').click(); 
+    animateStats();
+});
@@ -0,0 +1,8 @@
+document.getElementById('useLocation').addEventListener('click', (e) => {
+  if (!navigator.geolocation) return;
+  navigator.geolocation.getCurrentPosition((pos) => {
+    document.getElementById('latitude').value = pos.coords.latitude.toFixed(6);
+    document.getElementById('longitude').value = pos.coords.longitude.toFixed(6);
+    e.target.textContent = '📍 Location saved';
+  });
+});
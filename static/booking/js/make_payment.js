@@ -0,0 +1,4 @@
+// The key makes resubmits safe; disabling the button just saves the round-trip.
+document.getElementById('paymentForm').addEventListener('submit', () => {
+  document.getElementById('payButton').disabled = true;
+});
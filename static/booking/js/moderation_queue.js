@@ -0,0 +1,3 @@
+document.getElementById('selectAll').addEventListener('change', function () {
+  document.querySelectorAll('.pick').forEach(box => { box.checked = this.checked; });
+});
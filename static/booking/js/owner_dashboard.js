@@ -0,0 +1,124 @@
+const views = {
+    dashboard: document.getElementById('dashboardView'),
+    machines: document.getElementById('machinesView'),
+    bookings: document.getElementById('bookingsView'),
+    finance: document.getElementById('financeView'),
+    prediction: document.getElementById('predictionView')
+};
+const navLinks = document.querySelectorAll('.nav-link');
+const sidebar = document.getElementById('sidebar');
+const menuToggle = document.getElementById('mobileToggle');
+const pageTitle = document.getElementById('pageTitle');
+const rawChartData = JSON.parse(document.getElementById('incomeData').textContent || '{}');
+const forecastData = JSON.parse(document.getElementById('forecastData').textContent || '{}');
+
+// --- Sidebar Toggle Logic ---
+menuToggle.addEventListener('click', () => sidebar.classList.toggle('open'));
+
+// --- Chart Rendering Function ---
+function renderIncomeChart(id) {
+    const chartElement = document.getElementById(id);
+    if (!chartElement) return;
+
+    if (chartElement.chart) {
+        chartElement.chart.destroy();
+    }
+
+    const ctx = chartElement.getContext('2d');
+    chartElement.chart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: rawChartData.labels || [],
+            datasets: [{
+                label: 'Monthly Earnings',
+                data: rawChartData.data || [],
+                borderColor: '#10B981',
+                backgroundColor: 'rgba(16,185,129,0.2)',
+                tension: 0.4,
+                fill: true,
+                pointRadius: 4,
+                pointBackgroundColor: '#059669'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false, 
+            plugins: {
+                legend: { display: false },
+                tooltip: { mode: 'index', intersect: false }
+            },
+            scales: {
+                y: { beginAtZero: true, title: { display: true, text: 'Revenue (₹)' } },
+                x: { grid: { display: false } }
+            }
+        }
+    });
+}
+
+function renderForecastChart() {
+    const chartElement = document.getElementById('demandForecastChart');
+    if (!chartElement) return;
+
+    if (chartElement.chart) {
+        chartElement.chart.destroy();
+    }
+
+    chartElement.chart = new Chart(chartElement.getContext('2d'), {
+        type: 'bar',
+        data: {
+            labels: forecastData.labels || [],
+            datasets: [{
+                label: 'Machines Booked (forecast)',
+                data: forecastData.data || [],
+                backgroundColor: 'rgba(79,70,229,0.6)',
+                borderColor: '#4F46E5',
+                borderWidth: 1
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: { legend: { display: false } },
+            scales: {
+                y: { beginAtZero: true, title: { display: true, text: 'Machines booked' } },
+                x: { grid: { display: false } }
+            }
+        }
+    });
+}
+
+// --- Navigation Logic ---
+navLinks.forEach(link => {
+    link.addEventListener('click', (e) => {
+        e.preventDefault();
+        const view = link.dataset.view;
+
+        // Toggle active class on links
+        navLinks.forEach(l => l.classList.remove('active'));
+        link.classList.add('active');
+
+        // Toggle views visibility
+        Object.values(views).forEach(v => v.classList.add('hidden'));
+        views[view].classList.remove('hidden');
+
+        // Update header title
+        let title = link.textContent.trim();
+        title = title.replace('Dashboard', 'Dashboard').replace('My Machines', 'Machine Management').replace('Bookings & Orders', 'Booking Management').replace('Finance & Banking', 'Finance & Banking').replace('Prediction (ML)', 'ML Prediction Insights');
+        pageTitle.textContent = title;
+
+        sidebar.classList.remove('open');
+
+        if (view === 'dashboard') {
+            setTimeout(() => renderIncomeChart('incomeChart'), 50);
+        } else if (view === 'finance') {
+            setTimeout(() => renderIncomeChart('financeIncomeChart'), 50);
+        } else if (view === 'prediction') {
+            setTimeout(renderForecastChart, 50);
+        }
+    });
+});
+
+// Initial chart render on load
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelector('.nav-link[data-view="dashboard"]').click();
+});
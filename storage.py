@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import os
+import posixpath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz variants are written
+    brotli = None
+
+
+# Uploaded images are stored under the SHA-256 of their bytes, so the same
+# photo uploaded twice is kept once, and a stored path never changes
+# content: everything under it can be served with far-future, immutable
+# cache headers. WebP thumbnails are named after their source file.
+THUMBNAIL_WIDTHS = (160, 320, 640)
+# Pillow format -> stored extension. Other extensions are dropped, so an
+# upload can never be served as HTML or SVG from the site's origin.
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():  # rewinds first, as the later write does
+            digest.update(chunk)
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        if extension not in IMAGE_EXTENSIONS.values():
+            extension = ''
+        hexdigest = digest.hexdigest()
+        name = posixpath.join(directory, hexdigest[:2], f'{hexdigest}{extension}')
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def save_derived(self, name, content):
+        """Store a file made from a hashed original (a thumbnail) under ``name`` as given."""
+        return super().save(name, content)
+
+
+def thumbnail_name(image_name, width):
+    directory, filename = posixpath.split(image_name)
+    return posixpath.join(directory, 'thumbs', f'{os.path.splitext(filename)[0]}-{width}.webp')
+
+
+# Two uploads of the same bytes may race to the same name; either write is correct.
+machine_images = ContentAddressedStorage(allow_overwrite=True)
+
+
+# ---------------------- STATIC FILES ----------------------
+# collectstatic stores every static file under a name containing a hash of
+# its content (app.css -> app.4f1c2e9a0b7d.css, recorded in
+# staticfiles.json) and then, for text assets, writes .gz and (with the
+# brotli package installed) .br siblings at maximum compression, so no
+# request ever compresses anything. A hashed name's variants are never
+# rewritten, which keeps redeploys cheap. booking.assets.serve_static picks
+# the variant the client accepts.
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.xml')
+COMPRESS_MIN_BYTES = 256
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+class CompressedStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if not dry_run:
+            for name in sorted(set(self.hashed_files.values())):
+                self.compress(name)
+
+    def compress(self, name):
+        """Write the .gz/.br variants of ``name`` that are missing and worth having."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        path = self.path(name)
+        compressors = [('.gz', _gzip)] + ([('.br', _brotli)] if brotli is not None else [])
+        pending = [(suffix, fn) for suffix, fn in compressors if not os.path.exists(path + suffix)]
+        if not pending:
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return
+        for suffix, fn in pending:
+            compressed = fn(data)
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+    def url(self, name, force=False):
+        # Without a manifest (a checkout where collectstatic has not run,
+        # such as the test suite) link the unhashed files, as DEBUG does.
+        if not self.hashed_files and not force:
+            return FileSystemStorage.url(self, name)
+        return super().url(name, force)
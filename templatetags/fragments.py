@@ -0,0 +1,11 @@
+from django import template
+
+from .. import fragments
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_fragments(context, name, objects):
+    """``{% render_fragments 'machine_card' machines %}``: the cached fragment of each object, in order."""
+    return fragments.render_many(name, objects, csrf_token=context.get('csrf_token'))
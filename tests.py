@@ -1,3 +1,1693 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .availability import MachineCalendar, free_windows, is_available
+from . import dashboard_cache
+from .dashboards import admin_listings, admin_occupancy, admin_summary, owner_analytics, owner_bookings, owner_occupancy
+from . import (
+    bulk_io, forecasting, fragments, geo, jobs, lifecycle, logins, metrics, moderation, occupancy, principal,
+    rollups, routers, search,
+)
+from .models import (
+    Booking, DemandForecast, Farmer, Job, Machine, MachineSearchTerm, ModerationAudit, MonthlyRollup, Owner,
+    OwnerBankDetails, Payment, PriceSuggestion,
+)
+
+
+# The replica alias is a test mirror: another connection to the test
+# database, which cannot see a TestCase's uncommitted rows. Analytics read
+# the primary in tests, except where routing itself is tested.
+@override_settings(ANALYTICS_DATABASE='default')
+class AgriTestCase(TestCase):
+    def setUp(self):
+        # Dashboard versions and rendered fragments live in caches, which outlive test transactions.
+        for backend in caches.all():
+            backend.clear()
+        super().setUp()
+
+
+def make_owner(email='owner@example.com', **kwargs):
+    return Owner.objects.create(name='Owner', phone='9000000000', email=email,
+                                password_hash=make_password('secret'), **kwargs)
+
+
+def make_farmer(email='farmer@example.com', **kwargs):
+    return Farmer.objects.create(name='Farmer', phone='9000000001', email=email,
+                                 password_hash=make_password('secret'), **kwargs)
+
+
+def make_machine(owner, number='MH-01', **kwargs):
+    fields = dict(machine_name='Tractor', machine_type='Tillage', machine_use='Ploughing',
+                  price_per_day=Decimal('1000.00'), approval_status='approved')
+    fields.update(kwargs)
+    return Machine.objects.create(owner=owner, machine_number=number, **fields)
+
+
+def login_farmer(client, farmer):
+    session = client.session
+    session['farmer_id'] = farmer.farmer_id
+    session.save()
+
+
+def make_booking(farmer, machine, start, end, status='pending'):
+    return Booking.objects.create(farmer=farmer, machine=machine, owner=machine.owner,
+                                  start_date=start, end_date=end, status=status,
+                                  total_price=((end - start).days + 1) * machine.price_per_day)
+
+
+# ---------------------- AVAILABILITY ----------------------
+class AvailabilityTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner)
+        make_booking(self.farmer, self.machine, date(2025, 6, 10), date(2025, 6, 12))
+
+    def test_overlap_is_inclusive_of_booked_days(self):
+        self.assertFalse(is_available(self.machine, date(2025, 6, 12), date(2025, 6, 14)))
+        self.assertFalse(is_available(self.machine, date(2025, 6, 1), date(2025, 6, 10)))
+        self.assertFalse(is_available(self.machine, date(2025, 6, 11), date(2025, 6, 11)))
+
+    def test_adjacent_days_are_free(self):
+        self.assertTrue(is_available(self.machine, date(2025, 6, 13), date(2025, 6, 15)))
+        self.assertTrue(is_available(self.machine, date(2025, 6, 5), date(2025, 6, 9)))
+
+    def test_cancelled_bookings_do_not_block(self):
+        Booking.objects.update(status='cancelled')
+        self.assertTrue(is_available(self.machine, date(2025, 6, 10), date(2025, 6, 12)))
+
+    def test_free_windows_merges_adjacent_bookings(self):
+        make_booking(self.farmer, self.machine, date(2025, 6, 13), date(2025, 6, 14), status='confirmed')
+        windows = free_windows(self.machine, 30, start=date(2025, 6, 1))
+        self.assertEqual(windows, [
+            (date(2025, 6, 1), date(2025, 6, 9)),
+            (date(2025, 6, 15), date(2025, 6, 30)),
+        ])
+
+    def test_calendar_lookup_matches_query(self):
+        calendar = MachineCalendar(self.machine, date(2025, 6, 1), date(2025, 7, 1))
+        for day in range(1, 31):
+            start = date(2025, 6, day)
+            end = start + timedelta(days=2)
+            self.assertEqual(calendar.is_free(start, end), is_available(self.machine, start, end))
+
+    def test_create_booking_rejects_overlap(self):
+        login_farmer(self.client, self.farmer)
+        response = self.client.post(reverse('create_booking'), {
+            'machine_id': self.machine.machine_id,
+            'start_date': '2025-06-11',
+            'end_date': '2025-06-15',
+        })
+        self.assertRedirects(response, reverse('farmer_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(Booking.objects.count(), 1)
+
+        response = self.client.post(reverse('create_booking'), {
+            'machine_id': self.machine.machine_id,
+            'start_date': '2025-06-13',
+            'end_date': '2025-06-15',
+        })
+        booking = Booking.objects.latest('booking_id')
+        self.assertRedirects(response, reverse('make_payment', args=[booking.booking_id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(booking.total_price, Decimal('3000.00'))
+
+
+# ---------------------- FARMER DASHBOARD ----------------------
+class FarmerDashboardQueryTests(AgriTestCase):
+    MAX_QUERIES = 12
+
+    def setUp(self):
+        super().setUp()
+        self.farmer = make_farmer()
+        login_farmer(self.client, self.farmer)
+        self.add_history(1)
+
+    def add_history(self, count):
+        start = Booking.objects.count()
+        for i in range(start, start + count):
+            owner = make_owner(email=f'owner{i}@example.com')
+            OwnerBankDetails.objects.create(owner=owner, account_holder_name='Owner',
+                                            account_number=f'00{i}', upi_id=f'owner{i}@upi')
+            machine = make_machine(owner, number=f'MH-{i}')
+            day = date(2025, 1 + i % 12, 1)
+            booking = make_booking(self.farmer, machine, day, day + timedelta(days=2), status='confirmed')
+            Payment.objects.create(booking=booking, farmer=self.farmer, owner=owner,
+                                   amount=booking.total_price, payment_method='upi',
+                                   payment_status='completed')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('farmer_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_bounded(self):
+        principal.account('farmer', self.farmer.pk)  # as after any earlier request
+        baseline, _ = self.count_queries()
+        self.add_history(15)
+        grown, response = self.count_queries()
+        self.assertLessEqual(grown, self.MAX_QUERIES)
+        self.assertEqual(grown, baseline)
+        self.assertEqual(response.context['summary']['total_bookings'], 16)
+        self.assertEqual(response.context['summary']['active_bookings'], 16)
+        self.assertContains(response, 'owner15@upi')
+
+
+# ---------------------- ADMIN DASHBOARD ----------------------
+class AdminDashboardTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_user('admin@example.com', 'admin@example.com', 'secret', is_staff=True)
+        self.client.force_login(admin)
+        self.farmer = make_farmer()
+        self.owner = make_owner()
+
+    def add_bookings(self, count, status='confirmed'):
+        start = Machine.objects.count()
+        for i in range(start, start + count):
+            machine = make_machine(self.owner, number=f'MH-{i}')
+            make_booking(self.farmer, machine, date(2025, 3, 1), date(2025, 3, 2), status=status)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin_dashboard'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_keyset_pages_and_constant_query_count(self):
+        self.add_bookings(5)
+        _, small = self.get()
+        self.add_bookings(55)
+        response, large = self.get()
+        self.assertEqual(small, large)
+
+        first = response.context['bookings']
+        self.assertEqual(len(first), 50)
+        self.assertIn('bookings', response.context['next_urls'])
+
+        response, _ = self.get(bookings_after=first.next_cursor)
+        second = response.context['bookings']
+        self.assertEqual(len(second), 10)
+        self.assertFalse(second.has_next)
+        seen = {b.pk for b in first} | {b.pk for b in second}
+        self.assertEqual(len(seen), 60)
+
+    def test_filters(self):
+        self.add_bookings(3)
+        self.add_bookings(2, status='cancelled')
+        response, _ = self.get(booking_status='cancelled', date_from='2025-03-01', date_to='2025-03-31')
+        self.assertEqual(len(response.context['bookings']), 2)
+        response, _ = self.get(booking_status='cancelled', date_from='2025-04-01')
+        self.assertEqual(len(response.context['bookings']), 0)
+        response, _ = self.get(machine_status='pending')
+        self.assertEqual(len(response.context['machines']), 0)
+
+
+# ---------------------- MONTHLY ROLLUP ----------------------
+class MonthlyRollupTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner)
+
+    def snapshot(self):
+        jobs.run_pending()
+        return sorted(MonthlyRollup.objects.values_list(
+            'year', 'month', 'owner_id', 'machine_type', 'status', 'booking_count', 'booking_value'))
+
+    def test_signals_match_full_rebuild(self):
+        a = make_booking(self.farmer, self.machine, date(2024, 5, 1), date(2024, 5, 3))
+        b = make_booking(self.farmer, self.machine, date(2025, 5, 10), date(2025, 5, 11))
+        make_booking(self.farmer, self.machine, date(2025, 5, 20), date(2025, 5, 20), status='confirmed')
+        b.status = 'confirmed'
+        b.save()
+        a.delete()
+        incremental = self.snapshot()
+
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(incremental, [
+            (2025, 5, self.owner.pk, 'Tillage', 'confirmed', 2, Decimal('3000.00')),
+        ])
+
+    def test_retyping_a_machine_moves_its_bookings(self):
+        make_booking(self.farmer, self.machine, date(2025, 5, 1), date(2025, 5, 1))
+        make_booking(self.farmer, self.machine, date(2025, 6, 1), date(2025, 6, 1), status='confirmed')
+        self.machine.machine_type = 'Harvesting'
+        self.machine.save()
+        self.assertEqual({bucket[3] for bucket in self.snapshot()}, {'Harvesting'})
+
+        row = dict(machine_name='Tractor', machine_number=self.machine.machine_number, machine_type='Planting',
+                   machine_use='Sowing', price_per_day='1000')
+        bulk_io.import_machines(self.owner, [row], update=True)
+        incremental = self.snapshot()
+        self.assertEqual({bucket[3] for bucket in incremental}, {'Planting'})
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_years_are_not_merged(self):
+        make_booking(self.farmer, self.machine, date(2024, 5, 1), date(2024, 5, 1))
+        make_booking(self.farmer, self.machine, date(2025, 5, 1), date(2025, 5, 1))
+        jobs.run_pending()
+        self.assertEqual(rollups.bookings_per_month(), [
+            {'year': 2024, 'month': 5, 'count': 1},
+            {'year': 2025, 'month': 5, 'count': 1},
+        ])
+
+
+# ---------------------- OWNER ANALYTICS ----------------------
+class OwnerAnalyticsTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner)
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+
+    def add_years(self, *years):
+        for year in years:
+            for month in range(1, 13):
+                make_booking(self.farmer, self.machine, date(year, month, 1), date(year, month, 3), status='confirmed')
+            make_booking(self.farmer, self.machine, date(year, 6, 10), date(year, 6, 10))
+        jobs.run_pending()
+
+    def test_series_is_keyed_by_year(self):
+        make_booking(self.farmer, self.machine, date(2024, 2, 10), date(2024, 2, 14), status='completed')
+        self.add_years(2023, 2024)
+        result = owner_analytics(self.owner, 2024)
+        self.assertEqual(result['income_data']['data'][0], Decimal('3000.00'))
+        self.assertEqual(result['income_data']['data'][1], Decimal('8000.00'))
+        self.assertEqual(result['total_earnings'], Decimal('77000.00'))
+        self.assertEqual(result['pending_payments'], Decimal('2000.00'))
+        self.assertEqual(result['total_bookings'], 27)
+
+    def test_dashboard_catches_up_when_the_rollup_job_runs(self):
+        make_booking(self.farmer, self.machine, date(2024, 3, 1), date(2024, 3, 3), status='confirmed')
+        self.client.get(reverse('owner_dashboard'), {'year': 2024})  # cached before the job ran
+        jobs.run_pending()
+        response = self.client.get(reverse('owner_dashboard'), {'year': 2024})
+        self.assertEqual(response.context['income_data']['data'][2], Decimal('3000.00'))
+
+    def test_dashboard_query_count_is_constant(self):
+        principal.account('owner', self.owner.pk)  # as after any earlier request
+        self.add_years(2024)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('owner_dashboard'), {'year': 2024})
+        self.add_years(2021, 2022, 2023)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('owner_dashboard'), {'year': 2024})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_out_of_range_year_means_this_year(self):
+        this_year = timezone.localdate().year
+        for value in ('0', '-5', '1999', '9999', '10000', 'abc'):
+            response = self.client.get(reverse('owner_dashboard'), {'year': value})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['income_data']['year'], this_year, value)
+        self.assertEqual(owner_analytics(self.owner, 10000)['income_data']['year'], this_year)
+
+
+# ---------------------- DASHBOARD CACHE ----------------------
+class DashboardCacheTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner)
+        login_farmer(self.client, self.farmer)
+
+    def queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('farmer_dashboard'))
+        return len(ctx.captured_queries), response
+
+    def check_hits_and_invalidation(self):
+        principal.account('farmer', self.farmer.pk)  # as after any earlier request
+        cold, _ = self.queries()
+        warm, response = self.queries()
+        self.assertEqual(warm, cold - 2)
+        self.assertEqual(response.context['summary']['total_bookings'], 0)
+        self.assertEqual(dashboard_cache.stats()['hits'], 1)
+
+        make_booking(self.farmer, self.machine, date(2025, 1, 1), date(2025, 1, 2))
+        after_write, response = self.queries()
+        self.assertGreaterEqual(after_write, cold)
+        self.assertEqual(response.context['summary']['total_bookings'], 1)
+        self.assertEqual(dashboard_cache.stats()['misses'], 2)
+
+    def test_local_memory_backend(self):
+        self.check_hits_and_invalidation()
+
+    def test_file_backend(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as location:
+            backend = {
+                alias: {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': os.path.join(location, alias),
+                }
+                for alias in ('default', 'fragments')
+            }
+            with override_settings(CACHES=backend):
+                self.check_hits_and_invalidation()
+
+    def test_other_farmers_are_not_invalidated(self):
+        other = make_farmer(email='other@example.com')
+        dashboard_cache.cached('farmer', [f'farmer:{other.pk}'], lambda: 'cached')
+        make_booking(self.farmer, self.machine, date(2025, 1, 1), date(2025, 1, 2))
+        self.assertEqual(dashboard_cache.cached('farmer', [f'farmer:{other.pk}'], lambda: 'rebuilt'), 'cached')
+
+
+# ---------------------- MACHINE API ----------------------
+class MachineApiTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        owner = make_owner()
+        for i in range(25):
+            make_machine(owner, number=f'MH-{i}', machine_type='Harvesting' if i % 5 == 0 else 'Tillage',
+                         crops_supported='Wheat, Paddy' if i % 2 else 'Sugarcane',
+                         price_per_day=Decimal(500 + i * 100))
+        make_machine(owner, number='MH-PENDING', approval_status='pending')
+
+    def test_filters(self):
+        response = self.client.get(reverse('api_machines'), {'type': 'Harvesting'})
+        self.assertEqual(len(response.json()['results']), 5)
+        response = self.client.get(reverse('api_machines'), {'crop': 'paddy', 'max_price': '1000'})
+        self.assertEqual([m['price_per_day'] for m in response.json()['results']], ['1000.00', '800.00', '600.00'])
+        response = self.client.get(reverse('api_machines'), {'min_price': 'nan'})
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_cursor_pagination_excludes_unapproved(self):
+        first = self.client.get(reverse('api_machines')).json()
+        self.assertEqual(len(first['results']), 20)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        numbers = {m['machine_id'] for m in first['results'] + second['results']}
+        self.assertEqual(len(numbers), 25)
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('api_machines'))
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        cached = self.client.get(reverse('api_machines'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(reverse('api_machines'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+        machine = Machine.objects.filter(approval_status='approved').first()
+        machine.price_per_day = Decimal('999.00')
+        machine.save()
+        refreshed = self.client.get(reverse('api_machines'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed['ETag'], etag)
+
+
+# ---------------------- MACHINE SEARCH ----------------------
+class MachineSearchTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        owner = make_owner()
+        self.harvester = make_machine(owner, number='MH-1', machine_name='Combine Harvester',
+                                      machine_type='Harvesting', crops_supported='Wheat, Paddy')
+        self.reaper = make_machine(owner, number='MH-2', machine_name='Reaper', machine_type='Harvesting',
+                                   crops_supported='Wheat', description='Cuts wheat before the combine arrives')
+        self.tractor = make_machine(owner, number='MH-3', machine_name='Tractor', crops_supported='Sugarcane')
+        self.pending = make_machine(owner, number='MH-4', machine_name='Wheat Thresher',
+                                    approval_status='pending')
+
+    def test_prefix_match_and_ranking(self):
+        self.assertEqual(search.search('sugar'), [self.tractor.machine_id])
+        # The reaper mentions wheat twice, the harvester matches both words.
+        self.assertEqual(search.search('whe'), [self.reaper.machine_id, self.harvester.machine_id])
+        self.assertEqual(search.search('wheat harv'), [self.harvester.machine_id, self.reaper.machine_id])
+        self.assertEqual(search.search('the of'), [])
+
+    def test_index_follows_approval(self):
+        self.assertFalse(MachineSearchTerm.objects.filter(machine=self.pending).exists())
+        self.pending.approval_status = 'approved'
+        self.pending.save()
+        self.assertEqual(search.search('thresh'), [self.pending.machine_id])
+
+        self.harvester.approval_status = 'rejected'
+        self.harvester.save()
+        self.assertNotIn(self.harvester.machine_id, search.search('wheat'))
+
+    def test_rebuild_matches_signals(self):
+        before = set(MachineSearchTerm.objects.values_list('machine_id', 'term', 'weight'))
+        search.rebuild_index()
+        self.assertEqual(set(MachineSearchTerm.objects.values_list('machine_id', 'term', 'weight')), before)
+
+    def test_api(self):
+        response = self.client.get(reverse('api_machine_search'), {'q': 'wheat harv', 'limit': '1'})
+        self.assertEqual([m['machine_name'] for m in response.json()['results']], ['Combine Harvester'])
+
+
+# ---------------------- BULK IMPORT / EXPORT ----------------------
+class BulkImportExportTests(AgriTestCase):
+    CSV = (
+        "machine_name,machine_number,machine_type,machine_use,price_per_day,crops_supported\n"
+        "Tractor,MH-01,Tillage,Ploughing,1200,Wheat\n"
+        "Seed Drill,MH-10,Planting,Sowing,800,\n"
+        "Reaper,MH-11,Harvesting,Cutting,abc,\n"
+        "Seed Drill,MH-10,Planting,Sowing,900,\n"
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.machine = make_machine(self.owner)
+        self.farmer = make_farmer()
+
+    def write_file(self, content, suffix='.csv'):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_command_skips_or_updates_existing(self):
+        path = self.write_file(self.CSV)
+        err = io.StringIO()
+        call_command('import_machines', path, owner=self.owner.email, stdout=io.StringIO(), stderr=err)
+        self.assertEqual(Machine.objects.count(), 2)
+        self.assertEqual(Machine.objects.get(machine_number='MH-10').approval_status, 'pending')
+        self.assertIn('Row 3: price_per_day', err.getvalue())
+        self.assertIn('Row 4: duplicate machine_number', err.getvalue())
+
+        call_command('import_machines', path, owner=str(self.owner.pk), update=True,
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        self.machine.refresh_from_db()
+        self.assertEqual(self.machine.price_per_day, Decimal('1200.00'))
+        self.assertEqual(search.search('wheat'), [self.machine.machine_id])
+
+        other = make_owner(email='other@example.com')
+        out = io.StringIO()
+        json_path = self.write_file(json.dumps([{'machine_name': 'Tractor', 'machine_number': 'MH-01',
+                                                 'machine_type': 'Tillage', 'machine_use': 'Ploughing',
+                                                 'price_per_day': 10}]), suffix='.json')
+        call_command('import_machines', json_path, owner=other.email, update=True, stdout=out, stderr=io.StringIO())
+        self.assertIn('rejected 1 rows', out.getvalue())
+
+    def test_number_taken_during_the_import_is_skipped(self):
+        rows = list(csv.DictReader(io.StringIO(self.CSV)))[:2]
+        # As if MH-01 was added after the existence check ran.
+        with mock.patch.object(Machine.objects, 'in_bulk', return_value={}):
+            result = bulk_io.import_machines(self.owner, rows)
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertTrue(Machine.objects.filter(machine_number='MH-10').exists())
+
+    def test_import_view(self):
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        upload = SimpleUploadedFile('fleet.csv', b'\xef\xbb\xbf' + self.CSV.encode())
+        response = self.client.post(reverse('import_machines'), {'machines_file': upload})
+        self.assertRedirects(response, reverse('owner_dashboard'), fetch_redirect_response=False)
+        self.assertTrue(Machine.objects.filter(machine_number='MH-10', owner=self.owner).exists())
+
+        oversized = self.CSV + 'Tractor,MH-20,Tillage,Ploughing,100,"' + 'x' * 200000 + '"\n'
+        upload = SimpleUploadedFile('fleet.csv', oversized.encode())
+        response = self.client.post(reverse('import_machines'), {'machines_file': upload})
+        self.assertRedirects(response, reverse('owner_dashboard'), fetch_redirect_response=False)
+
+    def test_export_streams_owner_rows(self):
+        booking = make_booking(self.farmer, self.machine, date(2025, 6, 1), date(2025, 6, 2), status='confirmed')
+        Payment.objects.create(booking=booking, farmer=self.farmer, owner=self.owner, amount=Decimal('500.00'),
+                               payment_method='upi', payment_status='completed')
+        other_machine = make_machine(make_owner(email='other@example.com'), number='MH-99')
+        make_booking(self.farmer, other_machine, date(2025, 6, 1), date(2025, 6, 2))
+
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        response = self.client.get(reverse('export_bookings'))
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([r['booking_id'] for r in rows], [str(booking.booking_id)])
+        self.assertEqual(Decimal(rows[0]['paid_amount']), Decimal('500'))
+        self.assertEqual(rows[0]['machine_machine_number'], 'MH-01')
+
+        User.objects.create_user('admin@example.com', password='secret', is_staff=True)
+        self.client.login(username='admin@example.com', password='secret')
+        response = self.client.get(reverse('export_bookings'), {'owner': self.owner.pk})
+        self.assertEqual(len(list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))), 2)
+        for params in ({'owner': 'abc'}, {'owner': 'abc', 'payments': '1'}, {'from': '2025-13-01'}, {'to': 'yesterday'}):
+            self.assertEqual(self.client.get(reverse('export_bookings'), params).status_code, 400)
+
+        out = io.StringIO()
+        call_command('export_bookings', format='json', chunk_size=1, stdout=out)
+        self.assertEqual(len(json.loads(out.getvalue())), 2)
+        out = io.StringIO()
+        call_command('export_bookings', payments=True, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+# ---------------------- LOGIN THROTTLE ----------------------
+class LoginThrottleTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.farmer = make_farmer()
+
+    def login(self, password, email='farmer@example.com', ip='10.0.0.1'):
+        return self.client.post(reverse('farmer_login'), {'email': email, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_email_bucket_rejects_before_hashing(self):
+        capacity = logins.RATES['email'][0]
+        for _ in range(capacity):
+            self.assertEqual(self.login('wrong').status_code, 200)
+        hashes = logins.stats()['hashes']
+        response = self.login('secret')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(logins.stats()['hashes'], hashes)
+        self.assertEqual(logins.stats()['throttled'], 1)
+        self.assertNotIn('farmer_id', self.client.session)
+
+        # Another account from another address is unaffected.
+        make_owner(email='owner@example.com')
+        response = self.client.post(reverse('owner_login'), {'email': 'owner@example.com', 'password': 'secret'},
+                                    REMOTE_ADDR='10.0.0.2')
+        self.assertRedirects(response, reverse('owner_dashboard'), fetch_redirect_response=False)
+
+    def test_success_refills_email_bucket(self):
+        for _ in range(logins.RATES['email'][0] - 1):
+            self.login('wrong')
+        self.assertEqual(self.login('secret').status_code, 302)
+        self.assertEqual(self.login('wrong').status_code, 200)
+
+    def test_stale_hash_is_upgraded(self):
+        Farmer.objects.filter(pk=self.farmer.pk).update(password_hash=make_password('secret', hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login('secret').status_code, 302)
+        self.farmer.refresh_from_db()
+        self.assertTrue(self.farmer.password_hash.startswith('pbkdf2_sha256$'))
+        stats = logins.stats()
+        self.assertEqual(stats['rehashes'], 1)
+        self.assertGreater(stats['hash_cpu_ms'], 0)
+
+
+# ---------------------- PAYMENTS ----------------------
+class MakePaymentTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.farmer = make_farmer()
+        self.booking = make_booking(self.farmer, make_machine(make_owner()), date(2025, 6, 1), date(2025, 6, 2))
+        login_farmer(self.client, self.farmer)
+
+    def pay(self, key, method='upi'):
+        return self.client.post(reverse('make_payment', args=[self.booking.booking_id]),
+                                {'payment_method': method, 'idempotency_key': key})
+
+    def test_replay_returns_first_result_without_writing(self):
+        key = self.client.get(reverse('make_payment', args=[self.booking.booking_id])).context['idempotency_key']
+        self.assertRedirects(self.pay(key), reverse('farmer_dashboard'), fetch_redirect_response=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.pay(key, method='cash')
+        self.assertRedirects(response, reverse('farmer_dashboard'), fetch_redirect_response=False)
+        self.assertFalse([q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+        self.assertIn('Payment successful', [str(m) for m in response.wsgi_request._messages][-1])
+
+        payment = Payment.objects.get()
+        self.assertEqual((payment.payment_method, payment.payment_status), ('upi', 'completed'))
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'confirmed')
+
+    def test_second_key_for_paid_booking_is_refused(self):
+        self.pay('first')
+        self.pay('second')
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_key_spent_on_another_booking_is_a_form_error(self):
+        other = make_booking(self.farmer, make_machine(self.booking.owner, number='MH-02'),
+                             date(2025, 6, 1), date(2025, 6, 2))
+        self.client.post(reverse('make_payment', args=[other.booking_id]),
+                         {'payment_method': 'upi', 'idempotency_key': 'key'})
+        response = self.pay('key')
+        self.assertRedirects(response, reverse('make_payment', args=[self.booking.booking_id]),
+                             fetch_redirect_response=False)
+        self.assertFalse(Payment.objects.filter(booking=self.booking).exists())
+
+    def test_other_farmers_booking_is_not_found(self):
+        login_farmer(self.client, make_farmer(email='other@example.com'))
+        self.assertEqual(self.pay('key').status_code, 404)
+
+
+def threads_share_test_database():
+    """Whether concurrent threads can use the test database: not SQLite's in-memory one.
+
+    SQLite also needs transaction_mode IMMEDIATE, or writers that meet fail
+    with "database is locked" instead of waiting as they would on a row lock.
+    """
+    if connection.vendor != 'sqlite':
+        return True
+    name = connection.settings_dict['TEST'].get('NAME')
+    return (bool(name) and not connection.creation.is_in_memory_db(name)
+            and connection.settings_dict['OPTIONS'].get('transaction_mode') == 'IMMEDIATE')
+
+
+@skipUnless(threads_share_test_database(), "needs a file-backed SQLite test database in IMMEDIATE mode")
+class PaymentConcurrencyTests(TransactionTestCase):
+    SUBMISSIONS = 8
+
+    def setUp(self):
+        cache.clear()
+        self.farmer = make_farmer()
+        self.booking = make_booking(self.farmer, make_machine(make_owner()), date(2025, 6, 1), date(2025, 6, 2))
+
+    def submit_in_parallel(self, keys):
+        barrier = threading.Barrier(len(keys))
+        statuses = []
+
+        def submit(key):
+            client = Client()
+            login_farmer(client, self.farmer)
+            barrier.wait()
+            try:
+                response = client.post(reverse('make_payment', args=[self.booking.booking_id]),
+                                       {'payment_method': 'upi', 'idempotency_key': key})
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_double_clicks_create_one_payment(self):
+        statuses = self.submit_in_parallel(['same-key'] * self.SUBMISSIONS)
+        self.assertEqual(statuses, [302] * self.SUBMISSIONS)
+        self.assertEqual(Payment.objects.filter(booking=self.booking).count(), 1)
+
+    def test_parallel_tabs_create_one_payment(self):
+        statuses = self.submit_in_parallel([f'tab-{i}' for i in range(self.SUBMISSIONS)])
+        self.assertEqual(statuses, [302] * self.SUBMISSIONS)
+        self.assertEqual(Payment.objects.filter(booking=self.booking).count(), 1)
+
+
+# ---------------------- JOB QUEUE ----------------------
+FLAKY_CALLS = []
+
+
+@jobs.task
+def flaky_task(failures):
+    FLAKY_CALLS.append(failures)
+    if len(FLAKY_CALLS) <= failures:
+        raise RuntimeError("temporary failure")
+
+
+class JobQueueTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        FLAKY_CALLS.clear()
+
+    def test_retries_with_backoff_then_succeeds(self):
+        job = jobs.enqueue(flaky_task, 1)
+        with self.assertLogs('booking.jobs', 'WARNING'):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('temporary failure', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        job = jobs.enqueue(flaky_task, 10, max_attempts=2)
+        for _ in range(2):
+            with self.assertLogs('booking.jobs', 'WARNING'):
+                jobs.run_pending()
+            Job.objects.filter(pk=job.pk, status='queued').update(run_at=timezone.now())
+        job.refresh_from_db()
+        self.assertEqual((job.status, len(FLAKY_CALLS)), ('failed', 2))
+
+    def test_only_registered_tasks_can_be_enqueued(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue(print, 'hello')
+
+
+class JobWorkerTests(TransactionTestCase):
+    def test_thread_pool_drains_the_queue(self):
+        FLAKY_CALLS.clear()
+        for _ in range(6):
+            jobs.enqueue(flaky_task, 0)
+
+        stop = threading.Event()
+        worker = threading.Thread(target=jobs.work, kwargs={'concurrency': 3, 'poll_interval': 0.05, 'stop': stop})
+        worker.start()
+        try:
+            for _ in range(200):
+                if not Job.objects.exclude(status='done').exists():
+                    break
+                time.sleep(0.05)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertEqual(Job.objects.filter(status='done', attempts=1).count(), 6)
+        self.assertEqual(len(FLAKY_CALLS), 6)
+
+
+class NotificationTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner, approval_status='pending')
+
+    def test_approval_notifies_owner_out_of_band(self):
+        User.objects.create_user('admin@example.com', password='secret', is_staff=True)
+        self.client.login(username='admin@example.com', password='secret')
+        self.client.get(reverse('approve_machine', args=[self.machine.machine_id]))
+        self.assertEqual(mail.outbox, [])
+        jobs.run_pending()
+        self.assertEqual(mail.outbox[0].to, ['owner@example.com'])
+        self.assertIn('approved', mail.outbox[0].subject)
+
+    def test_cash_confirmation(self):
+        booking = make_booking(self.farmer, self.machine, date(2025, 6, 1), date(2025, 6, 2))
+        login_farmer(self.client, self.farmer)
+        self.client.post(reverse('make_payment', args=[booking.booking_id]),
+                         {'payment_method': 'cash', 'idempotency_key': 'k'})
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertTrue(response.context['bookings'][0].awaiting_cash)
+
+        self.client.post(reverse('confirm_cash_payment', args=[booking.booking_id]))
+        self.assertEqual(Payment.objects.get().payment_status, 'completed')
+        jobs.run_pending()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         ['farmer@example.com', 'farmer@example.com', 'owner@example.com'])
+
+
+# ---------------------- ASYNC DASHBOARDS ----------------------
+@override_settings(ANALYTICS_DATABASE='default')
+class AsyncDashboardTests(TransactionTestCase):
+    # Transactional: the async views query from pool threads with their own connections.
+    def setUp(self):
+        cache.clear()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        machine = make_machine(self.owner)
+        make_machine(self.owner, number='MH-02', approval_status='pending')
+        booking = make_booking(self.farmer, machine, date(2025, 6, 1), date(2025, 6, 2), status='confirmed')
+        Payment.objects.create(booking=booking, farmer=self.farmer, owner=self.owner, amount=booking.total_price,
+                               payment_method='cash', payment_status='pending')
+
+    def compare(self, sync_name, async_name, keys):
+        sync = self.client.get(reverse(sync_name))
+        self.async_client.cookies = self.client.cookies
+        response = async_to_sync(self.async_client.get)(reverse(async_name))
+        self.assertEqual(response.status_code, 200)
+        for key in keys:
+            expected, actual = sync.context[key], response.context[key]
+            if hasattr(expected, '__iter__') and not isinstance(expected, (str, dict)):
+                expected, actual = [getattr(r, 'pk', r) for r in expected], [getattr(r, 'pk', r) for r in actual]
+            self.assertEqual(expected, actual, key)
+        return response
+
+    def test_farmer_dashboard(self):
+        login_farmer(self.client, self.farmer)
+        self.compare('farmer_dashboard', 'farmer_dashboard_async',
+                     ['machines', 'bookings', 'payments', 'summary', 'chartDataJSON', 'owners'])
+
+    def test_owner_dashboard(self):
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        response = self.compare('owner_dashboard', 'owner_dashboard_async',
+                                ['machines', 'bookings', 'bank', 'total_earnings', 'income_data'])
+        self.assertTrue(response.context['bookings'][0].awaiting_cash)
+
+    def test_owner_dashboard_ignores_a_bad_year(self):
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        self.async_client.cookies = self.client.cookies
+        for value in ('0', '9999'):
+            response = async_to_sync(self.async_client.get)(reverse('owner_dashboard_async'), {'year': value})
+            self.assertEqual(response.context['income_data']['year'], timezone.localdate().year)
+
+    def test_admin_dashboard(self):
+        User.objects.create_user('admin@example.com', password='secret', is_staff=True)
+        self.client.login(username='admin@example.com', password='secret')
+        self.compare('admin_dashboard', 'admin_dashboard_async', ['summary', 'users', 'machines', 'bookings'])
+
+    def test_middleware_stack_stays_async(self):
+        # With DEBUG on, Django logs every middleware it has to wrap for the other mode.
+        with override_settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    def test_redirects_without_session(self):
+        response = async_to_sync(self.async_client.get)(reverse('farmer_dashboard_async'))
+        self.assertRedirects(response, reverse('farmer_login'), fetch_redirect_response=False)
+        response = async_to_sync(self.async_client.get)(reverse('admin_dashboard_async'))
+        self.assertEqual(response.status_code, 302)
+
+
+# ---------------------- BOOKING LIFECYCLE ----------------------
+class BookingLifecycleTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner)
+
+    def test_transitions_are_validated(self):
+        booking = make_booking(self.farmer, self.machine, date(2025, 6, 1), date(2025, 6, 2))
+        lifecycle.transition(booking, 'confirmed')
+        lifecycle.transition(booking, 'completed')
+        with self.assertRaises(lifecycle.InvalidTransition):
+            lifecycle.transition(booking, 'cancelled')
+        with self.assertRaises(lifecycle.InvalidTransition):
+            lifecycle.bulk_transition(Booking.objects.all(), 'cancelled', 'pending')
+
+        login_farmer(self.client, self.farmer)
+        self.client.get(reverse('cancel_booking', args=[booking.booking_id]))
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'completed')
+
+    def test_cancelled_booking_cannot_be_paid(self):
+        booking = make_booking(self.farmer, self.machine, date(2025, 6, 1), date(2025, 6, 2), status='cancelled')
+        login_farmer(self.client, self.farmer)
+        self.client.post(reverse('make_payment', args=[booking.booking_id]), {'payment_method': 'upi'})
+        self.assertFalse(Payment.objects.exists())
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'cancelled')
+
+    def test_sweep_in_batches_keeps_rollups_and_caches_current(self):
+        today = date(2025, 6, 10)
+        for day in range(1, 6):
+            make_booking(self.farmer, self.machine, date(2025, 6, day), date(2025, 6, day), status='confirmed')
+        stale = make_booking(self.farmer, self.machine, date(2025, 6, 8), date(2025, 6, 9))
+        ongoing = make_booking(self.farmer, self.machine, date(2025, 6, 9), date(2025, 6, 12), status='confirmed')
+        jobs.run_pending()
+        versions = dashboard_cache.versions([f'farmer:{self.farmer.pk}', 'global'])
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = lifecycle.sweep(today=today, batch_size=2)
+        self.assertEqual(counts, {'completed': 5, 'expired': 1})
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "bookings"')]
+        self.assertEqual(len(updates), 4)  # 2 + 2 + 1 completed, 1 expired
+
+        self.assertEqual(Booking.objects.filter(status='completed').count(), 5)
+        self.assertEqual(Booking.objects.get(pk=stale.pk).status, 'cancelled')
+        self.assertEqual(Booking.objects.get(pk=ongoing.pk).status, 'confirmed')
+        self.assertNotEqual(dashboard_cache.versions([f'farmer:{self.farmer.pk}', 'global']), versions)
+
+        jobs.run_pending()
+        incremental = sorted(MonthlyRollup.objects.values_list('status', 'booking_count'))
+        rollups.rebuild()
+        self.assertEqual(incremental, sorted(MonthlyRollup.objects.values_list('status', 'booking_count')))
+        self.assertEqual(incremental, [('cancelled', 1), ('completed', 5), ('confirmed', 1)])
+
+        self.assertEqual(lifecycle.sweep(today=today), {'completed': 0, 'expired': 0})
+
+
+# ---------------------- DEMAND FORECAST ----------------------
+class DemandForecastTests(AgriTestCase):
+    today = date(2025, 6, 30)  # a Monday; history starts on Monday 7 April
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.weekly = make_machine(self.owner, 'MH-01')
+        self.idle = make_machine(self.owner, 'MH-02')
+        self.busy = make_machine(self.owner, 'MH-03', machine_name='Combine', machine_type='Harvester')
+        villager = make_farmer(village=' rampur ')
+        other = make_farmer(email='other@example.com')
+
+        first = self.today - timedelta(days=forecasting.HISTORY_DAYS)
+        for week in range(12):
+            monday = first + timedelta(weeks=week)
+            make_booking(villager, self.weekly, monday, monday, status='completed')
+        make_booking(villager, self.weekly, first - timedelta(days=7), first - timedelta(days=7), status='cancelled')
+        wednesday = self.today + timedelta(days=2)
+        make_booking(other, self.idle, wednesday, wednesday)
+        make_booking(other, self.busy, first - timedelta(days=10), self.today + timedelta(days=6), status='confirmed')
+
+    def test_daily_counts_clip_inclusive_spans(self):
+        first = date(2025, 6, 1)
+        counts = forecasting.daily_counts([
+            ('a', date(2025, 5, 30), date(2025, 6, 2)),
+            ('a', date(2025, 6, 2), date(2025, 6, 3)),
+            ('b', date(2025, 6, 4), date(2025, 6, 9)),
+            ('b', date(2025, 7, 1), date(2025, 7, 2)),
+        ], first, 5)
+        self.assertEqual(list(counts['a']), [1, 2, 1, 0, 0])
+        self.assertEqual(list(counts['b']), [0, 0, 0, 1, 1])
+
+    def test_compute_forecasts_and_price_suggestions(self):
+        out = io.StringIO()
+        call_command('compute_forecasts', '--today', self.today.isoformat(), stdout=out)
+        self.assertIn('3 demand forecasts and 3 price suggestions', out.getvalue())
+
+        tillage = DemandForecast.objects.get(scope='machine_type', key='Tillage')
+        self.assertEqual((tillage.booked_days, tillage.capacity, tillage.utilisation), (12, 2, 7.1))
+        # Mondays from history, plus the booking already made for Wednesday.
+        self.assertEqual(tillage.forecast, [1.0, 0, 1, 0, 0, 0, 0])
+        village = DemandForecast.objects.get(scope='village')
+        self.assertEqual((village.key, village.capacity, village.utilisation), ('Rampur', 1, 14.3))
+
+        suggestions = {s.machine_id: s for s in PriceSuggestion.objects.all()}
+        self.assertEqual(suggestions[self.busy.pk].suggested_price, Decimal('1200.00'))
+        self.assertEqual(suggestions[self.busy.pk].utilisation, 100.0)
+        self.assertEqual(suggestions[self.weekly.pk].change_percent, -15)
+        self.assertEqual(suggestions[self.idle.pk].suggested_price, Decimal('850.00'))
+
+        forecasting.compute(today=self.today)
+        self.assertEqual(PriceSuggestion.objects.count(), 3)
+        self.assertEqual(DemandForecast.objects.count(), 3)
+
+    def test_owner_dashboard_reads_precomputed_rows(self):
+        session = self.client.session
+        session['owner_id'] = self.owner.owner_id
+        session.save()
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertContains(response, 'No forecast yet')
+
+        forecasting.compute(today=self.today)
+        with CaptureQueriesContext(connection) as queries:
+            insights = forecasting.owner_insights(self.owner)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(insights['busiest_type'].machine_type, 'Harvester')
+        self.assertEqual(insights['forecast_chart']['labels'][0], 'Mon 30 Jun')
+        self.assertEqual(insights['forecast_chart']['data'][:3], [2.0, 1.0, 2.0])
+
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertContains(response, 'Increase price to ₹1200.00')
+        self.assertContains(response, 'Rampur: 14.3% utilisation')
+        self.assertNotContains(response, 'Increase price by 10%')
+
+
+# ---------------------- OCCUPANCY ----------------------
+class OccupancyTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.tractor = make_machine(self.owner, 'MH-01')
+        self.harvester = make_machine(self.owner, 'MH-02', machine_type='Harvester')
+        self.idle = make_machine(make_owner('other@example.com'), 'MH-03')
+
+    def test_bitmaps_count_overlapping_days_once(self):
+        first = date(2024, 1, 1)
+        maps = occupancy.bitmaps([
+            (1, date(2023, 12, 30), date(2024, 1, 2)),
+            (1, date(2024, 1, 2), date(2024, 1, 3)),
+            (1, date(2024, 1, 8), date(2024, 1, 8)),
+            (2, date(2024, 2, 1), date(2024, 2, 5)),
+        ], first, 10)
+        self.assertEqual(maps, {1: 0b0010000111})
+        self.assertEqual(occupancy.idle_streaks(maps[1], 10), (4, 2))
+        self.assertEqual(occupancy.idle_streaks(0, 10), (10, 10))
+
+    def test_per_machine_owner_and_type(self):
+        make_booking(self.farmer, self.tractor, date(2024, 1, 1), date(2024, 1, 10), status='completed')
+        make_booking(self.farmer, self.tractor, date(2024, 1, 5), date(2024, 1, 14), status='confirmed')
+        make_booking(self.farmer, self.tractor, date(2024, 3, 1), date(2024, 3, 1), status='cancelled')
+        make_booking(self.farmer, self.harvester, date(2024, 3, 4), date(2024, 3, 10), status='completed')
+        result = occupancy.Occupancy(date(2024, 1, 1), date(2024, 3, 31))
+
+        machines = result.per_machine()
+        self.assertEqual(machines[self.tractor.pk]['booked_days'], 14)
+        self.assertEqual(machines[self.tractor.pk]['longest_idle'], 77)
+        self.assertEqual(machines[self.harvester.pk]['current_idle'], 21)
+        self.assertEqual(machines[self.idle.pk]['utilisation'], 0)
+
+        owners = result.per_owner()
+        self.assertEqual(owners[self.owner.pk]['booked_days'], 21)
+        self.assertEqual(owners[self.owner.pk]['utilisation'], round(21 * 100 / (2 * 91), 1))
+        self.assertEqual(owners[self.idle.owner_id]['idle_machines'], 1)
+        self.assertEqual(result.per_type()['Tillage']['machines'], 2)
+
+        harvester = result.per_type()['Harvester']
+        self.assertEqual(result.monthly(harvester), [('Jan 2024', 0.0), ('Feb 2024', 0.0), ('Mar 2024', 22.6)])
+        # One day of each weekday, out of four Mondays-Thursdays and five Fridays-Sundays in March 2024.
+        self.assertEqual(result.heatmap(harvester)[2], ('Mar 2024', [25.0, 25.0, 25.0, 25.0, 20.0, 20.0, 20.0]))
+
+    def test_dashboards_show_occupancy(self):
+        make_booking(self.farmer, self.tractor, date(2024, 6, 1), date(2024, 6, 30), status='confirmed')
+        stats = owner_occupancy(self.owner, 2024)
+        self.assertEqual(stats['machines'][self.tractor.pk]['current_idle'], 184)
+        self.assertEqual(dict(stats['heatmap'])['Jun 2024'], [50.0] * 7)
+
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        response = self.client.get(reverse('owner_dashboard'), {'year': 2024})
+        self.assertContains(response, 'Fleet Occupancy 2024')
+        self.assertContains(response, '184 / 184')
+        self.assertContains(response, f'{round(30 * 100 / 366, 1)}%')
+
+        # Only the January days of a booking that starts in December count towards 2025.
+        make_booking(self.farmer, self.tractor, date(2024, 12, 22), date(2025, 1, 10), status='confirmed')
+        response = self.client.get(reverse('owner_dashboard'), {'year': 2025})
+        self.assertContains(response, f'{round(10 * 100 / 365, 1)}%')
+
+        today = timezone.localdate()
+        make_booking(self.farmer, self.harvester, today - timedelta(days=9), today, status='confirmed')
+        rows = {row['machine_type']: row for row in admin_occupancy()}
+        self.assertEqual(rows['Harvester']['utilisation'], round(10 * 100 / 365, 1))
+        self.assertEqual(rows['Tillage']['idle_machines'], 2)
+        self.assertIsNone(rows['Tillage']['peak_month'])
+
+    def test_out_of_range_year_means_this_year(self):
+        this_year = owner_occupancy(self.owner, timezone.localdate().year)
+        for year in (0, -5, 9999, 10000):
+            self.assertEqual(owner_occupancy(self.owner, year), this_year)
+
+
+# ---------------------- NEARBY MACHINES ----------------------
+class NearbyMachineTests(AgriTestCase):
+    lat, lon = 18.5204, 73.8567
+    day = date(2025, 7, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner(latitude=self.lat, longitude=self.lon)
+        self.farmer = make_farmer(latitude=self.lat, longitude=self.lon)
+
+        def place(number, dlat=0.0, dlon=0.0, **fields):
+            return make_machine(self.owner, number, latitude=self.lat + dlat, longitude=self.lon + dlon, **fields)
+
+        self.near = place('MH-NEAR', 0.01)
+        self.mid = place('MH-MID', 0.05)
+        self.west = place('MH-WEST', dlon=-0.1)  # another grid column
+        self.far = place('MH-FAR', 0.2, machine_type='Harvesting')
+        place('MH-OUT', 0.3)
+        place('MH-PENDING', 0.002, approval_status='pending')
+        booked = place('MH-BOOKED', 0.005)
+        make_booking(self.farmer, booked, self.day - timedelta(days=2), self.day, status='confirmed')
+
+    def test_grid_cells_and_distance(self):
+        self.assertEqual(self.near.geo_cell, geo.cell(self.near.latitude, self.near.longitude))
+        self.assertEqual(self.west.geo_cell, self.near.geo_cell - 1)
+        self.assertAlmostEqual(geo.distance_km(18.5204, 73.8567, 19.0760, 72.8777), 119.5, delta=1)
+        self.assertIsNone(geo.parse_point('91', '73'))
+        self.assertIsNone(geo.parse_point('', None))
+
+    def test_nearest_available_orders_by_distance_and_skips_booked(self):
+        nearest = geo.nearest_available(self.lat, self.lon, self.day, self.day)
+        self.assertEqual([m.pk for m in nearest], [self.near.pk, self.mid.pk, self.west.pk, self.far.pk])
+        self.assertAlmostEqual(nearest[1].distance_km, 5.56, delta=0.05)
+
+        with CaptureQueriesContext(connection) as queries:
+            nearest = geo.nearest_available(self.lat, self.lon, self.day, self.day, limit=2)
+        self.assertEqual([m.pk for m in nearest], [self.near.pk, self.mid.pk])
+        self.assertEqual(len(queries), 3)  # 5 km, 10 km, then the machines themselves
+
+        later = geo.nearest_available(self.lat, self.lon, self.day + timedelta(days=1), self.day + timedelta(days=1),
+                                      radius_km=1, machine_type='Tillage')
+        self.assertEqual([m.machine_number for m in later], ['MH-BOOKED'])
+
+    def test_api(self):
+        url = reverse('api_machines_nearby')
+        response = self.client.get(url, {'lat': self.lat, 'lon': self.lon, 'start': '2025-07-01', 'type': 'Harvesting'})
+        self.assertEqual([m['machine_id'] for m in response.json()['results']], [self.far.pk])
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'lat': self.lat, 'lon': self.lon, 'start': 'soon'}).status_code, 400)
+
+        login_farmer(self.client, self.farmer)
+        response = self.client.get(url, {'start': '2025-07-01', 'radius': '6'})
+        self.assertEqual([m['machine_id'] for m in response.json()['results']], [self.near.pk, self.mid.pk])
+
+    def test_new_machines_take_the_owner_location(self):
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        self.client.post(reverse('add_machine'), {
+            'machine_name': 'Rotavator', 'machine_number': 'MH-NEW', 'machine_type': 'Tillage',
+            'machine_use': 'Tilling', 'price_per_day': '800',
+        })
+        machine = Machine.objects.get(machine_number='MH-NEW')
+        self.assertEqual((machine.latitude, machine.longitude), (self.lat, self.lon))
+        self.assertEqual(machine.geo_cell, geo.cell(self.lat, self.lon))
+
+        login_farmer(self.client, self.farmer)
+        response = self.client.get(reverse('farmer_dashboard'))
+        self.assertContains(response, 'Nearest machines free today')
+        self.assertContains(response, '1.11 km')
+
+
+# ---------------------- MACHINE IMAGES ----------------------
+def image_upload(name='photo.jpg', size=(800, 600), color='green', fmt='JPEG'):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class MachineImageTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.owner = make_owner()
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+
+    def add_machine(self, number, upload):
+        return self.client.post(reverse('add_machine'), {
+            'machine_name': 'Tractor', 'machine_number': number, 'machine_type': 'Tillage',
+            'machine_use': 'Ploughing', 'price_per_day': '1000', 'machine_image': upload,
+        })
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, f), self.media_root)
+            for root, _, files in os.walk(self.media_root) for f in files
+        )
+
+    def test_same_photo_is_stored_and_resized_once(self):
+        self.add_machine('MH-01', image_upload('first.JPG'))
+        self.add_machine('MH-02', image_upload('second.jpg'))
+        first, second = Machine.objects.order_by('machine_id')
+        self.assertEqual(first.machine_image.name, second.machine_image.name)
+        self.assertRegex(first.machine_image.name, r'^machines/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(first.thumbnail_url, first.image_url)
+
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(len(self.stored_files()), 4)
+        first.refresh_from_db()
+        self.assertEqual(first.thumbnail_widths, [160, 320, 640])
+        self.assertTrue(first.thumbnail_url.endswith('-320.webp'))
+        self.assertEqual(first.image_srcset.count('w, '), 2)
+
+        Machine.objects.update(approval_status='approved')
+        farmer = make_farmer()
+        login_farmer(self.client, farmer)
+        response = self.client.get(reverse('farmer_dashboard'))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, f'srcset="{first.image_srcset}"')
+
+        response = self.client.get(first.thumbnail_url)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_small_photo_gets_one_thumbnail(self):
+        self.add_machine('MH-01', image_upload(size=(100, 80)))
+        jobs.run_pending()
+        self.assertEqual(Machine.objects.get().thumbnail_widths, [100])
+
+    def test_non_images_are_rejected(self):
+        upload = SimpleUploadedFile('photo.jpg', b'not really a photo', content_type='image/jpeg')
+        response = self.add_machine('MH-01', upload)
+        self.assertRedirects(response, reverse('add_machine'), fetch_redirect_response=False)
+        self.assertFalse(Machine.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_decompression_bombs_are_rejected(self):
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        # A few bytes of PNG header declaring 20000 x 20000 pixels.
+        header = struct.pack('>IIBBBBB', 20000, 20000, 8, 2, 0, 0, 0)
+        png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+        self.add_machine('MH-01', SimpleUploadedFile('photo.png', png, content_type='image/png'))
+        self.assertFalse(Machine.objects.exists())
+
+    def test_extension_comes_from_the_image_format(self):
+        self.add_machine('MH-01', image_upload('photo.html', fmt='PNG'))
+        self.assertRegex(Machine.objects.get().machine_image.name, r'\.png$')
+        response = self.client.get(Machine.objects.get().image_url)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+        # Readable by Pillow, but not one of the formats we serve.
+        self.add_machine('MH-02', image_upload('photo.svg', fmt='GIF'))
+        self.assertEqual(Machine.objects.count(), 1)
+
+
+# ---------------------- REQUEST METRICS ----------------------
+class RequestMetricsTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.recorder.clear()
+        self.addCleanup(metrics.recorder.clear)
+        owner = make_owner()
+        for number in ('MH-01', 'MH-02'):
+            make_machine(owner, number)
+        login_farmer(self.client, make_farmer())
+
+    def test_queries_and_template_time_are_recorded_per_view(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('farmer_dashboard'))
+        self.client.get(reverse('farmer_dashboard'))
+
+        stats = metrics.recorder.snapshot()['farmer_dashboard']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreaterEqual(stats['queries_per_request'][0.99], len(queries))
+        self.assertGreater(stats['template_seconds'], 0)
+        self.assertLessEqual(stats['db_seconds'] + stats['template_seconds'], stats['seconds'])
+        self.assertLessEqual(stats['latency'][0.5], stats['latency'][0.99])
+
+    def test_metrics_endpoint_is_for_admins_only(self):
+        self.client.get(reverse('farmer_dashboard'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        admin = User.objects.create_user('admin@example.com', password='secret', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('agri_http_requests_total{view="farmer_dashboard"} 1\n', body)
+        self.assertIn('agri_http_request_duration_seconds{view="farmer_dashboard",quantile="0.95"}', body)
+        self.assertIn('# TYPE agri_db_queries_total counter', body)
+
+    @override_settings(METRICS_BEARER_TOKEN='scrape-token')
+    def test_metrics_endpoint_accepts_the_scrape_token(self):
+        client = Client()
+        self.assertEqual(client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200)
+
+    def test_async_requests_are_recorded_without_leaving_the_event_loop(self):
+        async def view(request):
+            return HttpResponse(status=204)
+
+        middleware = metrics.MetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/')).status_code, 204)
+        self.assertEqual(metrics.recorder.snapshot()['unresolved']['requests'], 1)
+
+    def test_ring_buffer_keeps_the_latest_requests(self):
+        recorder = metrics.Recorder(window=3)
+        for seconds in (5.0, 0.1, 0.2, 0.3):
+            recorder.record('view', seconds, metrics._Sample(), 200)
+        stats = recorder.snapshot()['view']
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['latency'][0.99], 0.3)
+
+    def test_slow_requests_are_profiled_and_reported(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(METRICS_PROFILE_DIR=directory.name, METRICS_PROFILE_SAMPLE_RATE=1,
+                               METRICS_SLOW_REQUEST_MS=0):
+            client = Client()
+            login_farmer(client, Farmer.objects.get())
+            client.get(reverse('farmer_dashboard'))
+        profiles = os.listdir(directory.name)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith('farmer_dashboard.'))
+
+        out = io.StringIO()
+        call_command('profile_report', '--dir', directory.name, '--clear', stdout=out)
+        self.assertIn('farmer_dashboard: 1 slow request(s)', out.getvalue())
+        self.assertIn('function calls', out.getvalue())
+        self.assertEqual(os.listdir(directory.name), [])
+
+
+# ---------------------- SYNTHETIC DATA AND BENCHMARKS ----------------------
+class SyntheticDataTests(AgriTestCase):
+    def test_seed_synthetic_fills_every_table_without_double_bookings(self):
+        call_command('seed_synthetic', '--rows', '2000', '--machines', '20', stdout=io.StringIO())
+        self.assertEqual(Owner.objects.count(), 20)
+        self.assertEqual(Farmer.objects.count(), 100)
+        self.assertEqual(Machine.objects.count(), 20)
+        self.assertEqual(Booking.objects.count(), 1000)
+        self.assertEqual(
+            Payment.objects.count(), Booking.objects.filter(status__in=('confirmed', 'completed')).count(),
+        )
+        self.assertFalse(Booking.objects.filter(status='completed', end_date__gte=timezone.localdate()).exists())
+
+        last_end = {}
+        for machine_id, start, end in Booking.objects.exclude(status='cancelled').order_by(
+            'machine_id', 'start_date',
+        ).values_list('machine_id', 'start_date', 'end_date'):
+            self.assertLess(last_end.get(machine_id, date.min), start)
+            last_end[machine_id] = end
+
+        self.assertTrue(search.search('tractor'))
+        with self.assertRaises(CommandError):
+            call_command('seed_synthetic', '--rows', '100', stdout=io.StringIO())
+
+    def test_request_paths_benchmark_writes_diffable_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'paths.json')
+            call_command('run_benchmark', 'request_paths', '-o', 'rows=300', '-o', 'requests=2',
+                         '--output', path, stdout=io.StringIO())
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(report['options'], {'rows': 300, 'requests': 2})
+        result = report['result']
+        for view in ('farmer_dashboard', 'owner_dashboard', 'admin_dashboard', 'create_booking', 'make_payment'):
+            self.assertGreater(result[view]['queries_p50'], 0)
+        self.assertEqual(result['farmer_dashboard']['warm']['count'], 2)
+        self.assertEqual(result['make_payment']['post']['count'], 2)
+        # Rolled back afterwards.
+        self.assertFalse(Booking.objects.exists())
+
+
+# ---------------------- PRINCIPAL ----------------------
+class PrincipalTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.farmer = make_farmer()
+        self.owner = make_owner()
+
+    def test_signed_in_farmer_is_loaded_once_then_cached(self):
+        self.client.post(reverse('farmer_login'), {'email': 'farmer@example.com', 'password': 'secret'})
+        for expected in (1, 0):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('create_booking'))
+            self.assertRedirects(response, reverse('farmer_dashboard'), fetch_redirect_response=False)
+            self.assertEqual(sum('"farmers"' in q['sql'] for q in ctx.captured_queries), expected)
+
+        cached = principal.account('farmer', self.farmer.pk)
+        self.assertIn('password_hash', cached.get_deferred_fields())
+        self.farmer.name = 'Renamed'
+        self.farmer.save()
+        self.assertEqual(principal.account('farmer', self.farmer.pk).name, 'Renamed')
+
+    def test_log_in_starts_a_new_session_for_one_role(self):
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        old_key = session.session_key
+
+        self.client.post(reverse('farmer_login'), {'email': 'farmer@example.com', 'password': 'secret'})
+        session = self.client.session
+        self.assertNotEqual(session.session_key, old_key)
+        self.assertEqual(session['farmer_id'], self.farmer.pk)
+        self.assertNotIn('owner_id', session)
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertRedirects(response, reverse('owner_login'), fetch_redirect_response=False)
+
+    def test_role_decorators(self):
+        machine = make_machine(self.owner, approval_status='pending')
+        login_farmer(self.client, self.farmer)
+        self.assertEqual(self.client.get(reverse('farmer_dashboard_async')).status_code, 200)
+        response = self.client.get(reverse('add_bank'))
+        self.assertRedirects(response, reverse('owner_login'), fetch_redirect_response=False)
+
+        self.client.force_login(User.objects.create_user('staff@example.com', password='secret'))
+        response = self.client.get(reverse('approve_machine', args=[machine.pk]))
+        self.assertTrue(response.url.startswith(reverse('admin_login')))
+        machine.refresh_from_db()
+        self.assertEqual(machine.approval_status, 'pending')
+
+    def test_middleware_stays_async_under_asgi(self):
+        async def view(request):
+            who = await request.aprincipal()
+            return HttpResponse(who.role or 'anonymous')
+
+        middleware = principal.PrincipalMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.session, request.user = {}, None
+        self.assertEqual(async_to_sync(middleware)(request).content, b'anonymous')
+
+
+# ---------------------- MODERATION ----------------------
+class ModerationTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.other = make_owner(email='other@example.com')
+        self.machines = [make_machine(self.owner, f'MH-{i}', approval_status='pending') for i in range(6)]
+        self.admin = User.objects.create_user('admin@example.com', password='secret', is_staff=True)
+
+    def test_queue_filters(self):
+        harvester = make_machine(self.other, 'OT-1', machine_type='Harvesting', approval_status='pending')
+        Machine.objects.filter(pk=harvester.pk).update(created_at=timezone.now() - timedelta(days=10))
+        make_machine(self.other, 'OT-2')
+
+        self.assertEqual(moderation.pending_queue().count(), 7)
+        self.assertEqual(list(moderation.pending_queue(owner=self.other.pk)), [harvester])
+        self.assertEqual(list(moderation.pending_queue(machine_type='Harvesting')), [harvester])
+        self.assertEqual(list(moderation.pending_queue(min_age_days=7)), [harvester])
+        self.assertEqual(moderation.pending_queue(max_age_days=7).count(), 6)
+        self.assertEqual(moderation.queue_filters({'owner': 'x', 'min_age_days': '-1', 'q': ' MH '}),
+                         {'owner': None, 'machine_type': None, 'min_age_days': None, 'max_age_days': None, 'q': 'MH'})
+
+    def test_bulk_approve_is_set_based_and_audited(self):
+        ids = [m.pk for m in self.machines]
+        with CaptureQueriesContext(connection) as small:
+            moderation.review(ids[:2], 'approve', admin=self.admin)
+        with CaptureQueriesContext(connection) as large:
+            result = moderation.review(ids, 'approve', admin=self.admin, reason='checked')
+        # The statement count does not grow with the number of machines.
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+        self.assertEqual((result.reviewed, result.skipped, result.status), (4, 2, 'approved'))
+        self.assertFalse(Machine.objects.exclude(approval_status='approved').exists())
+        audits = ModerationAudit.objects.filter(batch=result.batch)
+        self.assertEqual(sorted(a.machine_id for a in audits), ids[2:])
+        self.assertEqual({(a.admin, a.previous_status, a.new_status, a.reason) for a in audits},
+                         {(self.admin, 'pending', 'approved', 'checked')})
+        self.assertTrue(MachineSearchTerm.objects.filter(machine_id=ids[5]).exists())
+
+    def test_one_email_per_owner(self):
+        other_machine = make_machine(self.other, 'OT-1', approval_status='pending')
+        moderation.review([m.pk for m in self.machines] + [other_machine.pk], 'reject')
+        self.assertEqual(Job.objects.count(), 2)
+        jobs.run_pending()
+        subjects = {m.to[0]: m.subject for m in mail.outbox}
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(subjects['owner@example.com'], "6 of your machines were reviewed")
+        self.assertIn('rejected', subjects['other@example.com'])
+
+    def test_reject_drops_search_terms(self):
+        moderation.review([self.machines[0].pk], 'approve')
+        self.assertTrue(MachineSearchTerm.objects.filter(machine=self.machines[0]).exists())
+        moderation.review([self.machines[0].pk], 'reject')
+        self.assertFalse(MachineSearchTerm.objects.filter(machine=self.machines[0]).exists())
+
+    def test_queue_view_reviews_all_matching(self):
+        make_machine(self.other, 'OT-1', approval_status='pending')
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('moderation_queue'), {'owner': self.owner.pk})
+        self.assertEqual(response.context['total'], 6)
+
+        self.client.post(reverse('moderation_queue'), {'action': 'approve', 'scope': 'all', 'owner': self.owner.pk})
+        self.assertEqual(Machine.objects.filter(approval_status='approved').count(), 6)
+        self.assertEqual(Machine.objects.get(machine_number='OT-1').approval_status, 'pending')
+
+    def test_api_is_for_admins(self):
+        url = reverse('api_moderation_review')
+        payload = {'action': 'approve', 'machine_ids': [self.machines[0].pk]}
+        self.assertEqual(self.client.post(url, payload, content_type='application/json').status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('api_moderation_queue'), {'owner': self.owner.pk})
+        self.assertEqual(len(response.json()['results']), 6)
+        response = self.client.post(url, {'action': 'hide', 'machine_ids': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.json()['reviewed'], 1)
+        self.assertEqual(Machine.objects.get(pk=self.machines[0].pk).approval_status, 'approved')
+
+
+# ---------------------- STATIC ASSETS ----------------------
+class StaticAssetTests(AgriTestCase):
+    def test_pages_load_nothing_from_a_cdn(self):
+        root = apps.get_app_config('booking').path
+        sources = [os.path.join(root, name) for name in os.listdir(root) if name.endswith('.html')]
+        scripts = os.path.join(root, 'static', 'booking', 'js')
+        sources += [os.path.join(scripts, name) for name in os.listdir(scripts)]
+        for path in sources:
+            with open(path, encoding='utf-8') as f:
+                self.assertNotRegex(f.read(), r'(src|href)="https?://', path)
+        response = self.client.get(reverse('farmer_login'))
+        self.assertContains(response, '/static/booking/css/farmer_login.css')
+
+    def test_collected_files_are_hashed_precompressed_and_cached_for_good(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings = override_settings(STATIC_ROOT=root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        out = io.StringIO()
+        call_command('build_assets', stdout=out)
+
+        with open(os.path.join(root.name, 'staticfiles.json')) as f:
+            hashed = json.load(f)['paths']['booking/css/app.css']
+        self.assertRegex(hashed, r'^booking/css/app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(root.name, hashed + '.gz')))
+        self.assertIn(hashed, out.getvalue())
+
+        response = self.client.get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(self.client.get('/static/booking/css/app.css').headers['Cache-Control'],
+                         'public, max-age=3600')
+        self.assertEqual(self.client.get('/static/' + hashed + '.gz').status_code, 404)
+
+
+# ---------------------- FRAGMENT CACHE ----------------------
+class FragmentCacheTests(AgriTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machines = [make_machine(self.owner, f'MH-{i}') for i in range(3)]
+
+    def cards(self):
+        return fragments.render_many('machine_card', Machine.objects.select_related('owner').order_by('pk'))
+
+    def test_cards_are_rendered_once_until_the_machine_changes(self):
+        first = self.cards()
+        self.assertEqual(fragments.stats()['misses'], 3)
+        self.assertEqual(self.cards(), first)
+        self.assertEqual(fragments.stats()['hits'], 3)
+
+        machine = self.machines[1]
+        machine.price_per_day = Decimal('1234.00')
+        machine.save()
+        html = self.cards()
+        self.assertIn('₹1234.00/day', html)
+        self.assertEqual(fragments.stats(), {'hits': 5, 'misses': 4, 'hit_ratio': 0.556})
+
+    def test_dashboards_share_cached_rows(self):
+        other = make_farmer(email='other@example.com')
+        make_booking(self.farmer, self.machines[0], date(2030, 1, 1), date(2030, 1, 2))
+        login_farmer(self.client, self.farmer)
+        self.assertContains(self.client.get(reverse('farmer_dashboard')), 'data-machine-id=', count=3)
+        login_farmer(self.client, other)
+        response = self.client.get(reverse('farmer_dashboard'))
+        self.assertContains(response, 'No bookings found.')
+        # The second farmer's machine cards all came from the cache.
+        self.assertEqual(fragments.stats()['hits'], 3)
+
+    def test_csrf_token_is_filled_in_per_request(self):
+        booking = make_booking(self.farmer, self.machines[0], date(2030, 1, 1), date(2030, 1, 2), status='confirmed')
+        Payment.objects.create(booking=booking, farmer=self.farmer, owner=self.owner, amount=booking.total_price,
+                               payment_method='cash', payment_status='pending')
+
+        def rows(token):
+            return fragments.render_many('owner_booking_row', owner_bookings(self.owner), token)
+
+        self.assertIn('value="first"', rows('first'))
+        second = rows('second')
+        self.assertIn('value="second"', second)
+        self.assertNotIn('first', second)
+        self.assertEqual(fragments.stats()['hits'], 1)
+
+        session = self.client.session
+        session['owner_id'] = self.owner.pk
+        session.save()
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertContains(response, reverse('confirm_cash_payment', args=[booking.booking_id]))
+        self.assertNotContains(response, fragments.CSRF_PLACEHOLDER)
+
+
+# ---------------------- READ REPLICA ----------------------
+@override_settings(ANALYTICS_DATABASE='replica')
+class ReplicaRoutingTests(AgriTestCase):
+    """The replica alias is a test mirror of the default database, so these check where queries are sent."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_owner()
+        self.farmer = make_farmer()
+        self.machine = make_machine(self.owner)
+
+    def queries(self, fn, *args):
+        """(queries on the primary, queries on the replica) made by ``fn(*args)``."""
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            fn(*args)
+        return len(primary), len(replica)
+
+    def test_analytics_read_from_the_replica(self):
+        for fn, args in ((admin_summary, ()), (admin_listings, ({},)), (owner_analytics, (self.owner, 2030))):
+            primary, replica = self.queries(fn, *args)
+            self.assertEqual(primary, 0, fn.__name__)
+            self.assertGreater(replica, 0, fn.__name__)
+        self.assertEqual(bulk_io.booking_export()[1].db, 'replica')
+        self.assertEqual(self.queries(Farmer.objects.count), (1, 0))
+
+    def test_writes_go_to_the_primary(self):
+        @routers.analytics
+        def add_farmer():
+            make_farmer(email='new@example.com')
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            add_farmer()
+        self.assertEqual(len(replica), 0)
+        self.assertTrue(Farmer.objects.filter(email='new@example.com').exists())
+
+    def test_booking_pins_the_farmer_to_the_primary(self):
+        login_farmer(self.client, self.farmer)
+        start = timezone.localdate() + timedelta(days=3)
+        response = self.client.post(reverse('create_booking'), {
+            'machine_id': self.machine.machine_id,
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], routers.PIN_SECONDS)
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('farmer_dashboard'))
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(response.context['summary']['total_bookings'], 1)
+
+        # Once the pin has expired the summary is rebuilt from the replica.
+        del self.client.cookies[routers.PIN_COOKIE]
+        cache.clear()
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.get(reverse('farmer_dashboard'))
+        self.assertGreater(len(replica), 0)
+
+    def test_summaries_read_from_the_replica_expire_with_the_pin(self):
+        dashboard_cache.cached('admin', ['global'], admin_summary)
+        later = time.time() + routers.PIN_SECONDS + 1
+        with mock.patch('time.time', return_value=later):
+            dashboard_cache.cached('admin', ['global'], admin_summary)
+        self.assertEqual(dashboard_cache.stats()['misses'], 2)
+
+        with override_settings(ANALYTICS_DATABASE='default'):
+            dashboard_cache.cached('admin-primary', ['global'], admin_summary)
+            with mock.patch('time.time', return_value=later):
+                dashboard_cache.cached('admin-primary', ['global'], admin_summary)
+        self.assertEqual(dashboard_cache.stats()['misses'], 3)
@@ -15,10 +15,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from booking import api, assets, async_views, images, metrics, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/machines/', api.MachineListAPIView.as_view(), name='api_machines'),
+    path('api/machines/search/', api.MachineSearchAPIView.as_view(), name='api_machine_search'),
+    path('api/machines/nearby/', api.NearbyMachinesAPIView.as_view(), name='api_machines_nearby'),
+    path('api/moderation/machines/', api.ModerationQueueAPIView.as_view(), name='api_moderation_queue'),
+    path('api/moderation/review/', api.ModerationReviewAPIView.as_view(), name='api_moderation_review'),
+    path('admin-moderation/', views.moderation_queue, name='moderation_queue'),
+    path('owner/machines/import/', views.import_machines, name='import_machines'),
+    path('bookings/export/', views.export_bookings, name='export_bookings'),
+    # Async dashboards for ASGI deployments (same templates and context as the sync views).
+    path('async/farmer-dashboard/', async_views.farmer_dashboard, name='farmer_dashboard_async'),
+    path('async/owner-dashboard/', async_views.owner_dashboard, name='owner_dashboard_async'),
+    path('async/admin-dashboard/', async_views.admin_dashboard, name='admin_dashboard_async'),
+    re_path(r'^media/(?P<path>.+)$', images.serve_media, name='media'),
+    re_path(r'^static/(?P<path>.+)$', assets.serve_static, name='static'),
+    path('metrics', metrics.metrics_view, name='metrics'),
     path('', include('booking.urls')),
 ]
 
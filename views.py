@@ -1,25 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth.hashers import make_password, check_password
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.hashers import make_password
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from django.db.models import Count
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.http import require_POST
-from django.db import transaction
-from django.db.models.functions import TruncMonth
+from django.db import IntegrityError, transaction
 from django.db import models
-from django.db.models.functions import ExtractMonth
 from django.core.serializers.json import DjangoJSONEncoder
+import csv
 import json
-import calendar
+import uuid
 
 from .models import Owner, Machine, Booking, Farmer, OwnerBankDetails, Payment
+from .availability import is_available
+from .occupancy import WEEKDAYS
+from .dashboards import (
+    ADMIN_PAGE_SIZE, admin_listings, admin_occupancy, admin_summary, farmer_listings, farmer_summary,
+    owner_analytics, owner_bookings, owner_occupancy, parse_year,
+)
+from . import (
+    bulk_io, dashboard_cache, forecasting, fragments, geo, images, jobs, lifecycle, logins, moderation, notifications,
+    principal,
+)
+from .pagination import keyset_page
+from .principal import admin_required, farmer_required, owner_required
 from django.contrib.auth.models import User
-from django.contrib.auth import authenticate, login
-from django.contrib.auth import logout as auth_logout
-from django.db.models import Sum, Count, Q
+from django.contrib.auth import authenticate
 
 
 # ---------------------- HOME ----------------------
@@ -57,10 +65,16 @@ def admin_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
-        user = authenticate(username=email, password=password)
+        wait = logins.throttle(request, email)
+        if wait:
+            messages.error(request, f"Too many login attempts. Try again in {wait} seconds.")
+            return render(request, 'booking/admin_login.html', status=429)
+
+        with logins.hashing_timer():
+            user = authenticate(username=email, password=password)
         if user is not None:
-            login(request, user)
-            request.session['admin_id'] = user.id
+            logins.login_succeeded(request, email)
+            principal.log_in(request, user)
             return redirect('admin_dashboard')
         else:
             messages.error(request, "Invalid email or password")
@@ -68,63 +82,94 @@ def admin_login(request):
     return render(request, 'booking/admin_login.html')
 
 
-@login_required(login_url='/admin-login/')
+@admin_required
 def admin_dashboard(request):
-    summary = {
-        'totalUsers': Farmer.objects.count(),
-        'totalMachines': Machine.objects.count(),
-        'activeBookings': Booking.objects.filter(status='confirmed').count(),
-        'pendingApprovals': Machine.objects.filter(approval_status='pending').count(),
-    }
-
-    bookings_per_month = (
-        Booking.objects.annotate(month=ExtractMonth('start_date'))
-        .values('month')
-        .annotate(count=Count('booking_id'))
-        .order_by('month')
-    )
-
-    machine_counts = (
-        Machine.objects.filter(approval_status='approved')  
-        .values('machine_type')
-        .annotate(count=Count('machine_id'))
-    )
-
-    chartData = {
-        'bookings': {
-            'labels': [calendar.month_name[b['month']] for b in bookings_per_month], 
-            'data': [b['count'] for b in bookings_per_month]
-        },
-        'machines': {
-            'labels': [m['machine_type'] for m in machine_counts],
-            'data': [m['count'] for m in machine_counts]
-        }
-    }
-
-    context = {
-        'summary': summary,
-        'users': Farmer.objects.all(),
-        'machines': Machine.objects.all(),
-        'bookings': Booking.objects.all(),
-        'chartDataJSON': chartData
+    data = dashboard_cache.cached('admin', ['global'], admin_summary)
+    occupancy = dashboard_cache.cached('admin_occupancy', ['global'], admin_occupancy)
+
+    listings = admin_listings(request.GET)
+    return render(request, 'booking/admin_dashboard.html', admin_context(request, data, listings, occupancy))
+
+
+def admin_context(request, data, listings, occupancy):
+    # "Next page" links keep every filter and the other tables' cursors.
+    next_urls = {}
+    for table, page in listings.items():
+        if page.has_next:
+            params = request.GET.copy()
+            params[f'{table}_after'] = page.next_cursor
+            next_urls[table] = f'?{params.urlencode()}#{table}'
+
+    return {
+        'summary': data['summary'],
+        'cache_stats': dashboard_cache.stats(),
+        'fragment_stats': fragments.stats(),
+        'login_stats': logins.stats(),
+        'users': listings['users'],
+        'machines': listings['machines'],
+        'bookings': listings['bookings'],
+        'next_urls': next_urls,
+        'filters': request.GET,
+        'status_choices': Booking.STATUS_CHOICES,
+        'approval_choices': Machine.APPROVAL_CHOICES,
+        'chartDataJSON': data['chartData'],
+        'type_occupancy': occupancy,
     }
 
-    return render(request, 'booking/admin_dashboard.html', context)
-
+@admin_required
 def approve_machine(request, machine_id):
     machine = get_object_or_404(Machine, pk=machine_id)
-    machine.approval_status = 'approved'
-    machine.save()
+    moderation.review([machine.machine_id], 'approve', admin=request.user)
     messages.success(request, f'{machine.machine_name} approved successfully.')
     return redirect('admin_dashboard')
 
+@admin_required
 def reject_machine(request, machine_id):
     machine = get_object_or_404(Machine, pk=machine_id)
-    machine.approval_status = 'rejected'
-    machine.save()
+    moderation.review([machine.machine_id], 'reject', admin=request.user)
     messages.success(request, f'{machine.machine_name} rejected successfully.')
     return redirect('admin_dashboard')
 
+
+@admin_required
+def moderation_queue(request):
+    """Pending machines filtered by owner, type and age; POST approves or rejects a selection.
+
+    The selection is the ticked machines, or with ``scope=all`` every
+    pending machine matching the filters.
+    """
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action not in moderation.ACTIONS:
+            messages.error(request, "Choose approve or reject.")
+            return redirect(request.get_full_path())
+        if request.POST.get('scope') == 'all':
+            queue = moderation.pending_queue(**moderation.queue_filters(request.POST))
+            ids = list(queue.values_list('machine_id', flat=True))
+        else:
+            ids = [pk for pk in request.POST.getlist('machine_ids') if pk.isdigit()]
+        result = moderation.review(ids, action, admin=request.user, reason=request.POST.get('reason', '').strip())
+        messages.success(request, f"{result.reviewed} machines {result.status}"
+                                  + (f", {result.skipped} already were." if result.skipped else "."))
+        return redirect(request.get_full_path())
+
+    queue = moderation.pending_queue(**moderation.queue_filters(request.GET))
+    page = keyset_page(queue, request.GET.get('after'), ADMIN_PAGE_SIZE)
+    next_url = None
+    if page.has_next:
+        params = request.GET.copy()
+        params['after'] = page.next_cursor
+        next_url = f'?{params.urlencode()}'
+    return render(request, 'booking/moderation_queue.html', {
+        'machines': page,
+        'total': queue.count(),
+        'next_url': next_url,
+        'filters': request.GET,
+        'machine_types': Machine.objects.filter(approval_status='pending')
+                         .values_list('machine_type', flat=True).distinct().order_by('machine_type'),
+    })
+
+
 # ---------------------- FARMER ----------------------
 def farmer_register(request):
     if request.method == 'POST':
@@ -133,6 +178,7 @@ def farmer_register(request):
         phone = request.POST.get('phone').strip()
         address = request.POST.get('address').strip() 
         password = request.POST.get('password')
+        latitude, longitude = geo.parse_point(request.POST.get('latitude'), request.POST.get('longitude')) or (None, None)
 
         if Farmer.objects.filter(email=email).exists():
             messages.error(request, "Email already registered!")
@@ -144,6 +190,8 @@ def farmer_register(request):
             email=email,
             phone=phone,
             address=address, 
+            latitude=latitude,
+            longitude=longitude,
             password_hash=hashed_password,
             created_at=timezone.now(),
         )
@@ -158,10 +206,16 @@ def farmer_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
+        wait = logins.throttle(request, email)
+        if wait:
+            error = f"Too many login attempts. Try again in {wait} seconds."
+            return render(request, 'booking/farmer_login.html', {'error': error}, status=429)
+
         try:
             farmer = Farmer.objects.get(email=email)
-            if check_password(password, farmer.password_hash):
-                request.session['farmer_id'] = farmer.farmer_id
+            if logins.verify_password(farmer, password):
+                logins.login_succeeded(request, email)
+                principal.log_in(request, farmer)
                 return redirect('/farmer-dashboard/')
             else:
                 error = "Invalid password."
@@ -173,116 +227,79 @@ def farmer_login(request):
     return render(request, 'booking/farmer_login.html')
 
 def farmer_logout(request):
-    auth_logout(request)
-    request.session.flush()
+    principal.log_out(request)
     messages.success(request, "You have been logged out successfully.")
     return redirect('farmer_login')
 
 
+@farmer_required
 def farmer_dashboard(request):
-   
-    farmer_id = request.session.get('farmer_id')
-    if not farmer_id:
-        messages.error(request, "Session expired. Please log in again.")
-        return redirect('farmer_login')
-
-    try:
-        farmer = Farmer.objects.get(farmer_id=farmer_id)
-    except Farmer.DoesNotExist:
-        messages.error(request, "Farmer user not found.")
-        return redirect('farmer_login')
-
-    machines = Machine.objects.filter(approval_status='approved').select_related('owner')
-    bookings = Booking.objects.filter(farmer=farmer).select_related('machine', 'owner')
-    payments = Payment.objects.filter(farmer=farmer).select_related('booking')
+    farmer = request.principal.account
+    data = farmer_listings(farmer)
+    stats = dashboard_cache.cached('farmer', [f'farmer:{farmer.farmer_id}'], lambda: farmer_summary(farmer))
+    return render(request, 'booking/farmer_dashboard.html', farmer_context(farmer, data, stats))
 
-    # --- Summary Calculations ---
-    total_payments = payments.filter(payment_status='completed').aggregate(total=Sum('amount'))['total'] or 0
 
-    summary = {
-        'total_available_machines': machines.count(),
-        'total_bookings': bookings.count(),
-        'active_bookings': bookings.filter(status__in=['pending','confirmed']).count(),
-        'total_spent': total_payments,
-    }
+def farmer_context(farmer, data, stats):
+    summary = dict(stats['summary'], total_available_machines=len(data['machines']))
+    chartDataJSON = json.dumps(stats['chartData'], cls=DjangoJSONEncoder)
 
-    # --- Chart Data Preparation ---
-    bookings_per_month = bookings.annotate(month=ExtractMonth('start_date')) \
-                                 .values('month') \
-                                 .annotate(count=Count('booking_id')) \
-                                 .order_by('month')
-                                 
-    monthly_spend = payments.filter(payment_status='completed') \
-                            .annotate(month=ExtractMonth('payment_date')) \
-                            .values('month') \
-                            .annotate(total=Sum('amount')) \
-                            .order_by('month')
-
-    chartData = {
-        'spend': {
-            'labels': [calendar.month_name[s['month']] for s in monthly_spend],
-            'data': [float(s['total']) for s in monthly_spend]
-        },
-        'status': {
-            'labels': ['Completed', 'Pending/Confirmed', 'Cancelled'],
-            'data': [
-                bookings.filter(status='completed').count(),
-                bookings.filter(status__in=['pending','confirmed']).count(),
-                bookings.filter(status='cancelled').count()
-            ]
-        }
-    }
-    
-    chartDataJSON = json.dumps(chartData, cls=DjangoJSONEncoder)
-
-    owners = list(Owner.objects.values('owner_id', 'name', 'email', 'phone', 'address'))
-
-    # --- Context ---
-    context = {
+    return {
         'farmer': farmer,
-        'machines': machines,
-        'bookings': bookings.order_by('-start_date'),
-        'payments': payments.order_by('-payment_date'),
+        'machines': data['machines'],
+        'bookings': data['bookings'],
+        'payments': data['payments'],
         'summary': summary,
-        'chartData': chartData,          
+        'chartData': stats['chartData'],
         'chartDataJSON': chartDataJSON,
-        'owners': owners,
+        'owners': data['owners'],
+        'nearby': data['nearby'],
     }
 
-    return render(request, 'booking/farmer_dashboard.html', context)
-
 
 # ---------------------- CREATE BOOKING ----------------------
+@farmer_required
 def create_booking(request):
-    farmer_id = request.session.get('farmer_id')
-    if not farmer_id:
-        return redirect('farmer_login')
-
     if request.method == 'POST':
-        farmer = Farmer.objects.get(farmer_id=farmer_id)
+        farmer = request.principal.account
         machine_id = request.POST.get('machine_id')
-        start_date = request.POST.get('start_date')
-        end_date = request.POST.get('end_date')
 
         try:
-            machine = Machine.objects.get(pk=machine_id)
-        except Machine.DoesNotExist:
-            messages.error(request, 'Machine not found.')
+            start_date = timezone.datetime.strptime(request.POST.get('start_date'), "%Y-%m-%d").date()
+            end_date = timezone.datetime.strptime(request.POST.get('end_date'), "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            messages.error(request, 'Please choose valid booking dates.')
             return redirect('farmer_dashboard')
 
-        days = (timezone.datetime.strptime(end_date, "%Y-%m-%d").date() - 
-                timezone.datetime.strptime(start_date, "%Y-%m-%d").date()).days + 1
-        total_price = days * float(machine.price_per_day)
-
-        booking = Booking.objects.create(
-            farmer=farmer,
-            machine=machine,
-            owner=machine.owner,
-            start_date=start_date,
-            end_date=end_date,
-            total_price=total_price,
-            status='pending'
-        )
+        if end_date < start_date:
+            messages.error(request, 'End date cannot be before start date.')
+            return redirect('farmer_dashboard')
+
+        # Lock the machine row so concurrent requests for the same machine
+        # check availability and insert one after another.
+        with transaction.atomic():
+            try:
+                machine = Machine.objects.select_for_update().get(pk=machine_id)
+            except (Machine.DoesNotExist, ValueError):
+                messages.error(request, 'Machine not found.')
+                return redirect('farmer_dashboard')
+
+            if not is_available(machine, start_date, end_date):
+                messages.error(request, f'{machine.machine_name} is already booked for those dates.')
+                return redirect('farmer_dashboard')
+
+            days = (end_date - start_date).days + 1
+            total_price = days * machine.price_per_day
+
+            booking = Booking.objects.create(
+                farmer=farmer,
+                machine=machine,
+                owner_id=machine.owner_id,
+                start_date=start_date,
+                end_date=end_date,
+                total_price=total_price,
+                status='pending'
+            )
 
         messages.success(request, f'Booking created for {machine.machine_name}! Proceed to payment.')
         return redirect('make_payment', booking_id=booking.booking_id)
@@ -291,63 +308,88 @@ def create_booking(request):
 
 
 # ---------------------- MAKE PAYMENT ----------------------
+def _payment_done(request, payment_method):
+    if payment_method == 'cash':
+        messages.success(request, 'Booking confirmed! Pay cash after machine usage.')
+    else:
+        messages.success(request, 'Payment successful! Booking confirmed.')
+    return redirect('farmer_dashboard')
+
+
+@farmer_required
 def make_payment(request, booking_id):
-    farmer_id = request.session.get('farmer_id')
-    if not farmer_id:
-        return redirect('farmer_login')
+    farmer_id = request.principal.account.pk
+    idempotency_key = (request.POST.get('idempotency_key') or '').strip()[:64] or None
+    if request.method == 'POST' and idempotency_key:
+        # A retried or double-clicked submission: answer as the first one did.
+        replayed = Payment.objects.filter(
+            idempotency_key=idempotency_key, booking_id=booking_id, farmer_id=farmer_id,
+        ).values_list('payment_method', flat=True).first()
+        if replayed:
+            return _payment_done(request, replayed)
 
-    booking = get_object_or_404(Booking, booking_id=booking_id)
-    farmer = Farmer.objects.get(farmer_id=farmer_id)
+    booking = get_object_or_404(Booking, booking_id=booking_id, farmer_id=farmer_id)
 
-    existing_payment = Payment.objects.filter(booking=booking).first()
-    if existing_payment:
+    if Payment.objects.filter(booking=booking).exists():
         messages.info(request, 'Payment already made for this booking.')
         return redirect('farmer_dashboard')
 
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method')
+        if payment_method not in dict(Payment.PAYMENT_METHOD_CHOICES):
+            messages.error(request, 'Please choose a payment method.')
+            return redirect('make_payment', booking_id=booking.booking_id)
 
-        if payment_method == 'cash':
-            payment_status = 'pending'   # Owner will confirm later
-            booking.status = 'confirmed'
-        else:
-            payment_status = 'completed'  # Immediate success for online types
-            booking.status = 'confirmed'
-
-        # create payment entry
-        Payment.objects.create(
-            booking=booking,
-            farmer=farmer,
-            owner=booking.owner,
-            amount=booking.total_price,
-            payment_date=timezone.now(),
-            payment_status=payment_status,
-            payment_method=payment_method
-        )
-
-        booking.save()
-
-        # success messages
-        if payment_method == 'cash':
-            messages.success(request, 'Booking confirmed! Pay cash after machine usage.')
-        else:
-            messages.success(request, 'Payment successful! Booking confirmed.')
-
-        return redirect('farmer_dashboard')
-
-    return render(request, 'booking/make_payment.html', {'booking': booking})
+        try:
+            with transaction.atomic():
+                # Lock the booking so concurrent submissions with different
+                # keys (two tabs) serialise on the "already paid" check.
+                booking = Booking.objects.select_for_update().get(pk=booking.pk)
+                if Payment.objects.filter(booking=booking).exists():
+                    messages.info(request, 'Payment already made for this booking.')
+                    return redirect('farmer_dashboard')
+                if not lifecycle.can_transition(booking, 'confirmed'):
+                    messages.error(request, f'This booking is {booking.status} and can no longer be paid for.')
+                    return redirect('farmer_dashboard')
+
+                Payment.objects.create(
+                    booking=booking,
+                    farmer_id=farmer_id,
+                    owner_id=booking.owner_id,
+                    amount=booking.total_price,
+                    payment_date=timezone.now(),
+                    # Cash is confirmed by the owner later; online types succeed immediately.
+                    payment_status='pending' if payment_method == 'cash' else 'completed',
+                    payment_method=payment_method,
+                    idempotency_key=idempotency_key,
+                )
+                lifecycle.transition(booking, 'confirmed')
+                jobs.enqueue(notifications.booking_confirmed, booking.booking_id)
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            # The same key was committed by a concurrent request first, or
+            # was already spent on another booking (a stale or copied form).
+            replayed = Payment.objects.filter(idempotency_key=idempotency_key, booking=booking).first()
+            if not replayed:
+                messages.error(request, 'This payment form has expired. Please try again.')
+                return redirect('make_payment', booking_id=booking.booking_id)
+            return _payment_done(request, replayed.payment_method)
+
+        return _payment_done(request, payment_method)
+
+    return render(request, 'booking/make_payment.html', {
+        'booking': booking,
+        'idempotency_key': uuid.uuid4().hex,
+    })
 
 # ---------------------- CANCEL BOOKING ----------------------
+@farmer_required
 def cancel_booking(request, booking_id):
-    farmer_id = request.session.get('farmer_id')
-    if not farmer_id:
-        return redirect('farmer_login')
+    booking = get_object_or_404(Booking, booking_id=booking_id, farmer=request.principal.account)
 
-    booking = get_object_or_404(Booking, booking_id=booking_id, farmer_id=farmer_id)
-
-    if booking.status in ['pending', 'confirmed']:
-        booking.status = 'cancelled'
-        booking.save()
+    if lifecycle.can_transition(booking, 'cancelled'):
+        lifecycle.transition(booking, 'cancelled')
         messages.success(request, f'Booking for {booking.machine.machine_name} has been cancelled.')
     else:
         messages.warning(request, 'This booking cannot be cancelled.')
@@ -361,6 +403,7 @@ def owner_register(request):
         email = request.POST.get('email')
         phone = request.POST.get('phone')
         password = request.POST.get('password')
+        latitude, longitude = geo.parse_point(request.POST.get('latitude'), request.POST.get('longitude')) or (None, None)
 
         if Owner.objects.filter(email=email).exists():
             messages.error(request, "Email already registered!")
@@ -370,6 +413,8 @@ def owner_register(request):
                 name=name,
                 email=email,
                 phone=phone,
+                latitude=latitude,
+                longitude=longitude,
                 password_hash=hashed_password,
                 created_at=timezone.now(),
             )
@@ -384,11 +429,16 @@ def owner_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
+        wait = logins.throttle(request, email)
+        if wait:
+            messages.error(request, f"Too many login attempts. Try again in {wait} seconds.")
+            return render(request, 'booking/owner_login.html', status=429)
+
         try:
             owner = Owner.objects.get(email=email)
-            if check_password(password, owner.password_hash):
-                request.session['owner_id'] = owner.pk
-                request.session['owner_email'] = owner.email
+            if logins.verify_password(owner, password):
+                logins.login_succeeded(request, email)
+                principal.log_in(request, owner)
                 return redirect('owner_dashboard')
             else:
                 messages.error(request, "Invalid email or password")
@@ -397,75 +447,74 @@ def owner_login(request):
 
     return render(request, 'booking/owner_login.html')
 
+@owner_required
 def owner_dashboard(request):
-    owner_id = request.session.get('owner_id')
-    if not owner_id:
-        messages.error(request, "Please log in first.")
-        return redirect('owner_login')
-
-    owner = get_object_or_404(Owner, pk=owner_id)
+    owner = request.principal.account
     bank = OwnerBankDetails.objects.filter(owner=owner).first()
-    machines = Machine.objects.filter(owner=owner)
-    bookings = Booking.objects.filter(machine__owner=owner)
-
-    total_earnings = bookings.filter(status="confirmed").aggregate(total=Sum('total_price'))['total'] or 0
-    pending_payments = bookings.filter(status="pending").aggregate(total=Sum('total_price'))['total'] or 0
-
-    monthly_income = (
-        bookings.filter(status="confirmed")
-        .annotate(month=ExtractMonth('booking_date'))
-        .values('month')
-        .annotate(total=Sum('total_price'))
-        .order_by('month')
+
+    year = parse_year(request.GET.get('year'))
+    analytics = dashboard_cache.cached(
+        f'owner:{year}', [f'owner:{owner.owner_id}'], lambda: owner_analytics(owner, year)
+    )
+    occupancy = dashboard_cache.cached(
+        f'owner_occupancy:{year}', [f'owner:{owner.owner_id}'], lambda: owner_occupancy(owner, year)
     )
 
-    labels = []
-    data = []
-    for i in range(1, 13):  
-        labels.append(i)
-        month_data = next((item['total'] for item in monthly_income if item['month'] == i), 0)
-        data.append(month_data)
+    machines = list(Machine.objects.filter(owner=owner))
+    bookings = owner_bookings(owner)
+    insights = forecasting.owner_insights(owner)
+    context = owner_context(owner, bank, analytics, occupancy, machines, bookings, insights)
+    return render(request, "booking/owner_dashboard.html", context)
+
 
-    income_data = {
-        "labels": labels,
-        "data": data
-    }
+def owner_context(owner, bank, analytics, occupancy, machines, bookings, insights):
+    for machine in machines:
+        machine.occupancy = occupancy['machines'].get(machine.machine_id)
+        machine.price_suggestion = insights['suggestions'].get(machine.machine_id)
 
-    context = {
+    return {
         "owner": owner,
         "bank": bank,
         "machines": machines,
         "bookings": bookings,
-        "total_earnings": total_earnings,
-        "pending_payments": pending_payments,
-        "income_data": income_data
+        "total_bookings": analytics['total_bookings'],
+        "total_earnings": analytics['total_earnings'],
+        "pending_payments": analytics['pending_payments'],
+        "income_data": analytics['income_data'],
+        "occupancy_heatmap": [
+            (month, [(value, f'{value / 100:.2f}' if value is not None else '') for value in values])
+            for month, values in occupancy['heatmap']
+        ],
+        "weekdays": WEEKDAYS,
+        "forecast_data": insights['forecast_chart'],
+        "busiest_type": insights['busiest_type'],
+        "busiest_villages": insights['busiest_villages'],
     }
 
-    return render(request, "booking/owner_dashboard.html", context)
-
 
 def owner_logout(request):
-    from django.contrib.auth import logout as auth_logout
-    auth_logout(request)
-    request.session.pop('owner_id', None)
-    request.session.pop('owner_email', None)
+    principal.log_out(request)
     messages.success(request, "You have been logged out successfully.")
     return redirect('owner_login')
 
 @require_POST
+@owner_required
 def confirm_cash_payment(request, booking_id):
-    owner_id = request.session.get('owner_id')
-    if not owner_id:
-        messages.error(request, "Please log in first.")
-        return redirect('owner_login')
-
-    owner = get_object_or_404(Owner, pk=owner_id)
-    booking = get_object_or_404(Booking, pk=booking_id, machine__owner=owner)
+    booking = get_object_or_404(Booking, pk=booking_id, machine__owner=request.principal.account)
+
+    # Only a pending cash payment can be confirmed, and only once.
+    with transaction.atomic():
+        payment = (
+            Payment.objects.select_for_update()
+            .filter(booking=booking, payment_method='cash', payment_status='pending')
+            .first()
+        )
+        if payment:
+            payment.payment_status = 'completed'
+            payment.save()
+            jobs.enqueue(notifications.cash_payment_confirmed, payment.payment_id)
 
-    # Only allow confirming if payment method is 'cash' and status is 'pending'
-    if booking.payment_method == 'cash' and booking.status == 'pending':
-        booking.status = 'confirmed'
-        booking.save()
+    if payment:
         messages.success(request, f"Payment for Booking ID {booking.booking_id} confirmed successfully!")
     else:
         messages.warning(request, "This booking cannot be confirmed (already paid or not cash).")
@@ -474,6 +523,7 @@ def confirm_cash_payment(request, booking_id):
 
 
 # ---------------------- MACHINE ----------------------
+@owner_required
 def add_machine(request):
     if request.method == 'POST':
         machine_name = request.POST.get('machine_name')
@@ -485,14 +535,20 @@ def add_machine(request):
         description = request.POST.get('description')
         machine_image = request.FILES.get('machine_image')
 
-        owner_id = request.session.get('owner_id')
-        if not owner_id:
-            messages.error(request, "Please log in first.")
-            return redirect('owner_login')
-
-        owner = get_object_or_404(Owner, pk=owner_id)
-
-        Machine.objects.create(
+        owner = request.principal.account
+        # Machines are kept at the owner's place unless a location is given.
+        latitude, longitude = (
+            geo.parse_point(request.POST.get('latitude'), request.POST.get('longitude'))
+            or (owner.latitude, owner.longitude)
+        )
+        if machine_image:
+            try:
+                images.validate_upload(machine_image)
+            except ValueError as exc:
+                messages.error(request, str(exc))
+                return redirect('add_machine')
+
+        machine = Machine.objects.create(
             owner=owner,
             machine_name=machine_name,
             machine_number=machine_number,
@@ -501,8 +557,12 @@ def add_machine(request):
             crops_supported=crops_supported,
             price_per_day=price_per_day,
             description=description,
-            machine_image=machine_image
+            machine_image=machine_image,
+            latitude=latitude,
+            longitude=longitude,
         )
+        if machine.machine_image:
+            jobs.enqueue(images.make_thumbnails, machine.machine_id)
 
         messages.success(request, "✅ Machine added successfully!")
         return redirect('owner_dashboard')
@@ -510,6 +570,31 @@ def add_machine(request):
     return render(request, 'booking/add_machine.html')
 
 
+@require_POST
+@owner_required
+def import_machines(request):
+    owner = request.principal.account
+    upload = request.FILES.get('machines_file')
+    if not upload:
+        messages.error(request, "Choose a CSV or JSON file to import.")
+        return redirect('owner_dashboard')
+
+    try:
+        rows = bulk_io.read_rows(bulk_io.text_upload(upload), bulk_io.format_for(upload.name))
+        result = bulk_io.import_machines(owner, rows, update=bool(request.POST.get('update')))
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        messages.error(request, f"Could not read {upload.name}: {exc}")
+        return redirect('owner_dashboard')
+
+    messages.success(request, f"Imported {result.created} machines, updated {result.updated}, "
+                              f"skipped {result.skipped} already listed.")
+    for line, error in result.errors[:10]:
+        messages.warning(request, f"Row {line}: {error}")
+    if len(result.errors) > 10:
+        messages.warning(request, f"...and {len(result.errors) - 10} more rejected rows.")
+    return redirect('owner_dashboard')
+
+
 def machine_list(request):
     machines = Machine.objects.all()
     return render(request, 'booking/machine_list.html', {'machines': machines})
@@ -531,15 +616,48 @@ def edit_machine(request, machine_id):
 
     return render(request, 'booking/edit_machine.html', {'machine': machine})
 
-# Add Bank
-# -----------------------------
-def add_bank(request):
-    owner_id = request.session.get('owner_id')
-    if not owner_id:
+# ---------------------- EXPORT ----------------------
+def export_bookings(request):
+    """Stream bookings (``?payments=1`` for payments) as CSV or JSON.
+
+    Staff users export everything; a logged-in owner exports their own rows.
+    """
+    admin = principal.get_principal(request, 'admin')
+    owner = principal.get_principal(request, 'owner')
+    if admin:
+        try:
+            owner_id = int(request.GET['owner']) if request.GET.get('owner') else None
+        except ValueError:
+            return HttpResponseBadRequest("owner must be an owner id.")
+    elif owner:
+        owner_id = owner.account.pk
+    else:
         messages.error(request, "Please log in first.")
         return redirect('owner_login')
 
-    owner = get_object_or_404(Owner, pk=owner_id)
+    fmt = 'json' if request.GET.get('format') == 'json' else 'csv'
+    try:
+        date_from = date.fromisoformat(request.GET['from']) if request.GET.get('from') else None
+        date_to = date.fromisoformat(request.GET['to']) if request.GET.get('to') else None
+    except ValueError:
+        return HttpResponseBadRequest("from and to must be dates (YYYY-MM-DD).")
+    export = bulk_io.payment_export if request.GET.get('payments') else bulk_io.booking_export
+    columns, queryset = export(owner_id=owner_id, status=request.GET.get('status') or None,
+                               date_from=date_from, date_to=date_to)
+
+    name = 'payments' if request.GET.get('payments') else 'bookings'
+    response = StreamingHttpResponse(
+        bulk_io.stream_rows(columns, queryset, fmt),
+        content_type='text/csv' if fmt == 'csv' else 'application/json',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.localdate()}.{fmt}"'
+    return response
+
+# Add Bank
+# -----------------------------
+@owner_required
+def add_bank(request):
+    owner = request.principal.account
 
     if request.method == 'POST':
         account_holder_name = request.POST.get('account_holder_name')
@@ -563,15 +681,9 @@ def add_bank(request):
 
 
 # ---------------------- BANK ----------------------
-@login_required(login_url='owner_login')
+@owner_required
 def update_bank(request, bank_id):
-    owner_id = request.session.get('owner_id')
-    if not owner_id:
-        messages.error(request, "Please log in again.")
-        return redirect('owner_login')
-
-    owner = get_object_or_404(Owner, pk=owner_id)
-    bank = get_object_or_404(OwnerBankDetails, pk=bank_id, owner=owner)
+    bank = get_object_or_404(OwnerBankDetails, pk=bank_id, owner=request.principal.account)
 
     if request.method == 'POST':
         bank.account_holder_name = request.POST.get('account_holder_name', bank.account_holder_name)